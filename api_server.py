@@ -0,0 +1,326 @@
+"""Local JSON API over final.db for dashboards: python api_server.py (API_HOST / API_PORT / API_DB in .env)"""
+import asyncio
+import contextlib
+import os
+import queue
+import sqlite3
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import pandas as pd
+from aiohttp import web
+from dotenv import load_dotenv
+
+from main import SOLReport, to_display_units
+
+
+# Read connections kept open between requests; SQLite calls run on a thread pool of the same size
+API_POOL_SIZE = 4
+
+# Upper bound for one page of transactions or transfers
+API_MAX_PAGE_SIZE = 500
+
+
+class ConnectionPool:
+    """Warm read-only SQLite connections handed to executor threads one request at a time"""
+
+    def __init__(self, db_name, size=API_POOL_SIZE):
+        self.db_name = db_name
+        self.executor = ThreadPoolExecutor(max_workers=size, thread_name_prefix='sqlite-read')
+        self.connections = queue.Queue()
+        for _ in range(size):
+            conn = sqlite3.connect(db_name, check_same_thread=False)
+            conn.execute("PRAGMA query_only = 1")
+            self.connections.put(conn)
+        # PRAGMA data_version only moves for commits made by other connections, so it gets its own
+        self.version_conn = sqlite3.connect(db_name, check_same_thread=False)
+        self.version_conn.execute("PRAGMA query_only = 1")
+
+    def run_with_connection(self, function, *args):
+        conn = self.connections.get()
+        try:
+            return function(conn, *args)
+        finally:
+            self.connections.put(conn)
+
+    async def run(self, function, *args):
+        """Run function(conn, *args) off the event loop with a pooled connection"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, self.run_with_connection, function, *args)
+
+    def data_version(self):
+        """Moves whenever another connection commits, WAL commits included, so cached summaries are checked cheaply"""
+        return self.version_conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while not self.connections.empty():
+            self.connections.get().close()
+        self.version_conn.close()
+
+
+class SummaryCache:
+    """In-memory summaries keyed by (kind, wallet, days_back, UTC day), dropped when the database changes"""
+
+    def __init__(self):
+        self.entries = {}
+
+    def get(self, key, data_version):
+        entry = self.entries.get(key)
+        if entry and entry[0] == data_version:
+            return entry[1]
+        return None
+
+    def put(self, key, data_version, value):
+        self.entries[key] = (data_version, value)
+
+    def invalidate(self, wallet_address=None):
+        """Forget one wallet's summaries (every wallet's when none given) after an ingest"""
+        self.entries = {key: entry for key, entry in self.entries.items()
+                        if wallet_address is not None and key[1] != wallet_address}
+
+
+def frame_records(df):
+    """DataFrame rows as JSON-safe dicts (NaN becomes null)"""
+    return df.astype(object).where(df.notna(), None).to_dict(orient='records')
+
+
+def get_wallet_id(conn, wallet_address):
+    row = conn.execute("SELECT id FROM wallets WHERE wallet_address = ?", (wallet_address,)).fetchone()
+    return row[0] if row else None
+
+
+def created_at_filter(alias, days_back):
+    return f" AND {alias}.created_at >= datetime('now', '-{int(days_back)} days')" if days_back else ""
+
+
+@contextlib.contextmanager
+def reading_archive(conn, wallet_id, days_back):
+    """Make the wallet's archived rows inside the days_back window visible to the queries run inside"""
+    partitions = SOLReport.archived_partitions(conn, [wallet_id], dict.fromkeys(SOLReport.ARCHIVE_SOURCES, days_back))
+    if partitions.empty:
+        yield
+        return
+    # query_only also refuses the TEMP tables and views the archive is read through
+    conn.execute("PRAGMA query_only = 0")
+    try:
+        with SOLReport.archive_views(conn, partitions):
+            yield
+    finally:
+        conn.execute("PRAGMA query_only = 1")
+
+
+def read_wallets(conn):
+    return frame_records(pd.read_sql_query('''
+        SELECT w.wallet_address, w.wallet_name, p.portfolio_name,
+               (SELECT COUNT(*) FROM wallet_transactions wt WHERE wt.wallet_id = w.id) AS transactions,
+               (SELECT COUNT(*) FROM sol_transfers st WHERE st.wallet_id = w.id) AS sol_transfers
+        FROM wallets w
+        LEFT JOIN portfolios p ON w.portfolio_id = p.id
+        ORDER BY w.id
+    ''', conn))
+
+
+def read_summary(conn, wallet_address, days_back):
+    """The trade and SOL transfer summaries of the Excel reports, plus per-currency totals"""
+    wallet_id = get_wallet_id(conn, wallet_address)
+    if wallet_id is None:
+        return None
+
+    with reading_archive(conn, wallet_id, days_back):
+        trades = to_display_units(pd.read_sql_query(SOLReport.SUMMARY_QUERY + created_at_filter('wt', days_back)
+                                                    + " GROUP BY w.wallet_address, w.wallet_name",
+                                                    conn, params=[wallet_id]))
+        transfers = to_display_units(pd.read_sql_query(SOLReport.SOL_TRANSFERS_SUMMARY_QUERY
+                                                       + created_at_filter('st', days_back)
+                                                       + " GROUP BY w.wallet_address", conn, params=[wallet_id]))
+        # Same window as the summaries above, and internal transfers left out like in the transfer summary
+        fiat = to_display_units(pd.read_sql_query(f'''
+            SELECT 'wallet_transactions' AS source_table, fv.currency,
+                   SUM(fv.spent_amount_value_cents) AS spent_value_cents,
+                   SUM(fv.earned_amount_value_cents) AS earned_value_cents,
+                   NULL AS sol_amount_value_cents
+            FROM fiat_valuations fv
+            JOIN wallet_transactions wt ON wt.id = fv.source_id
+            WHERE fv.wallet_id = ? AND fv.source_table = 'wallet_transactions'{created_at_filter('wt', days_back)}
+            GROUP BY fv.currency
+            UNION ALL
+            SELECT 'sol_transfers', fv.currency, NULL, NULL, SUM(fv.sol_amount_value_cents)
+            FROM fiat_valuations fv
+            JOIN sol_transfers st ON st.id = fv.source_id
+            WHERE fv.wallet_id = ? AND fv.source_table = 'sol_transfers'
+                  AND st.is_internal = 0{created_at_filter('st', days_back)}
+            GROUP BY fv.currency
+            ORDER BY source_table, currency
+        ''', conn, params=[wallet_id, wallet_id]))
+
+    return {
+        'wallet_address': wallet_address,
+        'days_back': days_back,
+        'transactions': frame_records(trades)[0] if not trades.empty else None,
+        'sol_transfers': frame_records(transfers)[0] if not transfers.empty else None,
+        'fiat': frame_records(fiat),
+    }
+
+
+def read_page(conn, wallet_address, table_name, days_back, page, page_size):
+    """One page of a wallet's trades (newest block first) or SOL transfers (newest ingest first)"""
+    wallet_id = get_wallet_id(conn, wallet_address)
+    if wallet_id is None:
+        return None
+
+    if table_name == 'wallet_transactions':
+        columns = '''id, token_symbol, token_mint, time_traded, spent_amount_lamports, earned_amount_lamports,
+                     spent_amount_eur_cents, earned_amount_eur_cents, number_buys, number_sells, delta_sol_lamports,
+                     delta_percentage, dexscreener, block_time'''
+        order = "block_time_epoch DESC, id DESC"
+    else:
+        columns = '''id, block_month, from_owner, to_owner, sol_amount_lamports, sol_amount_eur_cents,
+                     transaction_label, is_internal, solscan_link'''
+        order = "created_at DESC, id DESC"
+
+    where = f"wallet_id = ?{created_at_filter(table_name, days_back)}"
+    with reading_archive(conn, wallet_id, days_back):
+        total = conn.execute(f"SELECT COUNT(*) FROM {table_name} WHERE {where}", (wallet_id,)).fetchone()[0]
+        rows = pd.read_sql_query(f"SELECT {columns} FROM {table_name} WHERE {where} ORDER BY {order} LIMIT ? OFFSET ?",
+                                 conn, params=[wallet_id, page_size, (page - 1) * page_size])
+
+    return {'wallet_address': wallet_address, 'page': page, 'page_size': page_size, 'total': total,
+            'rows': frame_records(to_display_units(rows))}
+
+
+class ReportAPI:
+    """aiohttp routes serving wallet data from final.db and running report jobs in the background"""
+
+    REPORT_JOBS = {
+        'transactions': lambda report, days_back: report.generate_excel_from_db(days_back=days_back, incremental=True),
+        'sol_transfers': lambda report, days_back: report.generate_sol_transfers_excel_from_db(
+            days_back=days_back, incremental=True),
+        'refresh': lambda report, days_back: report.refresh_wallet(),
+    }
+
+    def __init__(self, db_name):
+        self.pool = ConnectionPool(db_name)
+        self.cache = SummaryCache()
+        # Report jobs write to the database, so they run one at a time
+        self.job_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='report-job')
+        self.jobs = {}
+
+    def build_app(self):
+        app = web.Application()
+        app.add_routes([
+            web.get('/wallets', self.list_wallets),
+            web.get('/wallets/{wallet_address}/summary', self.wallet_summary),
+            web.get('/wallets/{wallet_address}/transactions', self.wallet_transactions),
+            web.get('/wallets/{wallet_address}/transfers', self.wallet_transfers),
+            web.post('/wallets/{wallet_address}/reports', self.start_report),
+            web.get('/jobs/{job_id}', self.job_status),
+        ])
+        app.on_cleanup.append(self.shutdown)
+        return app
+
+    async def shutdown(self, app):
+        self.job_executor.shutdown(wait=True)
+        self.pool.close()
+
+    @staticmethod
+    def int_query_param(request, name, default=None, minimum=0):
+        value = request.query.get(name)
+        if value in (None, ''):
+            return default
+        try:
+            number = int(value)
+        except ValueError:
+            raise web.HTTPBadRequest(reason=f"{name} must be an integer")
+        if number < minimum:
+            raise web.HTTPBadRequest(reason=f"{name} must be at least {minimum}")
+        return number
+
+    async def list_wallets(self, request):
+        return web.json_response(await self.pool.run(read_wallets))
+
+    async def wallet_summary(self, request):
+        wallet_address = request.match_info['wallet_address']
+        days_back = self.int_query_param(request, 'days_back')
+        # Rows age out of a window without any commit, so windowed summaries are recomputed every day
+        today = datetime.now(timezone.utc).date().isoformat() if days_back else None
+        key = ('summary', wallet_address, days_back, today)
+
+        data_version = self.pool.data_version()
+        summary = self.cache.get(key, data_version)
+        if summary is None:
+            summary = await self.pool.run(read_summary, wallet_address, days_back)
+            if summary is None:
+                raise web.HTTPNotFound(reason=f"Unknown wallet {wallet_address}")
+            self.cache.put(key, data_version, summary)
+        return web.json_response(summary)
+
+    async def wallet_page(self, request, table_name):
+        wallet_address = request.match_info['wallet_address']
+        page = await self.pool.run(
+            read_page, wallet_address, table_name,
+            self.int_query_param(request, 'days_back'),
+            self.int_query_param(request, 'page', 1, minimum=1),
+            min(self.int_query_param(request, 'page_size', 100, minimum=1), API_MAX_PAGE_SIZE))
+        if page is None:
+            raise web.HTTPNotFound(reason=f"Unknown wallet {wallet_address}")
+        return web.json_response(page)
+
+    async def wallet_transactions(self, request):
+        return await self.wallet_page(request, 'wallet_transactions')
+
+    async def wallet_transfers(self, request):
+        return await self.wallet_page(request, 'sol_transfers')
+
+    def run_report_job(self, job_id, wallet_address, report_type, days_back):
+        """Worker-thread body: a full SOLReport run, then drop the wallet's cached summaries"""
+        job = self.jobs[job_id]
+        job['status'] = 'running'
+        report = None
+        try:
+            report = SOLReport(wallet_address, days_back or 15, db_name=self.pool.db_name)
+            job['result'] = bool(self.REPORT_JOBS[report_type](report, days_back))
+            job['output_file_path'] = report.output_file_path
+            job['status'] = 'done'
+        except Exception as e:
+            job['status'] = 'failed'
+            job['error'] = str(e)
+        finally:
+            if report is not None:
+                report.close_connection()
+            self.cache.invalidate(wallet_address)
+            job['finished_at'] = datetime.now().isoformat()
+
+    async def start_report(self, request):
+        wallet_address = request.match_info['wallet_address']
+        report_type = request.query.get('report', 'transactions')
+        if report_type not in self.REPORT_JOBS:
+            raise web.HTTPBadRequest(reason=f"report must be one of {', '.join(self.REPORT_JOBS)}")
+        days_back = self.int_query_param(request, 'days_back')
+        # SOLReport would register an unknown address as a new wallet
+        if await self.pool.run(get_wallet_id, wallet_address) is None:
+            raise web.HTTPNotFound(reason=f"Unknown wallet {wallet_address}")
+
+        job_id = uuid.uuid4().hex
+        self.jobs[job_id] = {'job_id': job_id, 'wallet_address': wallet_address, 'report': report_type,
+                             'days_back': days_back, 'status': 'queued',
+                             'queued_at': datetime.now().isoformat()}
+        asyncio.get_running_loop().run_in_executor(
+            self.job_executor, self.run_report_job, job_id, wallet_address, report_type, days_back)
+        return web.json_response(self.jobs[job_id], status=202)
+
+    async def job_status(self, request):
+        job = self.jobs.get(request.match_info['job_id'])
+        if job is None:
+            raise web.HTTPNotFound(reason="Unknown job")
+        return web.json_response(job)
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    db_name = os.getenv('API_DB', 'final.db')
+    if not os.path.exists(db_name):
+        raise SystemExit(f"❌ {db_name} not found - fetch a wallet with main.py first")
+    api = ReportAPI(db_name)
+    web.run_app(api.build_app(), host=os.getenv('API_HOST', '127.0.0.1'), port=int(os.getenv('API_PORT', '8080')))
@@ -1,37 +1,845 @@
 import sqlite3
 from dotenv import load_dotenv
 import os
+import re
+import time
+import contextlib
+import functools
+import inspect
+import gzip
+import json
+import hashlib
+import html
+import tempfile
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 import requests
+import numpy as np
 import pandas as pd
 from dune_client.client import DuneClient
 from dune_client.query import QueryBase
 from dune_client.types import QueryParameter
-from openpyxl import load_workbook
+from openpyxl import Workbook, load_workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import PatternFill, Font, Alignment, Border, Side
 from openpyxl.utils import get_column_letter
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+try:
+    import duckdb
+except ImportError:  # Optional: only ANALYTICS_ENGINE=duckdb and the engine benchmark need it
+    duckdb = None
+
+try:
+    import pyarrow
+except ImportError:  # Optional: only archiving old rows to Parquet and reading them back need it
+    pyarrow = None
+
+
+# Fiat currencies every trade and transfer is valued in (override with REPORT_CURRENCIES in .env)
+DEFAULT_REPORT_CURRENCIES = ['EUR', 'USD', 'GBP', 'CHF']
+
+# Rows touched per transaction by backfills, so a long migration never holds the write lock for long
+MIGRATION_BATCH_SIZE = 5000
+
+# Token metadata rows kept in memory per report, least recently used evicted first
+TOKEN_CACHE_SIZE = 4096
+
+# Rows older than this many days by block time move to the Parquet archive (override with ARCHIVE_AFTER_DAYS in .env)
+DEFAULT_ARCHIVE_AFTER_DAYS = 365
+
+# Per-wallet, per-year Parquet partitions of archived rows
+ARCHIVE_FOLDER = "archive"
+
+# How long a connection waits for another writer (scheduler worker, API job) to release final.db
+SQLITE_BUSY_TIMEOUT_SECONDS = 60
+
+# SOL and fiat amounts are stored as exact integers in lamports and cents. Token amounts stay REAL:
+# meme-token supplies reach 1e15 and more, past what 64-bit base units can hold.
+LAMPORTS_PER_SOL = 1_000_000_000
+CENTS_PER_UNIT = 100
+
+# Unit suffix of an integer amount column -> units per display unit; "spent_amount_lamports" is shown as "spent_amount"
+AMOUNT_UNITS = {'_lamports': LAMPORTS_PER_SOL, '_cents': CENTS_PER_UNIT}
+
+# Display amount columns of fetched frames -> unit suffix of the column they are stored in
+STORED_AMOUNT_UNITS = {
+    'spent_amount': '_lamports',
+    'earned_amount': '_lamports',
+    'delta_sol': '_lamports',
+    'sol_amount': '_lamports',
+    'spent_amount_eur': '_cents',
+    'earned_amount_eur': '_cents',
+    'sol_amount_eur': '_cents',
+}
+
+
+def to_units_sql(column, units):
+    """SQL rounding a display-unit REAL column to integer units"""
+    return f"CAST(ROUND({column} * {units}) AS INTEGER)"
+
+
+# Dune returns block_time as '14.08.2025' or '2025-08-14 10:15:00.000 UTC'; both become unix seconds
+BLOCK_TIME_EPOCH_SQL = """
+    CAST(strftime('%s', CASE
+        WHEN block_time LIKE '__.__.____%' THEN
+            substr(block_time, 7, 4) || '-' || substr(block_time, 4, 2) || '-' || substr(block_time, 1, 2)
+        ELSE substr(block_time, 1, 19)
+    END) AS INTEGER)
+"""
+
+# Row-range backfills: name -> (table, statement taking (lower_rowid, upper_rowid]); on the report
+# tables the rowid is their id column. The same statements keep derived data current for newly ingested rows.
+ROW_BACKFILLS = {
+    'wallet_transactions_block_time_epoch': ('wallet_transactions', f'''
+        UPDATE wallet_transactions SET block_time_epoch = {BLOCK_TIME_EPOCH_SQL}
+        WHERE id > ? AND id <= ? AND block_time_epoch IS NULL
+    '''),
+    'wallet_daily_rollups': ('wallet_transactions', '''
+        INSERT INTO wallet_daily_rollups (
+            wallet_id, day, trade_rows, spent_amount_lamports, earned_amount_lamports,
+            spent_amount_eur_cents, earned_amount_eur_cents, delta_sol_lamports
+        )
+        SELECT
+            wallet_id,
+            date(block_time_epoch, 'unixepoch'),
+            COUNT(*),
+            COALESCE(SUM(spent_amount_lamports), 0),
+            COALESCE(SUM(earned_amount_lamports), 0),
+            COALESCE(SUM(spent_amount_eur_cents), 0),
+            COALESCE(SUM(earned_amount_eur_cents), 0),
+            COALESCE(SUM(delta_sol_lamports), 0)
+        FROM wallet_transactions
+        WHERE id > ? AND id <= ? AND block_time_epoch IS NOT NULL
+        GROUP BY wallet_id, date(block_time_epoch, 'unixepoch')
+        ON CONFLICT (wallet_id, day) DO UPDATE SET
+            trade_rows = trade_rows + excluded.trade_rows,
+            spent_amount_lamports = spent_amount_lamports + excluded.spent_amount_lamports,
+            earned_amount_lamports = earned_amount_lamports + excluded.earned_amount_lamports,
+            spent_amount_eur_cents = spent_amount_eur_cents + excluded.spent_amount_eur_cents,
+            earned_amount_eur_cents = earned_amount_eur_cents + excluded.earned_amount_eur_cents,
+            delta_sol_lamports = delta_sol_lamports + excluded.delta_sol_lamports
+    '''),
+    'wallet_transactions_token_mint': ('wallet_transactions', '''
+        UPDATE wallet_transactions SET token_mint = CASE
+            WHEN instr(substr(dexscreener, 32), '?') > 0
+                THEN substr(dexscreener, 32, instr(substr(dexscreener, 32), '?') - 1)
+            ELSE substr(dexscreener, 32)
+        END
+        WHERE id > ? AND id <= ? AND token_mint IS NULL
+              AND dexscreener LIKE 'https://dexscreener.com/solana/%'
+    '''),
+    'token_metadata': ('wallet_transactions', '''
+        INSERT INTO token_metadata (token_mint, token_symbol, first_seen_epoch, source)
+        SELECT token_mint, MAX(token_symbol), MIN(block_time_epoch), 'dune'
+        FROM wallet_transactions
+        WHERE id > ? AND id <= ? AND token_mint IS NOT NULL
+        GROUP BY token_mint
+        ON CONFLICT (token_mint) DO UPDATE SET
+            token_symbol = COALESCE(token_symbol, excluded.token_symbol),
+            first_seen_epoch = MIN(COALESCE(first_seen_epoch, excluded.first_seen_epoch),
+                                   COALESCE(excluded.first_seen_epoch, first_seen_epoch)),
+            updated_at = CURRENT_TIMESTAMP
+    '''),
+    'sol_transfers_signature': ('sol_transfers', '''
+        UPDATE sol_transfers SET signature = substr(solscan_link, length('https://solscan.io/tx/') + 1)
+        WHERE id > ? AND id <= ? AND signature IS NULL AND solscan_link LIKE 'https://solscan.io/tx/%'
+    '''),
+    # Registered last, so the version moves after the derived columns are filled. One statement per
+    # ingest instead of a row trigger, which doubled bulk insert time.
+    **{f'{table_name}_data_version': (table_name, f'''
+        INSERT INTO wallet_data_versions (wallet_id, version)
+        SELECT DISTINCT wallet_id, 1 FROM {table_name} WHERE id > ? AND id <= ?
+        ON CONFLICT (wallet_id) DO UPDATE SET version = version + 1
+    ''') for table_name in ('wallet_transactions', 'sol_transfers')},
+    # Copies of the tables migration 11 rebuilds, run over the renamed *_legacy originals
+    'wallet_transactions_rebuild': ('wallet_transactions_legacy', f'''
+        INSERT INTO wallet_transactions (
+            id, wallet_id, token_symbol, time_traded, incoming, outcome, delta_token, spent_amount_lamports,
+            earned_amount_lamports, spent_amount_eur_cents, earned_amount_eur_cents, number_buys, number_sells,
+            delta_sol_lamports, delta_percentage, dexscreener, block_time, sol_eur_price, created_at,
+            block_time_epoch, token_mint
+        )
+        SELECT rowid, wallet_id, token_symbol, time_traded, incoming, outcome, delta_token,
+               {to_units_sql('spent_amount', LAMPORTS_PER_SOL)},
+               {to_units_sql('earned_amount', LAMPORTS_PER_SOL)},
+               {to_units_sql('spent_amount_eur', CENTS_PER_UNIT)},
+               {to_units_sql('earned_amount_eur', CENTS_PER_UNIT)},
+               number_buys, number_sells,
+               {to_units_sql('delta_sol', LAMPORTS_PER_SOL)},
+               delta_percentage, dexscreener, block_time, sol_eur_price, created_at, block_time_epoch, token_mint
+        FROM wallet_transactions_legacy
+        WHERE rowid > ? AND rowid <= ?
+    '''),
+    'sol_transfers_rebuild': ('sol_transfers_legacy', f'''
+        INSERT INTO sol_transfers (
+            id, wallet_id, sol_eur_price, block_month, from_owner, to_owner, sol_amount_lamports,
+            sol_amount_eur_cents, transaction_label, solscan_link, created_at, signature, is_internal,
+            internal_match_id
+        )
+        SELECT rowid, wallet_id, sol_eur_price, block_month, from_owner, to_owner,
+               {to_units_sql('sol_amount', LAMPORTS_PER_SOL)},
+               {to_units_sql('sol_amount_eur', CENTS_PER_UNIT)},
+               transaction_label, solscan_link, created_at, signature, is_internal, internal_match_rowid
+        FROM sol_transfers_legacy
+        WHERE rowid > ? AND rowid <= ?
+    '''),
+    'fiat_valuations_rebuild': ('fiat_valuations_legacy', f'''
+        INSERT INTO fiat_valuations
+        SELECT source_table, source_rowid, wallet_id, currency, price_date, sol_price,
+               {to_units_sql('spent_amount_value', CENTS_PER_UNIT)},
+               {to_units_sql('earned_amount_value', CENTS_PER_UNIT)},
+               {to_units_sql('sol_amount_value', CENTS_PER_UNIT)}
+        FROM fiat_valuations_legacy
+        WHERE rowid > ? AND rowid <= ?
+    '''),
+}
+
+# Statements run in the same commit that marks a backfill complete
+BACKFILL_CLEANUP = {
+    f'{table_name}_rebuild': [f"DROP TABLE {table_name}_legacy"]
+    for table_name in ('wallet_transactions', 'sol_transfers', 'fiat_valuations')
+}
+
+# Indexes of the tables migration 11 rebuilds: table -> index name -> statement creating it on the new table
+REBUILT_TABLE_INDEXES = {
+    'wallet_transactions': {
+        'idx_wallet_transactions_wallet_id':
+            "CREATE INDEX idx_wallet_transactions_wallet_id ON wallet_transactions(wallet_id)",
+        'idx_wallet_transactions_block_time':
+            "CREATE INDEX idx_wallet_transactions_block_time ON wallet_transactions(block_time)",
+        'idx_wallet_transactions_wallet_block_epoch':
+            "CREATE INDEX idx_wallet_transactions_wallet_block_epoch ON wallet_transactions(wallet_id, block_time_epoch)",
+        'idx_wallet_transactions_wallet_created':
+            "CREATE INDEX idx_wallet_transactions_wallet_created ON wallet_transactions(wallet_id, created_at)",
+        'idx_wallet_transactions_wallet_mint':
+            "CREATE INDEX idx_wallet_transactions_wallet_mint ON wallet_transactions(wallet_id, token_mint)",
+    },
+    'sol_transfers': {
+        'idx_sol_transfers_wallet_id': "CREATE INDEX idx_sol_transfers_wallet_id ON sol_transfers(wallet_id)",
+        'idx_sol_transfers_wallet_created':
+            "CREATE INDEX idx_sol_transfers_wallet_created ON sol_transfers(wallet_id, created_at)",
+        'idx_sol_transfers_signature': "CREATE INDEX idx_sol_transfers_signature ON sol_transfers(signature)",
+    },
+    'fiat_valuations': {
+        'idx_fiat_valuations_wallet_currency':
+            "CREATE INDEX idx_fiat_valuations_wallet_currency ON fiat_valuations(wallet_id, source_table, currency)",
+    },
+}
+
+# Versioned schema changes: (version, description, DDL statements, backfills registered by the migration)
+SCHEMA_MIGRATIONS = [
+    (1, "Add epoch block_time to wallet_transactions", [
+        "ALTER TABLE wallet_transactions ADD COLUMN block_time_epoch INTEGER",
+        '''CREATE INDEX IF NOT EXISTS idx_wallet_transactions_wallet_block_epoch
+           ON wallet_transactions(wallet_id, block_time_epoch)''',
+    ], ['wallet_transactions_block_time_epoch']),
+    (2, "Composite wallet/created_at indexes for time-window reports", [
+        '''CREATE INDEX IF NOT EXISTS idx_wallet_transactions_wallet_created
+           ON wallet_transactions(wallet_id, created_at)''',
+        '''CREATE INDEX IF NOT EXISTS idx_sol_transfers_wallet_created
+           ON sol_transfers(wallet_id, created_at)''',
+    ], []),
+    (3, "Daily per-wallet trade rollups", [
+        '''CREATE TABLE IF NOT EXISTS wallet_daily_rollups (
+               wallet_id INTEGER NOT NULL,
+               day TEXT NOT NULL,
+               trade_rows INTEGER NOT NULL DEFAULT 0,
+               spent_amount REAL NOT NULL DEFAULT 0,
+               earned_amount REAL NOT NULL DEFAULT 0,
+               spent_amount_eur REAL NOT NULL DEFAULT 0,
+               earned_amount_eur REAL NOT NULL DEFAULT 0,
+               delta_sol REAL NOT NULL DEFAULT 0,
+               PRIMARY KEY (wallet_id, day),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+    ], ['wallet_daily_rollups']),
+    (4, "Historical SOL prices and long-form fiat valuations", [
+        '''CREATE TABLE IF NOT EXISTS sol_price_history (
+               price_date TEXT NOT NULL,
+               currency TEXT NOT NULL,
+               price REAL NOT NULL,
+               fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (price_date, currency)
+           )''',
+        '''CREATE TABLE IF NOT EXISTS fiat_valuations (
+               source_table TEXT NOT NULL,
+               source_rowid INTEGER NOT NULL,
+               wallet_id INTEGER NOT NULL,
+               currency TEXT NOT NULL,
+               price_date TEXT,
+               sol_price REAL,
+               spent_amount_value REAL,
+               earned_amount_value REAL,
+               sol_amount_value REAL,
+               PRIMARY KEY (source_table, source_rowid, currency),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+        '''CREATE INDEX IF NOT EXISTS idx_fiat_valuations_wallet_currency
+           ON fiat_valuations(wallet_id, source_table, currency)''',
+    ], []),
+    (5, "Manifest of generated Excel reports", [
+        '''CREATE TABLE IF NOT EXISTS report_manifests (
+               output_file_path TEXT PRIMARY KEY,
+               wallet_id INTEGER NOT NULL,
+               report_type TEXT NOT NULL,
+               days_back INTEGER,
+               definition_signature TEXT NOT NULL,
+               header_row INTEGER NOT NULL,
+               row_count INTEGER NOT NULL,
+               min_rowid INTEGER NOT NULL,
+               max_rowid INTEGER NOT NULL,
+               file_mtime REAL,
+               generated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+    ], []),
+    (6, "Portfolios grouping wallets", [
+        '''CREATE TABLE IF NOT EXISTS portfolios (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               portfolio_name TEXT UNIQUE NOT NULL,
+               description TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+        "ALTER TABLE wallets ADD COLUMN portfolio_id INTEGER REFERENCES portfolios (id)",
+        "CREATE INDEX IF NOT EXISTS idx_wallets_portfolio_id ON wallets(portfolio_id)",
+    ], []),
+    (7, "Transfer signatures and internal-transfer tagging", [
+        "ALTER TABLE sol_transfers ADD COLUMN signature TEXT",
+        "ALTER TABLE sol_transfers ADD COLUMN is_internal INTEGER NOT NULL DEFAULT 0",
+        "ALTER TABLE sol_transfers ADD COLUMN internal_match_rowid INTEGER",
+        "CREATE INDEX IF NOT EXISTS idx_sol_transfers_signature ON sol_transfers(signature)",
+    ], ['sol_transfers_signature']),
+    (8, "Token metadata keyed by mint address", [
+        "ALTER TABLE wallet_transactions ADD COLUMN token_mint TEXT",
+        '''CREATE INDEX IF NOT EXISTS idx_wallet_transactions_wallet_mint
+           ON wallet_transactions(wallet_id, token_mint)''',
+        '''CREATE TABLE IF NOT EXISTS token_metadata (
+               token_mint TEXT PRIMARY KEY,
+               token_symbol TEXT,
+               token_name TEXT,
+               decimals INTEGER,
+               first_seen_epoch INTEGER,
+               source TEXT,
+               updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+           )''',
+    ], ['wallet_transactions_token_mint', 'token_metadata']),
+    (9, "Per-wallet data versions for summary caching", [
+        '''CREATE TABLE IF NOT EXISTS wallet_data_versions (
+               wallet_id INTEGER PRIMARY KEY,
+               version INTEGER NOT NULL DEFAULT 0,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+    ], ['wallet_transactions_data_version', 'sol_transfers_data_version']),
+    (10, "Persistent wallet sync job queue and Dune execution log", [
+        "ALTER TABLE wallets ADD COLUMN sync_enabled INTEGER NOT NULL DEFAULT 1",
+        "ALTER TABLE wallets ADD COLUMN sync_interval_minutes INTEGER",
+        '''CREATE TABLE IF NOT EXISTS sync_jobs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER NOT NULL,
+               job_type TEXT NOT NULL,
+               priority INTEGER NOT NULL DEFAULT 0,
+               days_back INTEGER,
+               status TEXT NOT NULL DEFAULT 'queued',
+               attempts INTEGER NOT NULL DEFAULT 0,
+               run_after INTEGER NOT NULL,
+               worker TEXT,
+               last_error TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               started_at INTEGER,
+               finished_at INTEGER,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+        # At most one queued or running job per wallet and job type
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_sync_jobs_active_wallet
+           ON sync_jobs(wallet_id, job_type) WHERE status IN ('queued', 'running')''',
+        '''CREATE INDEX IF NOT EXISTS idx_sync_jobs_status_run_after
+           ON sync_jobs(status, run_after)''',
+        '''CREATE TABLE IF NOT EXISTS dune_executions (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER,
+               query_id INTEGER NOT NULL,
+               executed_at INTEGER NOT NULL
+           )''',
+        "CREATE INDEX IF NOT EXISTS idx_dune_executions_executed_at ON dune_executions(executed_at)",
+    ], []),
+    # SQLite cannot change a column's type, so the tables are rebuilt: each one is renamed to *_legacy and
+    # copied into the new table by a batched backfill, which drops it when done. Rowids become an explicit
+    # id INTEGER PRIMARY KEY AUTOINCREMENT, which fiat valuations, report manifests and internal-transfer
+    # matches refer to: VACUUM keeps it and deleted or archived ids are never handed out again. Token
+    # amounts stay REAL: meme-token supplies reach 1e15 and more, past what 64-bit base units can hold.
+    (11, "Integer lamport and cent amounts", [
+        "ALTER TABLE wallet_transactions RENAME TO wallet_transactions_legacy",
+        *[f"DROP INDEX IF EXISTS {index_name}" for index_name in REBUILT_TABLE_INDEXES['wallet_transactions']],
+        '''CREATE TABLE wallet_transactions (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER NOT NULL,
+               token_symbol TEXT,
+               time_traded TEXT,
+               incoming REAL,
+               outcome REAL,
+               delta_token REAL,
+               spent_amount_lamports INTEGER,
+               earned_amount_lamports INTEGER,
+               spent_amount_eur_cents INTEGER,
+               earned_amount_eur_cents INTEGER,
+               number_buys INTEGER,
+               number_sells INTEGER,
+               delta_sol_lamports INTEGER,
+               delta_percentage REAL,
+               dexscreener TEXT,
+               block_time TEXT,
+               sol_eur_price REAL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               block_time_epoch INTEGER,
+               token_mint TEXT,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+
+        "ALTER TABLE sol_transfers RENAME TO sol_transfers_legacy",
+        *[f"DROP INDEX IF EXISTS {index_name}" for index_name in REBUILT_TABLE_INDEXES['sol_transfers']],
+        '''CREATE TABLE sol_transfers (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER NOT NULL,
+               sol_eur_price REAL,
+               block_month TEXT,
+               from_owner TEXT,
+               to_owner TEXT,
+               sol_amount_lamports INTEGER,
+               sol_amount_eur_cents INTEGER,
+               transaction_label TEXT,
+               solscan_link TEXT,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               signature TEXT,
+               is_internal INTEGER NOT NULL DEFAULT 0,
+               internal_match_id INTEGER,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+
+        "ALTER TABLE fiat_valuations RENAME TO fiat_valuations_legacy",
+        *[f"DROP INDEX IF EXISTS {index_name}" for index_name in REBUILT_TABLE_INDEXES['fiat_valuations']],
+        '''CREATE TABLE fiat_valuations (
+               source_table TEXT NOT NULL,
+               source_id INTEGER NOT NULL,
+               wallet_id INTEGER NOT NULL,
+               currency TEXT NOT NULL,
+               price_date TEXT,
+               sol_price REAL,
+               spent_amount_value_cents INTEGER,
+               earned_amount_value_cents INTEGER,
+               sol_amount_value_cents INTEGER,
+               PRIMARY KEY (source_table, source_id, currency),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+        *[statement for indexes in REBUILT_TABLE_INDEXES.values() for statement in indexes.values()],
+
+        # Ids inserted while the copies run start above every copied one
+        *[f"INSERT INTO sqlite_sequence (name, seq) SELECT '{table_name}', COALESCE(MAX(rowid), 0) "
+          f"FROM {table_name}_legacy" for table_name in ('wallet_transactions', 'sol_transfers')],
+        "ALTER TABLE report_manifests RENAME COLUMN min_rowid TO min_id",
+        "ALTER TABLE report_manifests RENAME COLUMN max_rowid TO max_id",
+
+        # The copies go ahead of backfills still pending from earlier migrations, which would otherwise
+        # find the new tables empty and finish at once
+        *[f'''INSERT INTO schema_backfills (rowid, name, table_name)
+               SELECT COALESCE(MIN(rowid), 1) - 1, '{table_name}_rebuild', '{table_name}_legacy' FROM schema_backfills'''
+          for table_name in REBUILT_TABLE_INDEXES],
+
+        # Rounded sums of float sums would not match the rows, so the rollups are summed again from scratch
+        "DROP TABLE wallet_daily_rollups",
+        '''CREATE TABLE wallet_daily_rollups (
+               wallet_id INTEGER NOT NULL,
+               day TEXT NOT NULL,
+               trade_rows INTEGER NOT NULL DEFAULT 0,
+               spent_amount_lamports INTEGER NOT NULL DEFAULT 0,
+               earned_amount_lamports INTEGER NOT NULL DEFAULT 0,
+               spent_amount_eur_cents INTEGER NOT NULL DEFAULT 0,
+               earned_amount_eur_cents INTEGER NOT NULL DEFAULT 0,
+               delta_sol_lamports INTEGER NOT NULL DEFAULT 0,
+               PRIMARY KEY (wallet_id, day),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+        "DELETE FROM schema_backfills WHERE name = 'wallet_daily_rollups'",
+    ], ['wallet_daily_rollups']),
+    (12, "Quarantine for fetched rows failing validation, with per-ingest metrics", [
+        '''CREATE TABLE IF NOT EXISTS quarantined_rows (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER NOT NULL,
+               source_table TEXT NOT NULL,
+               reason TEXT NOT NULL,
+               row_data TEXT NOT NULL,
+               quarantined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+        # Overlapping fetch windows return the same bad rows again; they are quarantined once
+        '''CREATE UNIQUE INDEX IF NOT EXISTS idx_quarantined_rows_row
+           ON quarantined_rows(wallet_id, source_table, row_data)''',
+        '''CREATE TABLE IF NOT EXISTS validation_runs (
+               id INTEGER PRIMARY KEY AUTOINCREMENT,
+               wallet_id INTEGER NOT NULL,
+               source_table TEXT NOT NULL,
+               checked_rows INTEGER NOT NULL,
+               quarantined_rows INTEGER NOT NULL,
+               rule_failures TEXT NOT NULL,
+               duration_ms REAL NOT NULL,
+               validated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+    ], []),
+    # No native partitions in SQLite: the clustered (wallet_id, block_month, ...) key keeps each
+    # wallet-month contiguous, so a wallet's swaps are read or replaced as one range
+    (13, "Swap-level events with per-token trades rebuilt from them", [
+        '''CREATE TABLE IF NOT EXISTS wallet_swaps (
+               wallet_id INTEGER NOT NULL,
+               block_month TEXT NOT NULL,
+               signature TEXT NOT NULL,
+               event_index INTEGER NOT NULL DEFAULT 0,
+               token_mint TEXT NOT NULL,
+               token_symbol TEXT,
+               side TEXT NOT NULL CHECK (side IN ('buy', 'sell')),
+               token_amount REAL NOT NULL,
+               sol_amount_lamports INTEGER NOT NULL,
+               block_time_epoch INTEGER NOT NULL,
+               created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (wallet_id, block_month, signature, event_index, token_mint, side),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           ) WITHOUT ROWID''',
+        # 'dune' rows come aggregated from the Dune query, 'swaps' rows are rebuilt locally from wallet_swaps
+        "ALTER TABLE wallet_transactions ADD COLUMN source TEXT NOT NULL DEFAULT 'dune'",
+    ], []),
+    (14, "Parquet archive partitions of old rows", [
+        '''CREATE TABLE IF NOT EXISTS archive_partitions (
+               wallet_id INTEGER NOT NULL,
+               source_table TEXT NOT NULL,
+               year INTEGER NOT NULL,
+               file_path TEXT NOT NULL,
+               fiat_file_path TEXT NOT NULL,
+               row_count INTEGER NOT NULL,
+               min_created_at TEXT,
+               max_created_at TEXT,
+               last_archive_run INTEGER NOT NULL,
+               archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+               PRIMARY KEY (wallet_id, source_table, year),
+               FOREIGN KEY (wallet_id) REFERENCES wallets (id)
+           )''',
+    ], []),
+    # updated_at moves on every SOLReport for the wallet, so it cannot tell when data was last synced
+    (15, "Start time of each wallet's last successful scheduled sync", [
+        "ALTER TABLE wallets ADD COLUMN last_synced_at INTEGER",
+        '''UPDATE wallets SET last_synced_at = (
+               SELECT MAX(j.started_at) FROM sync_jobs j WHERE j.wallet_id = wallets.id AND j.status = 'done'
+           )''',
+    ], []),
+    # Cutoff epoch of the run that archived each partition: rows a later fetch returns from before it are
+    # already archived
+    (16, "Archive cutoff per partition", [
+        "ALTER TABLE archive_partitions ADD COLUMN archive_cutoff INTEGER",
+    ], []),
+]
+
+
+def apply_migrations(conn):
+    """Apply pending schema migrations, then finish any registered backfills"""
+    cursor = conn.cursor()
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS schema_backfills (
+            name TEXT PRIMARY KEY,
+            table_name TEXT NOT NULL,
+            last_rowid INTEGER NOT NULL DEFAULT 0,
+            completed_at TIMESTAMP
+        )
+    ''')
+    conn.commit()
+
+    cursor.execute('SELECT COALESCE(MAX(version), 0) FROM schema_version')
+    current_version = cursor.fetchone()[0]
+
+    for version, description, statements, backfills in SCHEMA_MIGRATIONS:
+        if version <= current_version:
+            continue
+
+        # DDL is transactional in SQLite, so a failed migration leaves no partial schema behind
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+            # Another process (scheduler, API) may have applied it while this one waited for the lock
+            if cursor.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,)).fetchone():
+                conn.rollback()
+                continue
+            for statement in statements:
+                cursor.execute(statement)
+            for name in backfills:
+                cursor.execute(
+                    'INSERT OR IGNORE INTO schema_backfills (name, table_name) VALUES (?, ?)',
+                    (name, ROW_BACKFILLS[name][0])
+                )
+            cursor.execute(
+                'INSERT INTO schema_version (version, description) VALUES (?, ?)',
+                (version, description)
+            )
+            conn.commit()
+            print(f"✅ Applied schema migration {version}: {description}")
+        except Exception as e:
+            conn.rollback()
+            print(f"❌ Schema migration {version} failed: {e}")
+            raise
+
+    run_pending_backfills(conn)
+
+
+def run_pending_backfills(conn, batch_size=None):
+    """Run unfinished backfills in committed rowid batches, resuming from the last finished batch"""
+    batch_size = batch_size or MIGRATION_BATCH_SIZE
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT name, table_name, last_rowid FROM schema_backfills
+        WHERE completed_at IS NULL
+        ORDER BY rowid
+    ''')
+
+    for name, table_name, last_rowid in cursor.fetchall():
+        statement = ROW_BACKFILLS[name][1]
+        cursor.execute(f'SELECT COALESCE(MAX(rowid), 0) FROM {table_name}')
+        max_rowid = cursor.fetchone()[0]
+
+        if last_rowid < max_rowid:
+            print(f"Backfilling {name}: rows {last_rowid + 1}-{max_rowid} of {table_name}...")
+
+        while True:
+            # Another process may be running the same backfill; under the write lock each batch runs once
+            cursor.execute('BEGIN IMMEDIATE')
+            last_rowid, completed_at = cursor.execute(
+                'SELECT last_rowid, completed_at FROM schema_backfills WHERE name = ?', (name,)).fetchone()
+            if completed_at is not None:
+                conn.commit()
+                break
+            if last_rowid >= max_rowid:
+                cursor.execute('UPDATE schema_backfills SET completed_at = CURRENT_TIMESTAMP WHERE name = ?', (name,))
+                for cleanup in BACKFILL_CLEANUP.get(name, []):
+                    cursor.execute(cleanup)
+                conn.commit()
+                print(f"✅ Backfill {name} complete")
+                break
+
+            upper_rowid = min(last_rowid + batch_size, max_rowid)
+            # Batch and progress marker commit together so a crash never applies a batch twice
+            cursor.execute(statement, (last_rowid, upper_rowid))
+            cursor.execute('UPDATE schema_backfills SET last_rowid = ? WHERE name = ?', (upper_rowid, name))
+            conn.commit()
+
+
+def to_stored_units(df):
+    """Copy of a frame with its display-unit amount columns replaced by the integer columns they are stored in"""
+    df = df.copy()
+    for column, suffix in STORED_AMOUNT_UNITS.items():
+        if column in df.columns:
+            position = df.columns.get_loc(column)
+            units = (pd.to_numeric(df.pop(column)) * AMOUNT_UNITS[suffix]).round().astype('Int64')
+            df.insert(position, column + suffix, units)
+    return df
+
+
+def to_display_units(df):
+    """Copy of a frame with every integer amount column converted to display units under its unsuffixed name.
+
+    Totals are summed exactly in integer units first; this division is the last step before rendering.
+    """
+    df = df.copy()
+    renamed = {}
+    for column in df.columns:
+        suffix = next((suffix for suffix in AMOUNT_UNITS if str(column).endswith(suffix)), None)
+        if suffix is not None:
+            df[column] = pd.to_numeric(df[column]) / AMOUNT_UNITS[suffix]
+            renamed[column] = column[:-len(suffix)]
+    return df.rename(columns=renamed)
+
+
+def apply_row_backfills(conn, table_name, lower_rowid, upper_rowid, commit=True):
+    """Populate derived columns and rollups for freshly inserted rows in (lower_rowid, upper_rowid]"""
+    cursor = conn.cursor()
+    for backfill_table, statement in ROW_BACKFILLS.values():
+        if backfill_table == table_name:
+            cursor.execute(statement, (lower_rowid, upper_rowid))
+    if commit:
+        conn.commit()
+
+
+def reads_archive(method):
+    """Report method decorator: archived rows are visible during the call when its days_back window reaches them"""
+    signature = inspect.signature(method)
+
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        days_back = signature.bind(self, *args, **kwargs).arguments.get('days_back')
+        with self.reading_archive(windows=self.report_archive_windows(days_back)):
+            return method(self, *args, **kwargs)
+    return wrapper
+
+
+# Recorded Dune results and price responses, one gzip-compressed JSON file per query and parameter set
+DUNE_FIXTURES_FOLDER = "dune_fixtures"
+
+
+class RecordReplayClient:
+    """DuneClient wrapper that passes through (live), saves responses as fixtures (record) or serves them offline (replay)"""
+
+    MODES = ('live', 'record', 'replay')
+
+    def __init__(self, client, mode='live', fixtures_folder=DUNE_FIXTURES_FOLDER):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown DUNE_MODE '{mode}', expected one of {', '.join(self.MODES)}")
+        self.client = client
+        self.mode = mode
+        self.fixtures_folder = fixtures_folder
+        if mode != 'live':
+            os.makedirs(fixtures_folder, exist_ok=True)
+            print(f"📼 Dune {mode} mode using fixtures in {fixtures_folder}/")
+
+    def fixture_path(self, name, params):
+        """Fixture file for a query id or URL and its parameters"""
+        key = hashlib.sha1(json.dumps(params, sort_keys=True, default=str).encode('utf-8')).hexdigest()[:16]
+        safe_name = ''.join(char if char.isalnum() else '_' for char in str(name)).strip('_')[-48:]
+        return os.path.join(self.fixtures_folder, f"{safe_name}_{key}.json.gz")
+
+    def load_fixture(self, path):
+        """Read a recorded payload, failing loudly when a replay has nothing recorded"""
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recorded fixture {path}; run once with DUNE_MODE=record")
+        with gzip.open(path, 'rt', encoding='utf-8') as fixture:
+            return json.load(fixture)
+
+    def save_fixture(self, path, payload):
+        """Write a payload atomically so an interrupted recording never leaves a truncated fixture"""
+        with gzip.open(path + '.tmp', 'wt', encoding='utf-8') as fixture:
+            json.dump(payload, fixture, default=str)
+        os.replace(path + '.tmp', path)
+
+    def run_query_dataframe(self, query, performance=''):
+        """Same contract as DuneClient.run_query_dataframe"""
+        params = {param.key: param.value for param in (query.params or [])}
+        path = self.fixture_path(query.query_id, params)
+
+        if self.mode == 'replay':
+            payload = self.load_fixture(path)
+            return pd.DataFrame(payload['data'], columns=payload['columns'])
+
+        df = self.client.run_query_dataframe(query, performance=performance)
+        if self.mode == 'record':
+            # Python floats serialize with full precision; timestamps fall back to strings in save_fixture
+            split = df.to_dict(orient='split', index=False)
+            self.save_fixture(path, {'query_id': query.query_id, 'params': params,
+                                     'recorded_at': datetime.now().isoformat(),
+                                     'columns': split['columns'], 'data': split['data']})
+            print(f"📼 Recorded {len(df)} rows of query {query.query_id} to {path}")
+        return df
+
+    def fetch_json(self, url, params):
+        """GET a JSON API (price lookups), recorded and replayed like Dune queries"""
+        path = self.fixture_path(url, params)
+
+        if self.mode == 'replay':
+            return self.load_fixture(path)['response']
+
+        response = requests.get(url, params=params)
+        response.raise_for_status()
+        if self.mode == 'record':
+            self.save_fixture(path, {'url': url, 'params': params, 'response': response.json()})
+        return response.json()
+
+
+# Report tables the DuckDB engine copies out of final.db; the small lookup tables are re-read on every query
+ANALYTICS_ENGINE_TABLES = ['wallet_transactions', 'sol_transfers']
+ANALYTICS_ENGINE_LOOKUP_TABLES = ['wallets', 'portfolios']
+
+
+class DuckDBSummaryEngine:
+    """Columnar copy of the report tables in DuckDB, for vectorized multi-threaded summaries over many wallets.
+
+    Ingestion keeps writing to SQLite only. The copy is reloaded whenever the wallet data versions
+    change: through DuckDB's sqlite extension when it can be loaded, through pandas otherwise.
+    """
+
+    def __init__(self, db_name, threads=None):
+        if duckdb is None:
+            raise ImportError("ANALYTICS_ENGINE=duckdb needs the duckdb package: pip install duckdb")
+        self.db_name = db_name
+        self.conn = duckdb.connect()
+        if threads:
+            self.conn.execute(f"SET threads = {int(threads)}")
+        self.loaded_version = None
+        try:
+            self.conn.execute("INSTALL sqlite")
+            self.conn.execute("LOAD sqlite")
+            self.conn.execute(f"ATTACH '{db_name.replace(chr(39), chr(39) * 2)}' AS sqlite_db (TYPE sqlite, READ_ONLY)")
+            self.attached = True
+        except duckdb.Error:
+            # The extension is downloaded on first use, which fails offline
+            self.attached = False
+
+    def copy_table(self, sqlite_conn, table_name):
+        if self.attached:
+            self.conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM sqlite_db.{table_name}")
+            return
+        frame = pd.read_sql_query(f"SELECT * FROM {table_name}", sqlite_conn)
+        self.conn.register('sqlite_frame', frame)
+        try:
+            self.conn.execute(f"CREATE OR REPLACE TABLE {table_name} AS SELECT * FROM sqlite_frame")
+        finally:
+            self.conn.unregister('sqlite_frame')
+
+    def refresh(self, sqlite_conn):
+        """Reload the report tables if any wallet's rows changed since the last load"""
+        for table_name in ANALYTICS_ENGINE_LOOKUP_TABLES:
+            self.copy_table(sqlite_conn, table_name)
+
+        data_version = sqlite_conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(version), 0) FROM wallet_data_versions").fetchone()
+        if data_version == self.loaded_version:
+            return
+        started = time.perf_counter()
+        for table_name in ANALYTICS_ENGINE_TABLES:
+            self.copy_table(sqlite_conn, table_name)
+        self.loaded_version = data_version
+        print(f"🦆 Loaded {', '.join(ANALYTICS_ENGINE_TABLES)} into DuckDB in {time.perf_counter() - started:.1f}s")
+
+    def read_query(self, sqlite_conn, query, params=()):
+        """Run a summary query written for SQLite against the current copy"""
+        self.refresh(sqlite_conn)
+        return self.conn.execute(query, list(params)).df()
+
+    def close(self):
+        self.conn.close()
 
 
 class SOLReport:
-    def __init__(self, wallet_address, days_back=15):
+    TRANSACTION_QUERY_ID = 5572790
+    SOL_TRANSFER_QUERY_ID = 5585395
+
+    def __init__(self, wallet_address, days_back=15, db_name="final.db"):
         self.wallet_address = wallet_address
         self.validate_wallet_address()
         self.days_back = days_back
         load_dotenv()
         self.dune_api_key = os.getenv('DUNE_API_KEY')
         self.request_timeout = int(os.getenv('DUNE_API_REQUEST_TIMEOUT'))
-        self.dune = DuneClient(
+        # DUNE_MODE=record saves every Dune/price response as a fixture, replay serves them offline
+        self.dune = RecordReplayClient(DuneClient(
             api_key=self.dune_api_key,
             base_url="https://api.dune.com",
             request_timeout=self.request_timeout
-        )
-        self.TRANSACTION_QUERY_ID = 5572790
+        ), mode=os.getenv('DUNE_MODE', 'live'), fixtures_folder=os.getenv('DUNE_FIXTURES_FOLDER', DUNE_FIXTURES_FOLDER))
 
         self.parameters = [
             QueryParameter.text_type(name='day', value=f'-{self.days_back}'),
             QueryParameter.text_type(name='wallet', value=self.wallet_address)
         ]
-        self.SOL_TRANSFER_QUERY_ID = 5585395
         #
         self.parameters_transfer = [QueryParameter.text_type(name='day', value=f'-{self.days_back}'),
                                  QueryParameter.text_type(name='Wallet', value=self.wallet_address)
@@ -43,11 +851,39 @@ class SOLReport:
 
         self.transaction_df = None
         self.sol_transfers_df= None
-        self.solana_eur_price = self.get_sol_price_eur()
-        self.db_name = "final.db"
+        self.swaps_df = None
+
+        # EUR is always valued: the wallet tables keep their *_eur columns
+        self.currencies = [currency.strip().upper() for currency in
+                           os.getenv('REPORT_CURRENCIES', ','.join(DEFAULT_REPORT_CURRENCIES)).split(',')
+                           if currency.strip()]
+        if 'EUR' not in self.currencies:
+            self.currencies.insert(0, 'EUR')
+        self.sol_prices = self.get_sol_prices(self.currencies)
+        self.solana_eur_price = self.sol_prices['EUR']
+        self.db_name = db_name
+        self.report_header_row = None
+        self.token_cache = OrderedDict()
+        self.summary_cache = {}
+        # True while TEMP views shadow the hot tables with archived rows (see reading_archive)
+        self.archive_shadowed = False
+        # Archive partitions visible while shadowed, part of the summary cache key
+        self.archive_generation_key = ()
+
+        # ANALYTICS_ENGINE=duckdb runs the trade, transfer and portfolio summaries on a DuckDB copy of the tables
+        self.analytics_engine = os.getenv('ANALYTICS_ENGINE', 'sqlite')
+        if self.analytics_engine not in ('sqlite', 'duckdb'):
+            raise ValueError(f"Unknown ANALYTICS_ENGINE '{self.analytics_engine}', expected sqlite or duckdb")
+        self.duckdb_engine = None
+
+        # Dune query returning one row per swap event (SWAP_QUERY_ID in .env); unset disables swap ingestion
+        self.swap_query_id = int(os.getenv('SWAP_QUERY_ID') or 0)
+
+        # Month, quarter and year boundaries of period breakdowns are taken in the client's timezone
+        self.report_timezone = ZoneInfo(os.getenv('REPORT_TIMEZONE', 'UTC'))
 
         # Initialize database connection and create tables
-        self.conn = sqlite3.connect(self.db_name)
+        self.conn = sqlite3.connect(self.db_name, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
         self.create_tables()
         self.wallet_id = self.get_or_create_wallet()
 
@@ -55,6 +891,11 @@ class SOLReport:
         """Create database tables if they don't exist"""
         cursor = self.conn.cursor()
 
+        # Only takes effect on a new database; compact_database switches existing ones
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        # Readers (API, reports) no longer block the scheduler's writers; the mode is stored in the file
+        cursor.execute("PRAGMA journal_mode = WAL")
+
         # Create wallets table
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS wallets (
@@ -128,6 +969,15 @@ class SOLReport:
 
         self.conn.commit()
 
+        # Bring existing databases up to the current schema version
+        apply_migrations(self.conn)
+
+    def get_max_id(self, table_name):
+        """Return the highest id in a table (0 when empty)"""
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table_name}')
+        return cursor.fetchone()[0]
+
     def get_or_create_wallet(self):
         """Get existing wallet ID or create new wallet record"""
         cursor = self.conn.cursor()
@@ -175,6 +1025,22 @@ class SOLReport:
             print(f"Error fetching SOL price: {e}")
             return 0  # Default fallback
 
+    def get_sol_prices(self, currencies):
+        """Fetch current SOL prices for several fiat currencies in one CoinGecko call"""
+        try:
+            url = "https://api.coingecko.com/api/v3/simple/price"
+            params = {
+                "ids": "solana",
+                "vs_currencies": ",".join(currency.lower() for currency in currencies)
+            }
+            quotes = self.dune.fetch_json(url, params)['solana']
+            prices = {currency: quotes.get(currency.lower(), 0) for currency in currencies}
+            print("Current SOL prices: " + ", ".join(f"{currency} {price}" for currency, price in prices.items()))
+            return prices
+        except Exception as e:
+            print(f"Error fetching SOL prices: {e}")
+            return {currency: 0 for currency in currencies}  # Default fallback
+
     def validate_wallet_address(self):
         """Validate Solana wallet address format"""
         if not self.wallet_address or len(self.wallet_address) < 32:
@@ -290,6 +1156,7 @@ class SOLReport:
 
         # Apply formatting to the combined sheet
         self.apply_combined_formatting_integrated(combined_sheet, transaction_start_row)
+        self.report_header_row = transaction_start_row
 
         # Remove original sheets
         del workbook['Summary']
@@ -304,30 +1171,46 @@ class SOLReport:
     def apply_combined_formatting_integrated(self, worksheet, transaction_start_row):
         """Apply formatting to the combined sheet - integrated version"""
 
-        # Define color fills
-        brown_fill = PatternFill(start_color="A52A2A", end_color="A52A2A", fill_type="solid")
-        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
-        gold_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
-
         # Apply basic formatting to all cells
-        for row in worksheet.iter_rows(min_row=1, max_row=worksheet.max_row, min_col=1, max_col=worksheet.max_column):
+        self.apply_cell_borders(worksheet, 1, worksheet.max_row, header_rows=(1, transaction_start_row))
+
+        # Adjust column widths
+        for column_cells in worksheet.columns:
+            length = max(len(str(cell.value or '')) for cell in column_cells)
+            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 50)
+
+        # Format summary data (row 2)
+        self.format_summary_pnl_cell(worksheet, self.find_summary_columns(worksheet))
+
+        # Find transaction columns (transaction_start_row)
+        transaction_cols = self.find_transaction_columns(worksheet, transaction_start_row)
+
+        # Format dexscreener column width
+        if 'dexscreener' in transaction_cols:
+            dexscreener_column_letter = get_column_letter(transaction_cols['dexscreener'])
+            worksheet.column_dimensions[dexscreener_column_letter].width = 20
+
+        # Format transaction data (starting from transaction_start_row + 1)
+        self.format_transaction_rows(worksheet, transaction_cols, transaction_start_row + 1)
+
+        print("✅ Combined sheet formatting applied successfully!")
+
+    @staticmethod
+    def apply_cell_borders(worksheet, min_row, max_row, header_rows=()):
+        """Thin borders and centered alignment for a row range, bolding the given header rows"""
+        for row in worksheet.iter_rows(min_row=min_row, max_row=max_row, min_col=1, max_col=worksheet.max_column):
             for cell in row:
                 cell.border = Border(left=Side(style='thin'), right=Side(style='thin'),
                                      top=Side(style='thin'), bottom=Side(style='thin'))
                 cell.alignment = Alignment(horizontal="center", vertical="center")
 
                 # Bold headers (summary header = row 1, transaction header = transaction_start_row)
-                if cell.row == 1 or cell.row == transaction_start_row:
+                if cell.row in header_rows:
                     cell.font = Font(bold=True)
 
-        # Adjust column widths
-        for column_cells in worksheet.columns:
-            length = max(len(str(cell.value or '')) for cell in column_cells)
-            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 50)
-
-        # Find summary columns (row 1)
+    @staticmethod
+    def find_summary_columns(worksheet):
+        """Locate the summary columns used by the PnL highlight (header in row 1)"""
         summary_cols = {}
         for cell in worksheet[1]:  # Row 1
             if cell.value:
@@ -340,10 +1223,13 @@ class SOLReport:
                     summary_cols['pnl_r'] = cell.column
                 elif 'pnl_realized_losses' in col_name:
                     summary_cols['pnl_l'] = cell.column
+        return summary_cols
 
-        # Find transaction columns (transaction_start_row)
+    @staticmethod
+    def find_transaction_columns(worksheet, header_row):
+        """Locate the transaction columns that carry conditional formatting"""
         transaction_cols = {}
-        for cell in worksheet[transaction_start_row]:
+        for cell in worksheet[header_row]:
             if cell.value:
                 col_name = str(cell.value).lower()
                 if 'delta_sol' in col_name:
@@ -358,8 +1244,14 @@ class SOLReport:
                     transaction_cols['outcome'] = cell.column
                 elif 'incoming' in col_name:
                     transaction_cols['incoming'] = cell.column
+        return transaction_cols
+
+    @staticmethod
+    def format_summary_pnl_cell(worksheet, summary_cols):
+        """Gold when realized profits exceed the total spent, red otherwise"""
+        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+        gold_fill = PatternFill(start_color="FFD700", end_color="FFD700", fill_type="solid")
 
-        # Format summary data (row 2)
         if 'total_spent_amount' in summary_cols and 'pnl_r' in summary_cols:
             total_spent_cell = worksheet.cell(row=2, column=summary_cols['total_spent_amount'])
             pnl_r_cell = worksheet.cell(row=2, column=summary_cols['pnl_r'])
@@ -375,15 +1267,19 @@ class SOLReport:
                 except (ValueError, TypeError):
                     pass
 
-        # Format dexscreener column width
-        if 'dexscreener' in transaction_cols:
-            dexscreener_column_letter = get_column_letter(transaction_cols['dexscreener'])
-            worksheet.column_dimensions[dexscreener_column_letter].width = 20
+    @staticmethod
+    def format_transaction_rows(worksheet, transaction_cols, min_row, max_row=None):
+        """Colour delta/percentage/buys cells and turn Dexscreener URLs into links from min_row down (to max_row)"""
+
+        # Define color fills
+        brown_fill = PatternFill(start_color="A52A2A", end_color="A52A2A", fill_type="solid")
+        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+        yellow_fill = PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid")
 
-        # Format transaction data (starting from transaction_start_row + 1)
         required_cols = ['delta_sol', 'delta_percentage']
         if all(col in transaction_cols for col in required_cols):
-            for row in worksheet.iter_rows(min_row=transaction_start_row + 1):
+            for row in worksheet.iter_rows(min_row=min_row, max_row=max_row):
                 if len(row) == 0:
                     continue
 
@@ -424,7 +1320,334 @@ class SOLReport:
                 except (ValueError, TypeError, IndexError):
                     continue  # Skip problematic rows
 
-        print("✅ Combined sheet formatting applied successfully!")
+    """-----------------------------COMPACT FRAME NORMALIZATION-----------------------------------------------------"""
+
+    DEXSCREENER_URL = "https://dexscreener.com/solana/"
+    SOLSCAN_TX_URL = "https://solscan.io/tx/"
+
+    @staticmethod
+    def frame_memory_mb(df):
+        """Deep memory footprint of a DataFrame in MB"""
+        return df.memory_usage(deep=True).sum() / (1024 ** 2)
+
+    @staticmethod
+    def parse_durations(durations):
+        """Parse Dune duration strings like '1h 3m 7s' into timedelta64 (NaT when unparseable)"""
+        parts = durations.astype('string').str.extract(
+            r'^\s*(?:(\d+)d)?\s*(?:(\d+)h)?\s*(?:(\d+)m)?\s*(?:(\d+)s)?\s*$'
+        ).astype(float)
+        seconds = parts[0].fillna(0) * 86400 + parts[1].fillna(0) * 3600 + parts[2].fillna(0) * 60 + parts[3].fillna(0)
+        # A row that matched none of the groups was not a duration string
+        seconds = seconds.where(parts.notna().any(axis=1))
+        return pd.to_timedelta(seconds, unit='s')
+
+    @staticmethod
+    def format_durations(durations):
+        """Render timedelta64 values back to Dune's compact '1h 3m 7s' text"""
+        components = durations.dt.components
+        text = pd.Series('', index=durations.index)
+        for column, unit in (('days', 'd'), ('hours', 'h'), ('minutes', 'm'), ('seconds', 's')):
+            value = components[column]
+            text = text.where(value.fillna(0) == 0, text + value.fillna(0).astype(int).astype(str) + unit + ' ')
+        text = text.str.strip().replace('', '0s')
+        return text.where(durations.notna())
+
+    @staticmethod
+    def parse_block_times(block_times):
+        """Parse Dune block times ('14.08.2025' or ISO with UTC suffix) into naive UTC datetime64"""
+        parsed = pd.to_datetime(block_times, format='%d.%m.%Y', errors='coerce')
+        fallback = parsed.isna() & block_times.notna()
+        if fallback.any():
+            parsed[fallback] = pd.to_datetime(block_times[fallback], utc=True, errors='coerce').dt.tz_localize(None)
+        return parsed
+
+    def build_dexscreener_links(self, mints):
+        """Dexscreener pair links for this wallet from a string Series of token mints"""
+        return self.DEXSCREENER_URL + mints + '?maker=' + self.wallet_address
+
+    def normalize_transaction_frame(self):
+        """Convert the fetched transaction frame to compact dtypes and drop the derivable URL column"""
+        df = self.transaction_df
+        if df is None or df.empty:
+            return
+
+        memory_before = self.frame_memory_mb(df)
+
+        if 'token_symbol' in df.columns:
+            df['token_symbol'] = df['token_symbol'].astype('category')
+
+        # The Dexscreener link is rebuilt from the mint and the wallet address when the frame is persisted
+        if 'dexscreener' in df.columns:
+            links = df['dexscreener'].astype('string')
+            mints = links.str.extract(r'/solana/([^/?#]+)', expand=False)
+            if (self.build_dexscreener_links(mints) == links).fillna(links.isna()).all():
+                position = df.columns.get_loc('dexscreener')
+                df.insert(position, 'token_mint', mints.astype('category'))
+                df.drop(columns=['dexscreener'], inplace=True)
+
+        if 'block_time' in df.columns:
+            df['block_time'] = self.parse_block_times(df['block_time'])
+
+        # time_traded is a holding duration, not a timestamp; keep the text if any value is not a duration
+        if 'time_traded' in df.columns:
+            durations = self.parse_durations(df['time_traded'])
+            if durations.notna().sum() == df['time_traded'].notna().sum():
+                df['time_traded'] = durations
+
+        for column in ('number_buys', 'number_sells'):
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], downcast='integer')
+
+        # Ratios only feed colouring and display; SOL/EUR amounts stay float64 for exact-enough totals
+        if 'delta_percentage' in df.columns:
+            df['delta_percentage'] = df['delta_percentage'].astype('float32')
+
+        memory_after = self.frame_memory_mb(df)
+        print(f"🗜️ Transaction frame memory: {memory_before:.2f} MB -> {memory_after:.2f} MB")
+
+    def normalize_sol_transfers_frame(self):
+        """Convert the fetched SOL transfers frame to compact dtypes and drop the derivable URL column"""
+        df = self.sol_transfers_df
+        if df is None or df.empty:
+            return
+
+        memory_before = self.frame_memory_mb(df)
+
+        for column in ('from_owner', 'to_owner', 'transaction_label'):
+            if column in df.columns:
+                df[column] = df[column].astype('category')
+
+        if 'block_month' in df.columns:
+            df['block_month'] = pd.to_datetime(df['block_month'], errors='coerce')
+
+        # Keep only the signature; the Solscan link is rebuilt when the frame is persisted
+        if 'solscan_link' in df.columns:
+            links = df['solscan_link'].astype('string')
+            if links.str.startswith(self.SOLSCAN_TX_URL).fillna(True).all():
+                position = df.columns.get_loc('solscan_link')
+                df.insert(position, 'signature', links.str.slice(len(self.SOLSCAN_TX_URL)))
+                df.drop(columns=['solscan_link'], inplace=True)
+
+        memory_after = self.frame_memory_mb(df)
+        print(f"🗜️ SOL transfers frame memory: {memory_before:.2f} MB -> {memory_after:.2f} MB")
+
+    def restore_transaction_columns(self, df):
+        """Return a copy of a normalized transaction frame in the database/Excel column layout"""
+        df = df.copy()
+
+        if 'token_mint' in df.columns:
+            links = self.build_dexscreener_links(df['token_mint'].astype('string')).astype(object)
+            df.insert(df.columns.get_loc('token_mint'), 'dexscreener', links)
+            df.drop(columns=['token_mint'], inplace=True)
+
+        if 'token_symbol' in df.columns:
+            df['token_symbol'] = df['token_symbol'].astype(object)
+
+        if 'time_traded' in df.columns and pd.api.types.is_timedelta64_dtype(df['time_traded']):
+            df['time_traded'] = self.format_durations(df['time_traded'])
+
+        if 'block_time' in df.columns and pd.api.types.is_datetime64_any_dtype(df['block_time']):
+            df['block_time'] = df['block_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+
+        return df
+
+    def restore_sol_transfers_columns(self, df):
+        """Return a copy of a normalized SOL transfers frame in the database/Excel column layout"""
+        df = df.copy()
+
+        if 'signature' in df.columns:
+            links = (self.SOLSCAN_TX_URL + df['signature'].astype('string')).astype(object)
+            df.insert(df.columns.get_loc('signature'), 'solscan_link', links)
+            df.drop(columns=['signature'], inplace=True)
+
+        for column in ('from_owner', 'to_owner', 'transaction_label'):
+            if column in df.columns:
+                df[column] = df[column].astype(object)
+
+        if 'block_month' in df.columns and pd.api.types.is_datetime64_any_dtype(df['block_month']):
+            df['block_month'] = df['block_month'].dt.strftime('%Y-%m-%d')
+
+        return df
+
+    """-----------------------------MULTI-CURRENCY VALUATION-----------------------------------------------------"""
+
+    # Source table -> (SQL expression for the pricing date, SOL amounts to value, stored as <name>_lamports)
+    VALUATION_SOURCES = {
+        'wallet_transactions': ("date(block_time_epoch, 'unixepoch')", ['spent_amount', 'earned_amount']),
+        # Transfers only carry their month, so they are priced on the first day of it
+        'sol_transfers': ("substr(block_month, 1, 10)", ['sol_amount']),
+    }
+
+    def fetch_sol_price_history(self, currency, start_date, end_date):
+        """Fetch daily SOL closing prices for one currency from CoinGecko as {price_date: price}"""
+        try:
+            url = "https://api.coingecko.com/api/v3/coins/solana/market_chart/range"
+            params = {
+                "vs_currency": currency.lower(),
+                "from": int(pd.Timestamp(start_date).timestamp()),
+                "to": int(pd.Timestamp(end_date).timestamp()) + 86400
+            }
+            prices = pd.DataFrame(self.dune.fetch_json(url, params).get('prices', []), columns=['timestamp', 'price'])
+            if prices.empty:
+                return {}
+
+            prices['price_date'] = pd.to_datetime(prices['timestamp'], unit='ms').dt.strftime('%Y-%m-%d')
+            return prices.groupby('price_date')['price'].last().to_dict()
+        except Exception as e:
+            print(f"Error fetching SOL/{currency} price history: {e}")
+            return {}
+
+    def read_cached_sol_prices(self, price_dates, currencies):
+        """Read cached daily SOL prices as a price_date x currency frame (NaN where missing)"""
+        placeholders = ','.join('?' for _ in currencies)
+        cached = pd.read_sql_query(f"""
+            SELECT price_date, currency, price
+            FROM sol_price_history
+            WHERE currency IN ({placeholders}) AND price_date BETWEEN ? AND ?
+        """, self.conn, params=[*currencies, price_dates[0], price_dates[-1]])
+
+        return (cached.pivot(index='price_date', columns='currency', values='price')
+                .reindex(index=price_dates, columns=currencies))
+
+    def load_historical_sol_prices(self, price_dates, currencies):
+        """Daily SOL prices for the given dates, filling the SQLite cache from CoinGecko on a miss"""
+        price_dates = sorted({price_date for price_date in price_dates if isinstance(price_date, str)})
+        if not price_dates:
+            return pd.DataFrame(columns=currencies, dtype=float)
+
+        rates = self.read_cached_sol_prices(price_dates, currencies)
+        # Today's price is still moving, so it is never cached
+        today = datetime.utcnow().strftime('%Y-%m-%d')
+
+        cursor = self.conn.cursor()
+        for currency in currencies:
+            missing_dates = [price_date for price_date in rates.index[rates[currency].isna()] if price_date < today]
+            if not missing_dates:
+                continue
+
+            history = self.fetch_sol_price_history(currency, missing_dates[0], missing_dates[-1])
+            history = {price_date: float(price) for price_date, price in history.items() if price_date < today}
+            cursor.executemany(
+                'INSERT OR REPLACE INTO sol_price_history (price_date, currency, price) VALUES (?, ?, ?)',
+                [(price_date, currency, price) for price_date, price in history.items()]
+            )
+            self.conn.commit()
+
+            rates[currency] = rates[currency].fillna(pd.Series(history, dtype=float))
+
+        return rates
+
+    @staticmethod
+    def broadcast_valuation(amounts, rates):
+        """Value (n, m) SOL amounts at per-row (n, k) rates in one broadcast: returns (n, m, k)"""
+        return amounts[:, :, np.newaxis] * rates[:, np.newaxis, :]
+
+    def update_fiat_valuations(self, currencies=None):
+        """Value this wallet's trades and transfers in every report currency as long-form rows.
+
+        Only rows missing a valuation in one of the currencies are priced, so adding a currency
+        values the stored history without re-fetching anything from Dune.
+        """
+        currencies = currencies or self.currencies
+        placeholders = ','.join('?' for _ in currencies)
+        spot_rates = np.array([self.sol_prices.get(currency) or np.nan for currency in currencies], dtype=float)
+        cursor = self.conn.cursor()
+
+        for table_name, (date_expression, amount_columns) in self.VALUATION_SOURCES.items():
+            rows = pd.read_sql_query(f"""
+                SELECT src.id AS source_id, {date_expression} AS price_date,
+                       {', '.join(f'{column}_lamports' for column in amount_columns)}
+                FROM {table_name} src
+                WHERE src.wallet_id = ?
+                  AND (SELECT COUNT(*) FROM fiat_valuations fv
+                       WHERE fv.source_table = ? AND fv.source_id = src.id
+                         AND fv.currency IN ({placeholders})) < ?
+            """, self.conn, params=[self.wallet_id, table_name, *currencies, len(currencies)])
+
+            if rows.empty:
+                continue
+
+            history = self.load_historical_sol_prices(rows['price_date'], currencies)
+            rates = history.reindex(rows['price_date']).to_numpy(dtype=float)
+            # Dates CoinGecko cannot serve (today, or outside its history window) use the spot price
+            rates = np.where(np.isnan(rates), spot_rates[np.newaxis, :], rates)
+
+            # Each value is rounded to whole cents once; every total is then an exact integer sum
+            lamports = rows[[f'{column}_lamports' for column in amount_columns]].to_numpy(dtype=float)
+            values = np.rint(self.broadcast_valuation(lamports, rates) * CENTS_PER_UNIT / LAMPORTS_PER_SOL)
+
+            # Flatten (n, m, k) to one row per (source row, currency)
+            row_count, currency_count = len(rows), len(currencies)
+            valuations = pd.DataFrame(
+                values.transpose(0, 2, 1).reshape(row_count * currency_count, len(amount_columns)),
+                columns=[f'{column}_value_cents' for column in amount_columns]
+            )
+            valuations.insert(0, 'source_table', table_name)
+            valuations.insert(1, 'source_id', np.repeat(rows['source_id'].to_numpy(), currency_count))
+            valuations.insert(2, 'wallet_id', self.wallet_id)
+            valuations.insert(3, 'currency', np.tile(currencies, row_count))
+            valuations.insert(4, 'price_date', np.repeat(rows['price_date'].to_numpy(), currency_count))
+            valuations.insert(5, 'sol_price', rates.reshape(-1))
+
+            placeholders_row = ','.join('?' for _ in valuations.columns)
+            cursor.executemany(
+                f"INSERT OR REPLACE INTO fiat_valuations ({', '.join(valuations.columns)}) VALUES ({placeholders_row})",
+                valuations.astype(object).where(valuations.notna(), None).itertuples(index=False, name=None)
+            )
+            self.conn.commit()
+            print(f"💱 Valued {row_count} {table_name} rows in {', '.join(currencies)}")
+
+    @reads_archive
+    def generate_fiat_summary_from_db(self, days_back=None):
+        """Trade totals per report currency from the long-form valuations, one row per currency"""
+        if days_back is None:
+            days_back = self.days_back
+        placeholders = ','.join('?' for _ in self.currencies)
+
+        query = f"""
+            SELECT
+                fv.currency,
+                SUM(fv.spent_amount_value_cents) AS total_spent_cents,
+                SUM(fv.earned_amount_value_cents) AS total_earned_cents,
+                SUM(fv.earned_amount_value_cents - fv.spent_amount_value_cents) AS actual_profit_cents,
+                SUM(CASE WHEN wt.delta_percentage > 0 THEN fv.earned_amount_value_cents - fv.spent_amount_value_cents ELSE 0 END) AS pnl_realized_profits_cents,
+                SUM(CASE WHEN wt.delta_percentage < 0 THEN fv.earned_amount_value_cents - fv.spent_amount_value_cents ELSE 0 END) AS pnl_realized_losses_cents
+            FROM fiat_valuations fv
+            JOIN wallet_transactions wt ON wt.id = fv.source_id
+            WHERE fv.wallet_id = ? AND fv.source_table = 'wallet_transactions' AND fv.currency IN ({placeholders})
+        """
+        params = [self.wallet_id, *self.currencies]
+
+        if days_back:
+            query += f" AND wt.created_at >= datetime('now', '-{days_back} days')"
+
+        query += " GROUP BY fv.currency ORDER BY fv.currency"
+        return to_display_units(pd.read_sql_query(query, self.conn, params=params))
+
+    @reads_archive
+    def generate_sol_transfers_fiat_summary_from_db(self, days_back=None):
+        """SOL transfer totals per report currency from the long-form valuations"""
+        if days_back is None:
+            days_back = self.days_back
+        placeholders = ','.join('?' for _ in self.currencies)
+
+        query = f"""
+            SELECT
+                fv.currency,
+                SUM(CASE WHEN st.transaction_label = 'Sent' THEN fv.sol_amount_value_cents ELSE 0 END) AS total_sent_cents,
+                SUM(CASE WHEN st.transaction_label = 'Received' THEN fv.sol_amount_value_cents ELSE 0 END) AS total_received_cents
+            FROM fiat_valuations fv
+            JOIN sol_transfers st ON st.id = fv.source_id
+            WHERE fv.wallet_id = ? AND fv.source_table = 'sol_transfers' AND fv.currency IN ({placeholders})
+              AND st.is_internal = 0
+        """
+        params = [self.wallet_id, *self.currencies]
+
+        if days_back:
+            query += f" AND st.created_at >= datetime('now', '-{days_back} days')"
+
+        query += " GROUP BY fv.currency ORDER BY fv.currency"
+        return to_display_units(pd.read_sql_query(query, self.conn, params=params))
 
     """-----------------------------FETCHING SOL TRANSFERS DATA-----------------------------------------------------"""
 
@@ -434,6 +1657,7 @@ class SOLReport:
 
         self.sol_transfers_df = self.dune.run_query_dataframe(sol_transfers_query, performance='')
         self.sol_transfers_df.columns = [col.lower() for col in self.sol_transfers_df.columns]
+        self.normalize_sol_transfers_frame()
 
         # Calculate EUR values
         if not self.sol_transfers_df.empty:
@@ -442,8 +1666,11 @@ class SOLReport:
 
 
 
-    def get_sol_transfers_from_db(self, days_back=None):
-        """Get SOL transfers data from database"""
+    def get_sol_transfers_from_db(self, days_back=None, after_id=None, chunksize=None):
+        """Get SOL transfers data from database (only rows added after after_id when given).
+
+        With chunksize, returns an iterator of frames of that many rows instead of one frame.
+        """
         query = """
             SELECT 
                 wallet_id,
@@ -451,8 +1678,8 @@ class SOLReport:
                 block_month,
                 from_owner,
                 to_owner,
-                sol_amount,
-                sol_amount_eur,
+                sol_amount_lamports,
+                sol_amount_eur_cents,
                 transaction_label,
                 solscan_link
             FROM sol_transfers 
@@ -463,9 +1690,16 @@ class SOLReport:
         if days_back:
             query += f" AND created_at >= datetime('now', '-{days_back} days')"
 
-        query += " ORDER BY created_at DESC"
+        if after_id is not None:
+            query += " AND id > ?"
+            params.append(after_id)
+
+        query += " ORDER BY created_at DESC, id DESC"
 
-        return pd.read_sql_query(query, self.conn, params=params)
+        if chunksize:
+            return (to_display_units(chunk)
+                    for chunk in pd.read_sql_query(query, self.conn, params=params, chunksize=chunksize))
+        return to_display_units(pd.read_sql_query(query, self.conn, params=params))
 
     def save_sol_transfers_to_database(self):
         """Save SOL transfers data to SQLite database using chunked insertion"""
@@ -480,6 +1714,12 @@ class SOLReport:
             self.sol_transfers_df['wallet_id'] = self.wallet_id
             print(f"Added wallet_id {self.wallet_id} to SOL transfers dataframe")
 
+            self.sol_transfers_df = self.quarantine_invalid_rows('sol_transfers', self.sol_transfers_df,
+                                                                 self.restore_sol_transfers_columns)
+            if self.sol_transfers_df.empty:
+                print("❌ No valid SOL transfers to save - every row was quarantined")
+                return False
+
             # Debug: Check dataframe before saving
             print("SOL Transfers DataFrame info before saving:")
             print(f"Shape: {self.sol_transfers_df.shape}")
@@ -493,10 +1733,11 @@ class SOLReport:
             print(f"Using chunk size of {chunk_size} rows (with {num_columns} columns)")
 
             # Split DataFrame into chunks and save each chunk
-            total_rows = len(self.sol_transfers_df)
-            chunks = [self.sol_transfers_df[i:i + chunk_size] for i in range(0, total_rows, chunk_size)]
+            rows = self.drop_archived_rows('sol_transfers', self.restore_sol_transfers_columns(self.sol_transfers_df))
+            chunks = [to_stored_units(rows[i:i + chunk_size]) for i in range(0, len(rows), chunk_size)]
 
             print(f"Saving {len(chunks)} chunks...")
+            first_id = self.get_max_id('sol_transfers')
 
             for i, chunk in enumerate(chunks, 1):
                 try:
@@ -528,12 +1769,20 @@ class SOLReport:
             self.conn.commit()
             print(f"✅ All SOL transfers data successfully saved to database for wallet ID: {self.wallet_id}")
 
+            # Fill signatures for the new rows, then re-check transfers against the wallet's portfolio
+            apply_row_backfills(self.conn, 'sol_transfers', first_id, self.get_max_id('sol_transfers'))
+            portfolio_name = self.get_wallet_portfolio_name()
+            if portfolio_name:
+                self.detect_internal_transfers(portfolio_name)
+
             # Verify data was actually saved
             cursor = self.conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM sol_transfers WHERE wallet_id = ?", (self.wallet_id,))
             count = cursor.fetchone()[0]
             print(f"✅ Verification: {count} SOL transfer records found in database for wallet ID: {self.wallet_id}")
 
+            self.update_fiat_valuations()
+
             return True
 
         except Exception as e:
@@ -545,40 +1794,51 @@ class SOLReport:
             self.conn.rollback()
             return False
 
-    def generate_sol_transfers_summary_from_db(self, days_back=None):
-        """Generate SOL transfers summary from database"""
-        query = """
-            SELECT 
-                w.wallet_address,
+    # Aggregate columns shared by the per-wallet and the portfolio SOL transfers summaries
+    SOL_TRANSFERS_SUMMARY_AGGREGATES = """
                 COUNT(*) as total_transactions,
-                SUM(CASE WHEN st.transaction_label = 'Sent' THEN st.sol_amount ELSE 0 END) as total_sent_sol,
-                SUM(CASE WHEN st.transaction_label = 'Received' THEN st.sol_amount ELSE 0 END) as total_received_sol,
-                SUM(CASE WHEN st.transaction_label = 'Sent' THEN st.sol_amount_eur ELSE 0 END) as total_sent_eur,
-                SUM(CASE WHEN st.transaction_label = 'Received' THEN st.sol_amount_eur ELSE 0 END) as total_received_eur,
+                SUM(CASE WHEN st.transaction_label = 'Sent' THEN st.sol_amount_lamports ELSE 0 END) as total_sent_sol_lamports,
+                SUM(CASE WHEN st.transaction_label = 'Received' THEN st.sol_amount_lamports ELSE 0 END) as total_received_sol_lamports,
+                SUM(CASE WHEN st.transaction_label = 'Sent' THEN st.sol_amount_eur_cents ELSE 0 END) as total_sent_eur_cents,
+                SUM(CASE WHEN st.transaction_label = 'Received' THEN st.sol_amount_eur_cents ELSE 0 END) as total_received_eur_cents,
                 COUNT(CASE WHEN st.transaction_label = 'Sent' THEN 1 END) as sent_count,
                 COUNT(CASE WHEN st.transaction_label = 'Received' THEN 1 END) as received_count
+    """
+
+    SOL_TRANSFERS_SUMMARY_QUERY = f"""
+            SELECT 
+                w.wallet_address,{SOL_TRANSFERS_SUMMARY_AGGREGATES}
             FROM sol_transfers st
             JOIN wallets w ON st.wallet_id = w.id
-            WHERE st.wallet_id = ?
+            WHERE st.wallet_id = ? AND st.is_internal = 0
         """
 
+    @reads_archive
+    def generate_sol_transfers_summary_from_db(self, days_back=None):
+        """Generate SOL transfers summary from database"""
+        query = self.SOL_TRANSFERS_SUMMARY_QUERY
+
         params = [self.wallet_id]
         days_back=self.days_back
+        cached, data_version = self.get_cached_summary('sol_transfers_summary', days_back)
+        if cached is not None:
+            return cached
 
         if days_back:
-            query += f" AND st.created_at >= datetime('now', '-{days_back} days')"
+            query += " AND st.created_at >= ?"
+            params.append(self.created_at_cutoff(days_back))
 
         query += " GROUP BY w.wallet_address"
 
         # return pd.read_sql_query(query, self.conn, params=params)
-        summary_df = pd.read_sql_query(query, self.conn, params=params)
+        summary_df = to_display_units(self.read_summary_query(query, params))
 
         if days_back:
             summary_df['time_period_days'] = days_back
         else:
             summary_df['time_period_days'] = days_back   #All time string before
 
-        return summary_df
+        return self.store_cached_summary('sol_transfers_summary', days_back, data_version, summary_df)
 
 
 
@@ -644,6 +1904,7 @@ class SOLReport:
 
         # Apply SOL-specific formatting
         self.apply_sol_transfers_specific_formatting(combined_sheet, transfers_start_row)
+        self.report_header_row = transfers_start_row
 
         # Remove original sheets
         del workbook['SOL Transfers Summary']
@@ -656,29 +1917,25 @@ class SOLReport:
     def apply_sol_transfers_specific_formatting(self, worksheet, transfers_start_row):
         """Apply specific formatting for SOL transfers"""
 
-        # Define colors
-        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
-        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
-
         # Apply basic formatting
-        for row in worksheet.iter_rows(min_row=1, max_row=worksheet.max_row, min_col=1, max_col=worksheet.max_column):
-            for cell in row:
-                cell.border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                                     top=Side(style='thin'), bottom=Side(style='thin'))
-                cell.alignment = Alignment(horizontal="center", vertical="center")
-
-                # Bold headers
-                if cell.row == 1 or cell.row == transfers_start_row:
-                    cell.font = Font(bold=True)
+        self.apply_cell_borders(worksheet, 1, worksheet.max_row, header_rows=(1, transfers_start_row))
 
         # Adjust column widths
         for column_cells in worksheet.columns:
             length = max(len(str(cell.value or '')) for cell in column_cells)
             worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 50)
 
-        # Find columns for SOL transfers
+        # Format transfer data
+        transfer_cols = self.find_transfer_columns(worksheet, transfers_start_row)
+        self.format_transfer_rows(worksheet, transfer_cols, transfers_start_row + 1)
+
+        print("✅ SOL transfers specific formatting applied!")
+
+    @staticmethod
+    def find_transfer_columns(worksheet, header_row):
+        """Locate the SOL transfer columns that carry conditional formatting"""
         transfer_cols = {}
-        for cell in worksheet[transfers_start_row]:
+        for cell in worksheet[header_row]:
             if cell.value:
                 col_name = str(cell.value).lower()
                 if 'transaction_label' in col_name:
@@ -687,9 +1944,17 @@ class SOLReport:
                     transfer_cols['solscan_link'] = cell.column
                 elif 'sol_amount' in col_name and 'eur' not in col_name:
                     transfer_cols['sol_amount'] = cell.column
+        return transfer_cols
 
-        # Format transfer data
-        for row in worksheet.iter_rows(min_row=transfers_start_row + 1):
+    @staticmethod
+    def format_transfer_rows(worksheet, transfer_cols, min_row, max_row=None):
+        """Colour Sent/Received rows and turn Solscan URLs into links from min_row down (to max_row)"""
+
+        # Define colors
+        green_fill = PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid")
+        red_fill = PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid")
+
+        for row in worksheet.iter_rows(min_row=min_row, max_row=max_row):
             if len(row) == 0:
                 continue
 
@@ -718,8 +1983,6 @@ class SOLReport:
             except (ValueError, TypeError, IndexError):
                 continue
 
-        print("✅ SOL transfers specific formatting applied!")
-
     def save_sol_transfers_to_excel(self):
         """Save SOL transfers data to Excel (from fetched data)"""
         # Update filename for SOL transfers
@@ -731,6 +1994,14 @@ class SOLReport:
         # Get summary from database
         sol_transfers_summary_df = self.generate_sol_transfers_summary_from_db()
 
+        if len(self.sol_transfers_df) > self.REPORT_SHEET_MAX_ROWS:
+            chunk_rows = self.REPORT_STREAM_CHUNK_ROWS
+            self.write_sharded_report(
+                'sol_transfers', sol_transfers_summary_df, self.generate_sol_transfers_fiat_summary_from_db(),
+                (self.restore_sol_transfers_columns(self.sol_transfers_df.iloc[i:i + chunk_rows])
+                 for i in range(0, len(self.sol_transfers_df), chunk_rows)))
+            return
+
         with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
             # Write SOL transfers summary
             if not sol_transfers_summary_df.empty:
@@ -738,14 +2009,29 @@ class SOLReport:
 
             # Write SOL transfers details using fetched DataFrame
             if hasattr(self, 'sol_transfers_df') and not self.sol_transfers_df.empty:
-                self.sol_transfers_df.to_excel(writer, sheet_name='SOL Transfers', index=False)
+                self.restore_sol_transfers_columns(self.sol_transfers_df).to_excel(
+                    writer, sheet_name='SOL Transfers', index=False)
+
+            # Per-currency totals from the long-form valuations
+            fiat_summary_df = self.generate_sol_transfers_fiat_summary_from_db()
+            if not fiat_summary_df.empty:
+                fiat_summary_df.to_excel(writer, sheet_name='Fiat Summary', index=False)
         self.apply_sol_transfers_formatting()
 
+    @reads_archive
     def save_sol_transfers_excel_from_db(self, days_back=None):
         """Save SOL transfers Excel report using only database data"""
+        sol_transfers_summary_df = self.generate_sol_transfers_summary_from_db(days_back=days_back)
+
+        if self.get_report_row_window('sol_transfers', days_back)[0] > self.REPORT_SHEET_MAX_ROWS:
+            self.write_sharded_report(
+                'sol_transfers', sol_transfers_summary_df,
+                self.generate_sol_transfers_fiat_summary_from_db(days_back=days_back),
+                self.get_sol_transfers_from_db(days_back=days_back, chunksize=self.REPORT_STREAM_CHUNK_ROWS))
+            return
+
         # Get SOL transfers data from database
         sol_transfers_df = self.get_sol_transfers_from_db(days_back=days_back)
-        sol_transfers_summary_df = self.generate_sol_transfers_summary_from_db(days_back=days_back)
 
         with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
             # Write SOL transfers summary
@@ -755,23 +2041,29 @@ class SOLReport:
             # Write SOL transfers details from database
             if not sol_transfers_df.empty:
                 sol_transfers_df.to_excel(writer, sheet_name='SOL Transfers', index=False)
+
+            # Per-currency totals from the long-form valuations
+            fiat_summary_df = self.generate_sol_transfers_fiat_summary_from_db(days_back=days_back)
+            if not fiat_summary_df.empty:
+                fiat_summary_df.to_excel(writer, sheet_name='Fiat Summary', index=False)
         self.apply_sol_transfers_formatting()
 
 
 
-    def generate_sol_transfers_excel_from_db(self, days_back=None):
-        """Generate Excel report with SOL transfers from database only"""
+    @reads_archive
+    def generate_sol_transfers_excel_from_db(self, days_back=None, incremental=False):
+        """Generate Excel report with SOL transfers from database only (see generate_excel_from_db for incremental)"""
         print(f"Generating SOL transfers Excel from database for wallet: {self.wallet_address} (ID: {self.wallet_id})")
 
         # Check if we have SOL transfers data in the database
-        existing_data = self.get_sol_transfers_from_db(days_back=days_back)
+        row_count = self.get_report_row_window('sol_transfers', days_back)[0]
 
-        if existing_data.empty:
+        if row_count == 0:
             print("❌ No SOL transfers data found in database for this wallet.")
             print("💡 Run option 3 first to fetch SOL transfers from Dune.")
             return False
 
-        print(f"📊 Found {len(existing_data)} SOL transfers in database")
+        print(f"📊 Found {row_count} SOL transfers in database")
 
         # Generate Excel with time period in filename for SOL transfers
         if days_back:
@@ -785,8 +2077,18 @@ class SOLReport:
                 f"{self.wallet_address}_SOL_transfers_all_time.xlsx"
             )
 
-        # Save to Excel using database data
-        self.save_sol_transfers_excel_from_db(days_back=days_back)
+        update = self.plan_report_update('sol_transfers', days_back) if incremental else 'full'
+
+        if update == 'skip':
+            print(f"⏭️ Report already up to date: {self.output_file_path}")
+            return True
+
+        if update == 'append':
+            self.append_to_sol_transfers_report(days_back=days_back)
+        else:
+            # Save to Excel using database data
+            self.save_sol_transfers_excel_from_db(days_back=days_back)
+            self.record_report_manifest('sol_transfers', days_back)
 
         print(f"✅ SOL transfers Excel report generated: {self.output_file_path}")
 
@@ -846,6 +2148,7 @@ class SOLReport:
                 if len(self.transaction_df) > 0:
                     print("Sample data (first 2 rows):")
                     print(self.transaction_df.head(2).to_string())
+                    self.normalize_transaction_frame()
                 else:
                     print("⚠️ DataFrame is empty - no transactions found for this wallet/time period")
             else:
@@ -888,6 +2191,12 @@ class SOLReport:
             # Calculate EUR values in bulk before saving
             self.calculate_eur_values()
 
+            self.transaction_df = self.quarantine_invalid_rows('wallet_transactions', self.transaction_df,
+                                                               self.restore_transaction_columns)
+            if self.transaction_df.empty:
+                print("❌ No valid transaction data to save - every row was quarantined")
+                return False
+
             # Debug: Check dataframe before saving
             print("DataFrame info before saving:")
             print(f"Shape: {self.transaction_df.shape}")
@@ -902,10 +2211,11 @@ class SOLReport:
             print(f"Using chunk size of {chunk_size} rows (with {num_columns} columns)")
 
             # Split DataFrame into chunks and save each chunk
-            total_rows = len(self.transaction_df)
-            chunks = [self.transaction_df[i:i + chunk_size] for i in range(0, total_rows, chunk_size)]
+            rows = self.drop_archived_rows('wallet_transactions', self.restore_transaction_columns(self.transaction_df))
+            chunks = [to_stored_units(rows[i:i + chunk_size]) for i in range(0, len(rows), chunk_size)]
 
             print(f"Saving {len(chunks)} chunks...")
+            first_id = self.get_max_id('wallet_transactions')
 
             for i, chunk in enumerate(chunks, 1):
                 try:
@@ -937,12 +2247,22 @@ class SOLReport:
             self.conn.commit()
             print(f"✅ All transaction data successfully saved to database for wallet ID: {self.wallet_id}")
 
+            # Fill block_time_epoch and daily rollups for the new rows
+            apply_row_backfills(self.conn, 'wallet_transactions', first_id,
+                                self.get_max_id('wallet_transactions'))
+            covered = self.drop_dune_rows_covered_by_swaps()
+            self.conn.commit()
+            if covered:
+                print(f"♻️ Dropped {covered} fetched trade rows already counted from stored swaps")
+
             # Verify data was actually saved
             cursor = self.conn.cursor()
             cursor.execute("SELECT COUNT(*) FROM wallet_transactions WHERE wallet_id = ?", (self.wallet_id,))
             count = cursor.fetchone()[0]
             print(f"✅ Verification: {count} records found in database for wallet ID: {self.wallet_id}")
 
+            self.update_fiat_valuations()
+
             return True
 
         except Exception as e:
@@ -954,42 +2274,53 @@ class SOLReport:
             self.conn.rollback()
             return False
 
-    def generate_summary_from_db(self, days_back=None):
-        """Generate comprehensive summary statistics from database data"""
-        query = """
-            SELECT 
-                w.wallet_address AS wallet_id,
-                COUNT(DISTINCT wt.token_symbol) AS number_of_tokens_traded,
-                SUM(DISTINCT wt.spent_amount) AS total_spent_amount,
-                SUM(DISTINCT wt.spent_amount_eur) AS total_spent_amount_eur,
+    # Aggregate columns shared by the per-wallet and the portfolio trade summaries
+    SUMMARY_AGGREGATES = """
+                COUNT(DISTINCT COALESCE(wt.token_mint, wt.token_symbol)) AS number_of_tokens_traded,
+                SUM(wt.spent_amount_lamports) AS total_spent_amount_lamports,
+                SUM(wt.spent_amount_eur_cents) AS total_spent_amount_eur_cents,
 
                 -- Actual profit calculation
-                (SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.delta_sol ELSE 0 END) - 
-                 SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.delta_sol ELSE 0 END) - 
-                 SUM(DISTINCT wt.spent_amount)) AS actual_profit_sol,
+                (SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.delta_sol_lamports ELSE 0 END) - 
+                 SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.delta_sol_lamports ELSE 0 END) - 
+                 SUM(wt.spent_amount_lamports)) AS actual_profit_sol_lamports,
 
-                (SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.earned_amount_eur - wt.spent_amount_eur ELSE 0 END) - 
-                 SUM(CASE WHEN wt.delta_percentage < 0 THEN ABS(wt.earned_amount_eur - wt.spent_amount_eur) ELSE 0 END)) AS actual_profit_eur,
+                (SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.earned_amount_eur_cents - wt.spent_amount_eur_cents ELSE 0 END) - 
+                 SUM(CASE WHEN wt.delta_percentage < 0 THEN ABS(wt.earned_amount_eur_cents - wt.spent_amount_eur_cents) ELSE 0 END)) AS actual_profit_eur_cents,
 
                 -- Profits and losses
-                SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.delta_sol ELSE 0 END) AS pnl_realized_profits_sol,
-                SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.delta_sol ELSE 0 END) AS pnl_realized_losses_sol,
-                SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.earned_amount_eur - wt.spent_amount_eur ELSE 0 END) AS pnl_realized_profits_eur,
-                SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.earned_amount_eur - wt.spent_amount_eur ELSE 0 END) AS pnl_realized_losses_eur
+                SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.delta_sol_lamports ELSE 0 END) AS pnl_realized_profits_sol_lamports,
+                SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.delta_sol_lamports ELSE 0 END) AS pnl_realized_losses_sol_lamports,
+                SUM(CASE WHEN wt.delta_percentage > 0 THEN wt.earned_amount_eur_cents - wt.spent_amount_eur_cents ELSE 0 END) AS pnl_realized_profits_eur_cents,
+                SUM(CASE WHEN wt.delta_percentage < 0 THEN wt.earned_amount_eur_cents - wt.spent_amount_eur_cents ELSE 0 END) AS pnl_realized_losses_eur_cents
+    """
 
+    SUMMARY_QUERY = f"""
+            SELECT 
+                w.wallet_address AS wallet_id,{SUMMARY_AGGREGATES}
             FROM wallet_transactions wt
             JOIN wallets w ON wt.wallet_id = w.id
             WHERE wt.wallet_id = ?
         """
 
+    @reads_archive
+    def generate_summary_from_db(self, days_back=None):
+        """Generate comprehensive summary statistics from database data"""
+        query = self.SUMMARY_QUERY
+
         params = [self.wallet_id]
         days_back= self.days_back
+        cached, data_version = self.get_cached_summary('summary', days_back)
+        if cached is not None:
+            return cached
+
         if days_back:
-            query += f" AND wt.created_at >= datetime('now', '-{days_back} days')"
+            query += " AND wt.created_at >= ?"
+            params.append(self.created_at_cutoff(days_back))
 
         query += " GROUP BY w.wallet_address, w.wallet_name"
 
-        summary_df = pd.read_sql_query(query, self.conn, params=params)
+        summary_df = to_display_units(self.read_summary_query(query, params))
 
         # Add time period info to the result
         if days_back:
@@ -997,13 +2328,285 @@ class SOLReport:
         else:
             summary_df['time_period_days'] = days_back   #All time string before
 
+        return self.store_cached_summary('summary', days_back, data_version, summary_df)
+
+    """-----------------------------SUMMARY CACHE-----------------------------------------------------"""
+
+    def get_wallet_data_version(self):
+        """Counter bumped whenever this wallet's rows are ingested or re-tagged"""
+        cursor = self.conn.cursor()
+        cursor.execute("SELECT version FROM wallet_data_versions WHERE wallet_id = ?", (self.wallet_id,))
+        row = cursor.fetchone()
+        return row[0] if row else 0
+
+    def get_cached_summary(self, summary_type, days_back):
+        """A copy of a summary computed at the current data version and archive generation (or None), and that version"""
+        data_version = self.get_wallet_data_version()
+        cached = self.summary_cache.get(
+            (summary_type, self.wallet_id, days_back, data_version, self.archive_generation_key))
+        return (cached.copy() if cached is not None else None), data_version
+
+    def store_cached_summary(self, summary_type, days_back, data_version, summary_df):
+        """Remember a summary under the data version read before computing it; other versions are dropped"""
+        self.summary_cache = {key: value for key, value in self.summary_cache.items()
+                              if key[:3] != (summary_type, self.wallet_id, days_back)}
+        self.summary_cache[(summary_type, self.wallet_id, days_back, data_version,
+                            self.archive_generation_key)] = summary_df.copy()
         return summary_df
 
+    def bump_wallet_data_versions(self, wallet_ids):
+        """Mark wallets whose rows changed outside an ingest, so their cached summaries are recomputed"""
+        self.conn.executemany('''
+            INSERT INTO wallet_data_versions (wallet_id, version) VALUES (?, 1)
+            ON CONFLICT (wallet_id) DO UPDATE SET version = version + 1
+        ''', [(int(wallet_id),) for wallet_id in set(wallet_ids)])
+
+    """-----------------------------TOKEN METADATA-----------------------------------------------------"""
+
+    TOKEN_METADATA_COLUMNS = ['token_mint', 'token_symbol', 'token_name', 'decimals', 'first_seen_epoch', 'source']
+
+    def get_token_metadata(self, token_mints):
+        """Metadata indexed by mint, served from the in-process LRU cache and loaded in bulk on misses"""
+        token_mints = pd.unique(pd.Series(token_mints, dtype=object).dropna())
+        missing = [mint for mint in token_mints if mint not in self.token_cache]
+
+        # SQLite caps bound parameters, so misses are loaded in slices
+        for start in range(0, len(missing), 500):
+            batch = missing[start:start + 500]
+            placeholders = ','.join('?' for _ in batch)
+            rows = pd.read_sql_query(
+                f"SELECT {', '.join(self.TOKEN_METADATA_COLUMNS)} FROM token_metadata WHERE token_mint IN ({placeholders})",
+                self.conn, params=batch)
+            found = {row['token_mint']: row for row in rows.to_dict('records')}
+            for mint in batch:
+                # Unknown mints are cached too, so they are not looked up again
+                self.token_cache[mint] = found.get(mint, {'token_mint': mint})
+
+        records = []
+        for mint in token_mints:
+            self.token_cache.move_to_end(mint)
+            records.append(self.token_cache[mint])
+        while len(self.token_cache) > TOKEN_CACHE_SIZE:
+            self.token_cache.popitem(last=False)
+
+        return pd.DataFrame(records, columns=self.TOKEN_METADATA_COLUMNS).set_index('token_mint')
+
+    def import_token_metadata(self, file_path):
+        """Bulk-load token metadata from a CSV or JSON export with a token_mint column; imported fields win over Dune's"""
+        if file_path.lower().endswith('.json'):
+            metadata = pd.read_json(file_path)
+        else:
+            metadata = pd.read_csv(file_path)
 
+        if 'token_mint' not in metadata.columns:
+            print(f"❌ {file_path} has no token_mint column")
+            return 0
 
+        metadata = metadata.reindex(columns=self.TOKEN_METADATA_COLUMNS[:-1]).drop_duplicates('token_mint', keep='last')
+        metadata['decimals'] = pd.to_numeric(metadata['decimals'], errors='coerce').astype('Int64')
+        metadata = metadata.dropna(subset=['token_mint']).astype(object).where(metadata.notna(), None)
 
+        cursor = self.conn.cursor()
+        cursor.executemany('''
+            INSERT INTO token_metadata (token_mint, token_symbol, token_name, decimals, first_seen_epoch, source)
+            VALUES (?, ?, ?, ?, ?, 'import')
+            ON CONFLICT (token_mint) DO UPDATE SET
+                token_symbol = COALESCE(excluded.token_symbol, token_symbol),
+                token_name = COALESCE(excluded.token_name, token_name),
+                decimals = COALESCE(excluded.decimals, decimals),
+                first_seen_epoch = MIN(COALESCE(first_seen_epoch, excluded.first_seen_epoch),
+                                       COALESCE(excluded.first_seen_epoch, first_seen_epoch)),
+                source = 'import',
+                updated_at = CURRENT_TIMESTAMP
+        ''', list(metadata.itertuples(index=False, name=None)))
+        self.conn.commit()
 
+        for mint in metadata['token_mint']:
+            self.token_cache.pop(mint, None)
 
+        print(f"🪙 Imported metadata for {len(metadata)} tokens from {file_path}")
+        return len(metadata)
+
+    @reads_archive
+    def generate_token_summary_from_db(self, days_back=None):
+        """Per-token trade totals for this wallet, grouped by mint rather than by (colliding) symbol"""
+        query = """
+            SELECT
+                wt.token_mint,
+                COUNT(*) AS trades,
+                SUM(wt.spent_amount_lamports) AS spent_sol_lamports,
+                SUM(wt.earned_amount_lamports) AS earned_sol_lamports,
+                SUM(wt.delta_sol_lamports) AS delta_sol_lamports,
+                SUM(wt.earned_amount_eur_cents - wt.spent_amount_eur_cents) AS delta_eur_cents
+            FROM wallet_transactions wt
+            WHERE wt.wallet_id = ? AND wt.token_mint IS NOT NULL
+        """
+        if days_back:
+            query += f" AND wt.created_at >= datetime('now', '-{days_back} days')"
+        query += " GROUP BY wt.token_mint ORDER BY delta_sol_lamports DESC"
+
+        token_summary = to_display_units(pd.read_sql_query(query, self.conn, params=[self.wallet_id]))
+        metadata = self.get_token_metadata(token_summary['token_mint'])
+        token_summary.insert(1, 'token_symbol', token_summary['token_mint'].map(metadata['token_symbol']))
+        token_summary.insert(2, 'token_name', token_summary['token_mint'].map(metadata['token_name']))
+        return token_summary
+
+    """-----------------------------TAX-YEAR REPORTING-----------------------------------------------------"""
+
+    # Germany's private sales rule (§ 23 EStG): disposals held for more than a year are tax-exempt
+    TAX_EXEMPT_HOLDING_DAYS = 365
+
+    def resolve_wallet_ids(self, wallet_addresses=None):
+        """Map wallet addresses to database IDs (this wallet when none given), skipping unknown wallets"""
+        if not wallet_addresses:
+            return [self.wallet_id]
+
+        placeholders = ','.join('?' for _ in wallet_addresses)
+        cursor = self.conn.cursor()
+        cursor.execute(f'SELECT wallet_address, id FROM wallets WHERE wallet_address IN ({placeholders})',
+                       list(wallet_addresses))
+        found = dict(cursor.fetchall())
+
+        for address in wallet_addresses:
+            if address not in found:
+                print(f"⚠️ Wallet {address} not found in database - run a fetch for it first")
+        return [found[address] for address in wallet_addresses if address in found]
+
+    def get_disposals_from_db(self, wallet_ids, currency='EUR'):
+        """Load every realized trade (rows with at least one sell) for the given wallets, valued in currency"""
+        placeholders = ','.join('?' for _ in wallet_ids)
+        query = f"""
+            SELECT
+                w.wallet_address,
+                wt.token_symbol,
+                wt.time_traded,
+                wt.block_time_epoch,
+                wt.spent_amount_lamports,
+                wt.earned_amount_lamports,
+                COALESCE(fv.spent_amount_value_cents, CASE WHEN ? = 'EUR' THEN wt.spent_amount_eur_cents END) AS spent_value_cents,
+                COALESCE(fv.earned_amount_value_cents, CASE WHEN ? = 'EUR' THEN wt.earned_amount_eur_cents END) AS earned_value_cents
+            FROM wallet_transactions wt
+            JOIN wallets w ON wt.wallet_id = w.id
+            LEFT JOIN fiat_valuations fv
+                ON fv.source_table = 'wallet_transactions' AND fv.source_id = wt.id AND fv.currency = ?
+            WHERE wt.wallet_id IN ({placeholders}) AND wt.number_sells > 0
+        """
+        with self.reading_archive(wallet_ids=wallet_ids):
+            return pd.read_sql_query(query, self.conn, params=[currency, currency, currency, *wallet_ids])
+
+    def classify_disposals(self, disposals, holding_days=None):
+        """Add holding period, tax year and taxable/exempt classification to disposals (vectorized)"""
+        if holding_days is None:
+            holding_days = self.TAX_EXEMPT_HOLDING_DAYS
+
+        holding_period = self.parse_durations(disposals['time_traded'])
+        disposed_at = pd.to_datetime(disposals['block_time_epoch'], unit='s')
+
+        disposals['disposed_at'] = disposed_at
+        disposals['acquired_at'] = disposed_at - holding_period
+        disposals['holding_days'] = holding_period.dt.total_seconds() / 86400
+        disposals['tax_year'] = disposed_at.dt.year.astype('Int64')
+        disposals['gain_cents'] = disposals['earned_value_cents'] - disposals['spent_value_cents']
+
+        # An unknown holding period is treated as taxable
+        exempt = (disposals['holding_days'] > holding_days).to_numpy()
+        disposals['tax_status'] = np.where(exempt, 'exempt', 'taxable')
+        return disposals
+
+    def aggregate_tax_years(self, disposals):
+        """Per-wallet and all-wallet totals for every tax year, from classified disposals (int64 cents)"""
+        gains = disposals['gain_cents'].fillna(0).astype('int64')
+        taxable = disposals['tax_status'] == 'taxable'
+        totals = pd.DataFrame({
+            'tax_year': disposals['tax_year'],
+            'wallet_address': disposals['wallet_address'],
+            'disposals': 1,
+            'proceeds_cents': disposals['earned_value_cents'].fillna(0).astype('int64'),
+            'cost_basis_cents': disposals['spent_value_cents'].fillna(0).astype('int64'),
+            'taxable_gains_cents': gains.where(taxable & (gains > 0), 0),
+            'taxable_losses_cents': gains.where(taxable & (gains < 0), 0),
+            'exempt_gains_cents': gains.where(~taxable & (gains > 0), 0),
+            'exempt_losses_cents': gains.where(~taxable & (gains < 0), 0),
+        })
+
+        # Disposals without a block time have no tax year; they are kept on an 'unknown' year instead of dropped
+        per_wallet = totals.groupby(['tax_year', 'wallet_address'], as_index=False, dropna=False).sum()
+        all_wallets = totals.drop(columns=['wallet_address']).groupby('tax_year', as_index=False, dropna=False).sum()
+        all_wallets['wallet_address'] = 'ALL WALLETS'
+
+        summary = pd.concat([per_wallet, all_wallets[per_wallet.columns]], ignore_index=True)
+        summary['net_taxable_result_cents'] = summary['taxable_gains_cents'] + summary['taxable_losses_cents']
+        # All-wallet row last within each year, the unknown year after every known one
+        summary['_order'] = (summary['wallet_address'] == 'ALL WALLETS').astype(int)
+        summary = summary.sort_values(['tax_year', '_order', 'wallet_address']).drop(columns=['_order'])
+        summary['tax_year'] = summary['tax_year'].astype(object).where(summary['tax_year'].notna(), 'unknown')
+        return summary
+
+    def generate_tax_year_report(self, wallet_addresses=None, tax_years=None, currency='EUR', holding_days=None):
+        """Build the consolidated tax-year summary and disposal list over the full stored history"""
+        wallet_ids = self.resolve_wallet_ids(wallet_addresses)
+        if not wallet_ids:
+            return pd.DataFrame(), pd.DataFrame()
+
+        disposals = self.classify_disposals(self.get_disposals_from_db(wallet_ids, currency), holding_days)
+        unknown_year = int(disposals['tax_year'].isna().sum())
+        if unknown_year:
+            print(f"⚠️ {unknown_year} disposals have no block time and so no tax year: " +
+                  ("excluded by the tax-year filter" if tax_years else "reported under tax year 'unknown'"))
+        if tax_years:
+            disposals = disposals[disposals['tax_year'].isin(tax_years)]
+
+        if disposals.empty:
+            return pd.DataFrame(), disposals
+
+        disposals = disposals.sort_values(['tax_year', 'wallet_address', 'disposed_at'])
+        return self.aggregate_tax_years(disposals), disposals
+
+    def save_tax_year_report_to_excel(self, wallet_addresses=None, tax_years=None, currency='EUR', holding_days=None):
+        """Write one consolidated tax workbook: yearly summary plus every classified disposal"""
+        summary_df, disposals_df = self.generate_tax_year_report(wallet_addresses, tax_years, currency, holding_days)
+        if summary_df.empty:
+            print("❌ No realized trades found in database for the requested wallets/years.")
+            return False
+
+        label = 'consolidated' if wallet_addresses and len(wallet_addresses) > 1 else self.wallet_address
+        self.output_file_path = os.path.join(self.reports_folder, f"{label}_tax_report_{currency}.xlsx")
+
+        disposal_columns = ['tax_year', 'wallet_address', 'token_symbol', 'acquired_at', 'disposed_at',
+                            'holding_days', 'tax_status', 'spent_amount_lamports', 'earned_amount_lamports',
+                            'spent_value_cents', 'earned_value_cents', 'gain_cents']
+        summary_df = to_display_units(summary_df)
+
+        with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
+            summary_df.to_excel(writer, sheet_name='Tax Years', index=False)
+            to_display_units(disposals_df[disposal_columns]).rename(columns={
+                'spent_value': f'cost_basis_{currency.lower()}',
+                'earned_value': f'proceeds_{currency.lower()}',
+                'gain': f'gain_{currency.lower()}',
+            }).to_excel(writer, sheet_name='Disposals', index=False)
+
+        workbook = load_workbook(self.output_file_path)
+        for worksheet in workbook.worksheets:
+            self.apply_basic_sheet_formatting(worksheet)
+        workbook.save(self.output_file_path)
+
+        print(f"✅ Tax-year report generated: {self.output_file_path}")
+        print(summary_df.to_string(index=False))
+        return True
+
+    def apply_basic_sheet_formatting(self, worksheet, header_row=1):
+        """Borders, centered cells, bold header and fitted column widths for a plain table sheet"""
+        thin = Side(style='thin')
+        for row in worksheet.iter_rows(min_row=1, max_row=worksheet.max_row, min_col=1, max_col=worksheet.max_column):
+            for cell in row:
+                cell.border = Border(left=thin, right=thin, top=thin, bottom=thin)
+                cell.alignment = Alignment(horizontal="center", vertical="center")
+                if cell.row == header_row:
+                    cell.font = Font(bold=True)
+
+        for column_cells in worksheet.columns:
+            length = max(len(str(cell.value or '')) for cell in column_cells)
+            worksheet.column_dimensions[get_column_letter(column_cells[0].column)].width = min(length + 2, 50)
 
     def update_wallet_info(self, wallet_name=None, description=None):
         """Update wallet information"""
@@ -1030,7 +2633,7 @@ class SOLReport:
             'wallet_id', 'sol_eur_price', 'token_symbol', 'time_traded',
             'incoming', 'outcome', 'delta_token', 'spent_amount', 'spent_amount_eur',
             'earned_amount', 'earned_amount_eur', 'number_buys', 'number_sells',
-            'delta_sol', 'delta_percentage', 'dexscreener', 'block_time'
+            'delta_sol', 'delta_percentage', 'token_mint', 'dexscreener', 'block_time'
         ]
 
         # Only reorder columns that exist
@@ -1041,19 +2644,25 @@ class SOLReport:
 
 
 
-    def generate_excel_from_db(self, days_back=None):
-        """Generate Excel report from existing database data without fetching from Dune"""
+    @reads_archive
+    def generate_excel_from_db(self, days_back=None, incremental=False):
+        """Generate Excel report from existing database data without fetching from Dune.
+
+        With incremental=True an unchanged report is left alone, and new rows are inserted at the top of
+        an all-time workbook when the manifest shows nothing else changed and they sort before every
+        existing row, so the result matches a rebuild. A windowed report is rebuilt once a row ages out.
+        """
         print(f"Generating Excel report from database for wallet: {self.wallet_address} (ID: {self.wallet_id})")
 
         # Check if we have data in the database
-        existing_data = self.get_wallet_transactions_from_db(days_back=days_back)
+        row_count = self.get_report_row_window('transactions', days_back)[0]
 
-        if existing_data.empty:
+        if row_count == 0:
             print("❌ No data found in database for this wallet.")
             print("💡 Run run_report() first to fetch data from Dune, or check if wallet has transactions.")
             return False
 
-        print(f"📊 Found {len(existing_data)} transactions in database")
+        print(f"📊 Found {row_count} transactions in database")
 
         # Generate Excel with time period in filename
         if days_back:
@@ -1062,8 +2671,18 @@ class SOLReport:
                 f"{self.wallet_address}_{days_back}days.xlsx"
             )
 
-        # Save to Excel using database data
-        self.save_to_excel_from_db(days_back=days_back)
+        update = self.plan_report_update('transactions', days_back) if incremental else 'full'
+
+        if update == 'skip':
+            print(f"⏭️ Report already up to date: {self.output_file_path}")
+            return True
+
+        if update == 'append':
+            self.append_to_transactions_report(days_back=days_back)
+        else:
+            # Save to Excel using database data
+            self.save_to_excel_from_db(days_back=days_back)
+            self.record_report_manifest('transactions', days_back)
 
         print(f"✅ Excel report generated: {self.output_file_path}")
 
@@ -1075,8 +2694,11 @@ class SOLReport:
 
         return True
 
-    def get_wallet_transactions_from_db(self, days_back=None):
-        """Retrieve wallet transaction data from database"""
+    def get_wallet_transactions_from_db(self, days_back=None, after_id=None, chunksize=None):
+        """Retrieve wallet transaction data from database (only rows added after after_id when given).
+
+        With chunksize, returns an iterator of frames of that many rows instead of one frame.
+        """
         if days_back is None:
             days_back = self.days_back
 
@@ -1091,9 +2713,17 @@ class SOLReport:
         if days_back:
             query += " AND wt.created_at >= datetime('now', '-{} days')".format(days_back)
 
-        query += " ORDER BY wt.block_time DESC"
+        if after_id is not None:
+            query += " AND wt.id > ?"
+            params.append(after_id)
+
+        # block_time text mixes Dune's 'dd.mm.yyyy' and ISO rows; the epoch column sorts correctly
+        query += " ORDER BY wt.block_time_epoch DESC, wt.id DESC"
 
-        return pd.read_sql_query(query, self.conn, params=params)
+        if chunksize:
+            return (to_display_units(chunk)
+                    for chunk in pd.read_sql_query(query, self.conn, params=params, chunksize=chunksize))
+        return to_display_units(pd.read_sql_query(query, self.conn, params=params))
 
 
     def save_to_excel(self):
@@ -1104,6 +2734,14 @@ class SOLReport:
         # Reorder columns before saving to Excel
         self.reorder_columns()
 
+        if len(self.transaction_df) > self.REPORT_SHEET_MAX_ROWS:
+            chunk_rows = self.REPORT_STREAM_CHUNK_ROWS
+            self.write_sharded_report(
+                'transactions', summary_df, self.generate_fiat_summary_from_db(),
+                (self.restore_transaction_columns(self.transaction_df.iloc[i:i + chunk_rows])
+                 for i in range(0, len(self.transaction_df), chunk_rows)))
+            return
+
         print("Creating Excel file...")
         with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
             # Write summary first
@@ -1111,20 +2749,33 @@ class SOLReport:
                 summary_df.to_excel(writer, sheet_name='Summary', index=False)
 
             # Write transaction details
-            self.transaction_df.to_excel(writer, sheet_name='Transactions', index=False)
+            self.restore_transaction_columns(self.transaction_df).to_excel(
+                writer, sheet_name='Transactions', index=False)
+
+            # Per-currency totals from the long-form valuations
+            fiat_summary_df = self.generate_fiat_summary_from_db()
+            if not fiat_summary_df.empty:
+                fiat_summary_df.to_excel(writer, sheet_name='Fiat Summary', index=False)
 
         # Apply advanced formatting after saving
         print("Applying advanced formatting...")
         self.combine_and_format_sheets_integrated()
 
+    @reads_archive
     def save_to_excel_from_db(self, days_back=None):
         """Save Excel report using only database data with advanced formatting"""
         # Get summary from database
         summary_df = self.generate_summary_from_db(days_back=days_back)
 
+        if self.get_report_row_window('transactions', days_back)[0] > self.REPORT_SHEET_MAX_ROWS:
+            self.write_sharded_report(
+                'transactions', summary_df, self.generate_fiat_summary_from_db(days_back=days_back),
+                self.get_wallet_transactions_from_db(days_back=days_back, chunksize=self.REPORT_STREAM_CHUNK_ROWS))
+            return
+
         # Get transaction data directly from database
-        transactions_df = self.get_wallet_transactions_from_db(days_back=days_back).drop(columns=['created_at'],
-                                                                                         errors='ignore')
+        transactions_df = self.get_wallet_transactions_from_db(days_back=days_back).drop(
+            columns=['id', 'created_at', 'block_time_epoch', 'token_mint'], errors='ignore')
 
         print("Creating Excel file from database data...")
         with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
@@ -1136,15 +2787,2057 @@ class SOLReport:
             if not transactions_df.empty:
                 transactions_df.to_excel(writer, sheet_name='Transactions', index=False)
 
+            # Per-currency totals from the long-form valuations
+            fiat_summary_df = self.generate_fiat_summary_from_db(days_back=days_back)
+            if not fiat_summary_df.empty:
+                fiat_summary_df.to_excel(writer, sheet_name='Fiat Summary', index=False)
+
         # Apply advanced formatting after saving
         print("Applying advanced formatting...")
         self.combine_and_format_sheets_integrated()
 
 
+    """-----------------------------PERIOD BREAKDOWNS-----------------------------------------------------"""
+
+    # Period -> (pandas frequency of the period start dates, label of a period start)
+    BREAKDOWN_PERIODS = {
+        'month': ('MS', lambda start: start.strftime('%Y-%m')),
+        'quarter': ('QS', lambda start: f"{start.year}-Q{start.quarter}"),
+        'year': ('YS', lambda start: start.strftime('%Y')),
+    }
+
+    # Dune reports SOL transfers by UTC month only, so their periods are cut from block_month text
+    BLOCK_MONTH_PERIOD_SQL = {
+        'month': "substr(st.block_month, 1, 7)",
+        'quarter': """substr(st.block_month, 1, 4) || '-' || CASE WHEN substr(st.block_month, 6, 2) <= '03' THEN 'Q1'
+                                                                WHEN substr(st.block_month, 6, 2) <= '06' THEN 'Q2'
+                                                                WHEN substr(st.block_month, 6, 2) <= '09' THEN 'Q3'
+                                                                ELSE 'Q4' END""",
+        'year': "substr(st.block_month, 1, 4)",
+    }
+
+    def period_bounds(self, period, first_epoch, last_epoch):
+        """(label, start epoch, end epoch) of each period in the report timezone from first_epoch through last_epoch"""
+        frequency, label = self.BREAKDOWN_PERIODS[period]
+        first = pd.Timestamp(first_epoch, unit='s', tz='UTC').tz_convert(self.report_timezone)
+        last = pd.Timestamp(last_epoch, unit='s', tz='UTC').tz_convert(self.report_timezone)
+
+        first_month = {'month': first.month, 'quarter': 3 * (first.quarter - 1) + 1, 'year': 1}[period]
+        start = pd.Timestamp(year=first.year, month=first_month, day=1).tz_localize(
+            self.report_timezone, nonexistent='shift_forward')
+        starts = pd.date_range(start, last, freq=frequency)
+        ends = starts.shift(1)
+        return [(label(period_start), int(period_start.value // 10 ** 9), int(period_end.value // 10 ** 9))
+                for period_start, period_end in zip(starts, ends)]
+
+    @reads_archive
+    def generate_period_breakdown_from_db(self, period='month', days_back=None):
+        """The trade summary columns per month, quarter or year in one grouped query.
+
+        Period boundaries become a VALUES table joined on block_time_epoch, so every trade is read
+        once through the wallet/epoch index and DST changes in the report timezone are respected.
+        Periods without trades inside the range are kept as zero rows.
+        """
+        if period not in self.BREAKDOWN_PERIODS:
+            raise ValueError(f"Unknown period '{period}', expected one of {', '.join(self.BREAKDOWN_PERIODS)}")
+
+        window, window_params = "", []
+        if days_back:
+            window = " AND wt.created_at >= ?"
+            window_params.append(self.created_at_cutoff(days_back))
+
+        first_epoch, last_epoch = self.conn.execute(
+            f"SELECT MIN(wt.block_time_epoch), MAX(wt.block_time_epoch) FROM wallet_transactions wt "
+            f"WHERE wt.wallet_id = ?{window}", [self.wallet_id] + window_params).fetchone()
+        if first_epoch is None:
+            return pd.DataFrame()
+
+        bounds = self.period_bounds(period, first_epoch, last_epoch)
+        query = f"""
+            WITH periods (period, start_epoch, end_epoch) AS (
+                VALUES {', '.join('(?, ?, ?)' for _ in bounds)}
+            )
+            SELECT p.period,{self.SUMMARY_AGGREGATES}
+            FROM periods p
+            LEFT JOIN wallet_transactions wt
+                ON wt.wallet_id = ? AND wt.block_time_epoch >= p.start_epoch AND wt.block_time_epoch < p.end_epoch{window}
+            GROUP BY p.period
+            ORDER BY p.period
+        """
+        params = [value for bound in bounds for value in bound] + [self.wallet_id] + window_params
+
+        breakdown_df = to_display_units(self.read_summary_query(query, params))
+        breakdown_df = breakdown_df.fillna(0)
+        breakdown_df['timezone'] = str(self.report_timezone)
+        return breakdown_df
+
+    @reads_archive
+    def generate_sol_transfers_period_breakdown_from_db(self, period='month', days_back=None):
+        """The SOL transfers summary columns per block_month, quarter or year in one grouped query"""
+        if period not in self.BLOCK_MONTH_PERIOD_SQL:
+            raise ValueError(f"Unknown period '{period}', expected one of {', '.join(self.BLOCK_MONTH_PERIOD_SQL)}")
+
+        query = f"""
+            SELECT {self.BLOCK_MONTH_PERIOD_SQL[period]} AS period,{self.SOL_TRANSFERS_SUMMARY_AGGREGATES}
+            FROM sol_transfers st
+            WHERE st.wallet_id = ? AND st.is_internal = 0 AND st.block_month IS NOT NULL
+        """
+        params = [self.wallet_id]
+        if days_back:
+            query += " AND st.created_at >= ?"
+            params.append(self.created_at_cutoff(days_back))
+        query += " GROUP BY period ORDER BY period"
+
+        return to_display_units(self.read_summary_query(query, params))
+
+    @reads_archive
+    def save_period_breakdown_to_excel(self, period='month', days_back=None):
+        """Write the trade and SOL transfers breakdowns by period to one workbook"""
+        trades_df = self.generate_period_breakdown_from_db(period, days_back)
+        transfers_df = self.generate_sol_transfers_period_breakdown_from_db(period, days_back)
+
+        if trades_df.empty and transfers_df.empty:
+            print("❌ No data found in database for this wallet.")
+            return False
+
+        self.output_file_path = os.path.join(self.reports_folder, f"{self.wallet_address}_{period}ly_breakdown.xlsx")
+        with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
+            if not trades_df.empty:
+                trades_df.to_excel(writer, sheet_name=f'Trades by {period}', index=False)
+            if not transfers_df.empty:
+                transfers_df.to_excel(writer, sheet_name=f'SOL Transfers by {period}', index=False)
+
+        workbook = load_workbook(self.output_file_path)
+        for worksheet in workbook.worksheets:
+            self.apply_basic_sheet_formatting(worksheet)
+        workbook.save(self.output_file_path)
+
+        print(f"✅ {period.capitalize()}ly breakdown generated: {self.output_file_path}")
+        if not trades_df.empty:
+            print(trades_df.to_string(index=False))
+        return True
+
+    """-----------------------------PORTFOLIO REPORTING-----------------------------------------------------"""
+
+    PORTFOLIO_TOTAL_LABEL = 'PORTFOLIO TOTAL'
+
+    def assign_wallets_to_portfolio(self, portfolio_name, wallet_addresses=None, description=None):
+        """Create the portfolio if needed and move the given wallets (default: this wallet) into it"""
+        wallet_addresses = wallet_addresses or [self.wallet_address]
+        cursor = self.conn.cursor()
+
+        cursor.execute('INSERT OR IGNORE INTO portfolios (portfolio_name, description) VALUES (?, ?)',
+                       (portfolio_name, description))
+        cursor.execute('SELECT id FROM portfolios WHERE portfolio_name = ?', (portfolio_name,))
+        portfolio_id = cursor.fetchone()[0]
+
+        # Wallets not fetched yet are registered so later syncs and reports pick them up
+        cursor.executemany('''
+            INSERT OR IGNORE INTO wallets (wallet_address, wallet_name) VALUES (?, ?)
+        ''', [(address, f"Wallet_{address[:8]}...") for address in wallet_addresses])
+
+        placeholders = ','.join('?' for _ in wallet_addresses)
+        cursor.execute(f'''
+            UPDATE wallets SET portfolio_id = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE wallet_address IN ({placeholders})
+        ''', [portfolio_id, *wallet_addresses])
+
+        self.conn.commit()
+        print(f"✅ {len(wallet_addresses)} wallet(s) assigned to portfolio '{portfolio_name}' (ID: {portfolio_id})")
+
+        # Membership changed (possibly for another portfolio too), so re-tag every portfolio's transfers
+        self.detect_internal_transfers()
+        return portfolio_id
+
+    def get_wallet_portfolio_name(self):
+        """Name of the portfolio this wallet belongs to (None when unassigned)"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            SELECT p.portfolio_name FROM wallets w JOIN portfolios p ON p.id = w.portfolio_id WHERE w.id = ?
+        ''', (self.wallet_id,))
+        row = cursor.fetchone()
+        return row[0] if row else None
+
+    def portfolio_summary_query(self, table_name, aggregates, portfolio_name=None, days_back=None):
+        """One set-based query returning per-wallet rows plus a total row for each portfolio.
+
+        The scoped rows are read once: SQLite materializes a CTE that is referenced twice, and both
+        the per-wallet and the per-portfolio aggregates run over that single scan.
+        """
+        if days_back is None:
+            days_back = self.days_back
+        alias = 'wt' if table_name == 'wallet_transactions' else 'st'
+
+        # Driving from the wallet list lets SQLite use the wallet_id indexes instead of a full scan
+        scope = "src.wallet_id IN (SELECT id FROM wallets WHERE portfolio_id IS NOT NULL)" if portfolio_name is None else \
+            "src.wallet_id IN (SELECT id FROM wallets WHERE portfolio_id = " \
+            "(SELECT id FROM portfolios WHERE portfolio_name = ?))"
+        params = [] if portfolio_name is None else [portfolio_name]
+        if days_back:
+            scope += " AND src.created_at >= ?"
+            params.append(self.created_at_cutoff(days_back))
+        # Moves between a client's own wallets are not flows in or out of the portfolio
+        if table_name == 'sol_transfers':
+            scope += " AND src.is_internal = 0"
+
+        query = f"""
+            WITH scoped AS (
+                SELECT src.*, w.portfolio_id
+                FROM {table_name} src
+                JOIN wallets w ON src.wallet_id = w.id
+                WHERE {scope}
+            )
+            SELECT p.portfolio_name, w.wallet_address,{aggregates}
+            FROM scoped {alias}
+            JOIN wallets w ON {alias}.wallet_id = w.id
+            JOIN portfolios p ON p.id = {alias}.portfolio_id
+            GROUP BY {alias}.portfolio_id, {alias}.wallet_id, p.portfolio_name, w.wallet_address
+
+            UNION ALL
+
+            SELECT p.portfolio_name, '{self.PORTFOLIO_TOTAL_LABEL}' AS wallet_address,{aggregates}
+            FROM scoped {alias}
+            JOIN portfolios p ON p.id = {alias}.portfolio_id
+            GROUP BY {alias}.portfolio_id, p.portfolio_name
+        """
+        portfolio_wallets = "SELECT id FROM wallets WHERE portfolio_id IS NOT NULL" if portfolio_name is None else \
+            "SELECT id FROM wallets WHERE portfolio_id = (SELECT id FROM portfolios WHERE portfolio_name = ?)"
+        wallet_ids = [row[0] for row in self.conn.execute(portfolio_wallets, params[:1] if portfolio_name else [])]
+        with self.reading_archive(days_back, wallet_ids):
+            summary_df = to_display_units(self.read_summary_query(query, params))
+
+        # Total row after its wallets within each portfolio
+        summary_df['_is_total'] = summary_df['wallet_address'] == self.PORTFOLIO_TOTAL_LABEL
+        summary_df = summary_df.sort_values(['portfolio_name', '_is_total', 'wallet_address'])
+        summary_df = summary_df.drop(columns=['_is_total']).reset_index(drop=True)
+        summary_df['time_period_days'] = days_back
+        return summary_df
+
+    def generate_portfolio_summary_from_db(self, portfolio_name=None, days_back=None):
+        """Trade summary per wallet and per portfolio (all portfolios when no name is given)"""
+        return self.portfolio_summary_query('wallet_transactions', self.SUMMARY_AGGREGATES, portfolio_name, days_back)
+
+    def generate_portfolio_sol_transfers_summary_from_db(self, portfolio_name=None, days_back=None):
+        """SOL transfers summary per wallet and per portfolio (all portfolios when no name is given)"""
+        return self.portfolio_summary_query('sol_transfers', self.SOL_TRANSFERS_SUMMARY_AGGREGATES,
+                                            portfolio_name, days_back)
+
+    def save_portfolio_report_to_excel(self, portfolio_name=None, days_back=None):
+        """Write one consolidated workbook with per-wallet and portfolio total rows"""
+        summary_df = self.generate_portfolio_summary_from_db(portfolio_name, days_back)
+        transfers_df = self.generate_portfolio_sol_transfers_summary_from_db(portfolio_name, days_back)
+
+        if summary_df.empty and transfers_df.empty:
+            print("❌ No portfolio data found in database.")
+            return False
+
+        label = portfolio_name or 'all'
+        self.output_file_path = os.path.join(self.reports_folder, f"portfolio_{label}.xlsx")
+
+        with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
+            if not summary_df.empty:
+                summary_df.to_excel(writer, sheet_name='Portfolio Summary', index=False)
+            if not transfers_df.empty:
+                transfers_df.to_excel(writer, sheet_name='Portfolio SOL Transfers', index=False)
+
+        workbook = load_workbook(self.output_file_path)
+        for worksheet in workbook.worksheets:
+            self.apply_basic_sheet_formatting(worksheet)
+            for row in worksheet.iter_rows(min_row=2):
+                if row[1].value == self.PORTFOLIO_TOTAL_LABEL:
+                    for cell in row:
+                        cell.font = Font(bold=True)
+        workbook.save(self.output_file_path)
+
+        print(f"✅ Portfolio report generated: {self.output_file_path}")
+        if not summary_df.empty:
+            print(summary_df.to_string(index=False))
+        return True
+
+    """-----------------------------INTERNAL TRANSFER DETECTION-----------------------------------------------------"""
+
+    @staticmethod
+    def pair_transfers(sent, received, keys):
+        """One-to-one pairs of Sent/Received rows sharing the key columns, as (sent_id, received_id).
+
+        Rows are numbered within each key so that n identical transfers pair with n counterparts
+        instead of producing n*n matches; pandas merges on hash tables, keeping this linear.
+        """
+        sent = sent.assign(_occurrence=sent.groupby(keys).cumcount())
+        received = received.assign(_occurrence=received.groupby(keys).cumcount())
+        pairs = sent.merge(received, on=keys + ['_occurrence'], suffixes=('_sent', '_received'))
+        return pairs[['transfer_id_sent', 'transfer_id_received']]
+
+    @staticmethod
+    def internal_transfer_mask(transfers, owned):
+        """Transfers whose counterparty is another wallet of their portfolio (owned: portfolio_id, wallet_address)"""
+        # Hash lookup of "portfolio:counterparty" against the portfolio's own addresses
+        counterparty = pd.Series(np.where(transfers['transaction_label'] == 'Sent',
+                                          transfers['to_owner'], transfers['from_owner']), index=transfers.index)
+        owned_keys = set(owned['portfolio_id'].astype(str) + ':' + owned['wallet_address'])
+        return (transfers['portfolio_id'].astype(str) + ':' + counterparty.astype(str)).isin(owned_keys)
+
+    def detect_internal_transfers(self, portfolio_name=None):
+        """Tag SOL transfers between wallets of the same portfolio as internal (all portfolios by default).
+
+        A transfer is internal when its counterparty is another wallet of the same portfolio. Where both
+        sides were fetched, the Sent and Received rows are paired by signature, falling back to
+        sender, recipient, lamport amount and month, and each row records its counterpart's id.
+        """
+        if portfolio_name is None:
+            scope, params = "w.portfolio_id IS NOT NULL", []
+        else:
+            scope, params = "w.portfolio_id = (SELECT id FROM portfolios WHERE portfolio_name = ?)", [portfolio_name]
+
+        transfers = pd.read_sql_query(f"""
+            SELECT st.id AS transfer_id, st.wallet_id, w.portfolio_id, st.signature, st.from_owner, st.to_owner,
+                   COALESCE(st.sol_amount_lamports, -1) AS lamports, st.block_month, st.transaction_label,
+                   st.is_internal, st.internal_match_id
+            FROM sol_transfers st
+            JOIN wallets w ON st.wallet_id = w.id
+            WHERE {scope}
+        """, self.conn, params=params)
+        owned = pd.read_sql_query(f"SELECT w.portfolio_id, w.wallet_address FROM wallets w WHERE {scope}",
+                                  self.conn, params=params)
+
+        cursor = self.conn.cursor()
+        if portfolio_name is None:
+            # Wallets that left every portfolio have no internal transfers any more
+            self.bump_wallet_data_versions(row[0] for row in cursor.execute('''
+                SELECT DISTINCT wallet_id FROM sol_transfers
+                WHERE is_internal = 1 AND wallet_id IN (SELECT id FROM wallets WHERE portfolio_id IS NULL)
+            ''').fetchall())
+            cursor.execute('''
+                UPDATE sol_transfers SET is_internal = 0, internal_match_id = NULL
+                WHERE is_internal = 1 AND wallet_id IN (SELECT id FROM wallets WHERE portfolio_id IS NULL)
+            ''')
+
+        if transfers.empty:
+            self.conn.commit()
+            return 0
+
+        internal = self.internal_transfer_mask(transfers, owned)
+
+        candidates = transfers[internal]
+        sent = candidates[candidates['transaction_label'] == 'Sent']
+        received = candidates[candidates['transaction_label'] == 'Received']
+
+        # Exact matches on signature first, then amount + time for the rest
+        by_signature = self.pair_transfers(sent.dropna(subset=['signature']), received.dropna(subset=['signature']),
+                                           ['portfolio_id', 'signature'])
+        sent = sent[~sent['transfer_id'].isin(by_signature['transfer_id_sent'])]
+        received = received[~received['transfer_id'].isin(by_signature['transfer_id_received'])]
+        by_amount = self.pair_transfers(sent, received,
+                                        ['portfolio_id', 'from_owner', 'to_owner', 'lamports', 'block_month'])
+        pairs = pd.concat([by_signature, by_amount], ignore_index=True)
+
+        match = pd.concat([
+            pd.Series(pairs['transfer_id_received'].to_numpy(), index=pairs['transfer_id_sent'].to_numpy()),
+            pd.Series(pairs['transfer_id_sent'].to_numpy(), index=pairs['transfer_id_received'].to_numpy()),
+        ])
+        new_match = transfers['transfer_id'].map(match).astype('Int64')
+        new_internal = internal.astype(int)
+
+        old_match = transfers['internal_match_id'].astype('Int64')
+        changed = (new_internal != transfers['is_internal']) | (new_match.fillna(-1) != old_match.fillna(-1))
+        cursor.executemany(
+            'UPDATE sol_transfers SET is_internal = ?, internal_match_id = ? WHERE id = ?',
+            [(int(flag), None if pd.isna(matched) else int(matched), int(transfer_id)) for flag, matched, transfer_id in zip(
+                new_internal[changed], new_match[changed], transfers.loc[changed, 'transfer_id'])]
+        )
+        self.bump_wallet_data_versions(transfers.loc[changed, 'wallet_id'])
+        self.conn.commit()
+
+        print(f"🔁 Internal transfers: {int(internal.sum())} of {len(transfers)} "
+              f"({len(pairs)} matched pairs, {int(changed.sum())} rows re-tagged)")
+        return int(internal.sum())
+
+    """-----------------------------SHARDED REPORTS-----------------------------------------------------"""
+
+    # Detail rows per sheet; Excel stops at 1,048,576 rows and gets sluggish long before that
+    REPORT_SHEET_MAX_ROWS = 250_000
+
+    # Rows read and written per step while a sharded report is streamed
+    REPORT_STREAM_CHUNK_ROWS = 50_000
+
+    # Report type -> (shard sheet prefix, column shown as each shard's range in the index, link column, link text)
+    SHARD_LAYOUTS = {
+        'transactions': ('Transactions', 'block_time', 'dexscreener', 'View Dexscreener'),
+        'sol_transfers': ('SOL Transfers', 'block_month', 'solscan_link', 'View on Solscan'),
+    }
+
+    REPORT_FILLS = {
+        'brown': PatternFill(start_color="A52A2A", end_color="A52A2A", fill_type="solid"),
+        'red': PatternFill(start_color="FFC7CE", end_color="FFC7CE", fill_type="solid"),
+        'green': PatternFill(start_color="C6EFCE", end_color="C6EFCE", fill_type="solid"),
+        'yellow': PatternFill(start_color="FFFF00", end_color="FFFF00", fill_type="solid"),
+    }
+
+    @staticmethod
+    def shard_fills(report_type, rows_df):
+        """Fill name per formatted column of a chunk, as format_transaction_rows / format_transfer_rows colour it"""
+        if report_type == 'transactions':
+            percentage = rows_df['delta_percentage']
+            conditions = [(percentage == -100).to_numpy(), (percentage > 0).to_numpy(), (percentage < 0).to_numpy()]
+            return {
+                'delta_percentage': np.select(conditions, ['brown', 'green', 'red'], default=''),
+                'delta_sol': np.select(conditions, ['red', 'green', 'red'], default=''),
+                'number_buys': np.where((rows_df['number_buys'] > 3).to_numpy(), 'yellow', ''),
+            }
+
+        label = rows_df['transaction_label']
+        colours = np.select([(label == 'Received').to_numpy(), (label == 'Sent').to_numpy()], ['green', 'red'], default='')
+        return {'transaction_label': colours, 'sol_amount': colours}
+
+    def append_shard_rows(self, worksheet, rows_df, fills, link_column, link_text):
+        """Append frame rows to a write-only sheet with the colours and links of the single-sheet reports"""
+        columns = list(rows_df.columns)
+        styled = {columns.index(column): colours for column, colours in fills.items() if column in columns}
+        link_position = columns.index(link_column) if link_column in columns else None
+        link_font = Font(color="0000FF", underline="single")
+
+        for offset, row in enumerate(rows_df.astype(object).where(rows_df.notna(), None).to_numpy().tolist()):
+            for position, colours in styled.items():
+                if colours[offset]:
+                    cell = WriteOnlyCell(worksheet, value=row[position])
+                    cell.fill = self.REPORT_FILLS[colours[offset]]
+                    row[position] = cell
+
+            # Excel allows about 65k hyperlink objects per sheet, HYPERLINK formulas have no such limit
+            if link_position is not None and row[link_position]:
+                cell = WriteOnlyCell(worksheet, value=f'=HYPERLINK("{row[link_position]}", "{link_text}")')
+                cell.font = link_font
+                row[link_position] = cell
+
+            worksheet.append(row)
+
+    @staticmethod
+    def bold_row(worksheet, values):
+        """Header cells for a write-only sheet"""
+        cells = [WriteOnlyCell(worksheet, value=value) for value in values]
+        for cell in cells:
+            cell.font = Font(bold=True)
+        return cells
+
+    def write_streamed_sheets(self, frames):
+        """Write-only workbook at self.output_file_path with one plain sheet per frame; frames longer than
+        REPORT_SHEET_MAX_ROWS continue on numbered sheets ("PnL Curve 1", "PnL Curve 2", ...)"""
+        workbook = Workbook(write_only=True)
+        for sheet_name, frame in frames.items():
+            starts = range(0, max(len(frame), 1), self.REPORT_SHEET_MAX_ROWS)
+            for number, start in enumerate(starts, 1):
+                worksheet = workbook.create_sheet(sheet_name if len(starts) == 1 else f"{sheet_name} {number}")
+                worksheet.freeze_panes = 'A2'
+                worksheet.append(self.bold_row(worksheet, frame.columns))
+                self.append_shard_rows(worksheet, frame.iloc[start:start + self.REPORT_SHEET_MAX_ROWS], {}, None, None)
+        workbook.save(self.output_file_path)
+
+    def write_sharded_report(self, report_type, summary_df, fiat_summary_df, row_chunks):
+        """Stream detail rows into numbered sheets of REPORT_SHEET_MAX_ROWS rows behind a linked index sheet.
+
+        The write-only workbook flushes each appended row to disk, so memory is bounded by one chunk of
+        row_chunks however long the wallet history is. Sharded reports are always rebuilt in full.
+        """
+        sheet_prefix, range_column, link_column, link_text = self.SHARD_LAYOUTS[report_type]
+        excluded_columns = self.REPORT_LAYOUTS[report_type][2]
+        started = time.perf_counter()
+
+        if report_type == 'transactions':
+            summary_df = summary_df.copy()
+            summary_df.insert(1, 'sol_price_eur', self.solana_eur_price)
+
+        workbook = Workbook(write_only=True)
+        index_sheet = workbook.create_sheet('Index')
+        for column in range(1, max(len(summary_df.columns), 4) + 1):
+            index_sheet.column_dimensions[get_column_letter(column)].width = 24
+        index_sheet.append(self.bold_row(index_sheet, summary_df.columns))
+        for values in summary_df.astype(object).where(summary_df.notna(), None).to_numpy().tolist():
+            index_sheet.append(values)
+        index_sheet.append([])
+
+        # [sheet name, rows, first and last range_column value] per shard
+        shards = []
+        worksheet = None
+        for chunk in row_chunks:
+            chunk = chunk.drop(columns=excluded_columns, errors='ignore')
+            fills = self.shard_fills(report_type, chunk)
+            start = 0
+            while start < len(chunk):
+                if worksheet is None or shards[-1][1] == self.REPORT_SHEET_MAX_ROWS:
+                    worksheet = workbook.create_sheet(f"{sheet_prefix} {len(shards) + 1}")
+                    worksheet.freeze_panes = 'A2'
+                    for column in range(1, len(chunk.columns) + 1):
+                        worksheet.column_dimensions[get_column_letter(column)].width = 18
+                    worksheet.append(self.bold_row(worksheet, chunk.columns))
+                    shards.append([worksheet.title, 0, None, None])
+
+                shard = shards[-1]
+                piece = chunk.iloc[start:start + self.REPORT_SHEET_MAX_ROWS - shard[1]]
+                self.append_shard_rows(worksheet, piece,
+                                       {column: colours[start:start + len(piece)] for column, colours in fills.items()},
+                                       link_column, link_text)
+                if range_column in piece.columns:
+                    if shard[1] == 0:
+                        shard[2] = self.to_cell_value(piece[range_column].iloc[0])
+                    shard[3] = self.to_cell_value(piece[range_column].iloc[-1])
+                shard[1] += len(piece)
+                start += len(piece)
+
+        index_sheet.append(self.bold_row(index_sheet, ['sheet', 'rows', f'first_{range_column}', f'last_{range_column}']))
+        for sheet_name, rows, first_value, last_value in shards:
+            link = WriteOnlyCell(index_sheet, value=f'=HYPERLINK("#\'{sheet_name}\'!A1", "{sheet_name}")')
+            link.font = Font(color="0000FF", underline="single")
+            index_sheet.append([link, rows, first_value, last_value])
+
+        if not fiat_summary_df.empty:
+            fiat_sheet = workbook.create_sheet('Fiat Summary')
+            fiat_sheet.append(self.bold_row(fiat_sheet, fiat_summary_df.columns))
+            for values in fiat_summary_df.astype(object).where(fiat_summary_df.notna(), None).to_numpy().tolist():
+                fiat_sheet.append(values)
+
+        workbook.save(self.output_file_path)
+
+        # The incremental append path expects a single combined sheet, so no manifest is kept
+        self.report_header_row = None
+        self.conn.execute("DELETE FROM report_manifests WHERE output_file_path = ?", (self.output_file_path,))
+        self.conn.commit()
+
+        total_rows = sum(shard[1] for shard in shards)
+        print(f"✅ Streamed {total_rows} rows into {len(shards)} sheet(s) in {time.perf_counter() - started:.1f}s: "
+              f"{self.output_file_path}")
+
+    """-----------------------------HTML REPORTS-----------------------------------------------------"""
+
+    # The fills of the Excel reports as CSS classes, so each cell carries a class name instead of a style
+    HTML_REPORT_CSS = '''
+        body { font-family: Calibri, Arial, sans-serif; font-size: 13px; margin: 16px; }
+        table { border-collapse: collapse; margin-bottom: 24px; }
+        th, td { border: 1px solid #000; padding: 2px 6px; text-align: center; vertical-align: middle; }
+        th { font-weight: bold; background: #f2f2f2; position: sticky; top: 0; }
+        a { color: #0000FF; text-decoration: underline; }
+        .brown { background: #A52A2A; }
+        .red { background: #FFC7CE; }
+        .green { background: #C6EFCE; }
+        .yellow { background: #FFFF00; }
+        .gold { background: #FFD700; }
+    '''
+
+    @staticmethod
+    def html_table_start(columns):
+        """Opening tag and escaped header row of an HTML table"""
+        header = ''.join(f"<th>{html.escape(str(column))}</th>" for column in columns)
+        return f"<table>\n<thead><tr>{header}</tr></thead>\n<tbody>\n"
+
+    @staticmethod
+    def html_table_rows(rows_df, classes=None, link_column=None, link_text=None):
+        """<tr> lines for a frame, built column by column with vectorized string operations.
+
+        classes maps a column to an array of CSS class names ('' for none), as shard_fills returns them.
+        """
+        if rows_df.empty:
+            return ''
+        classes = classes or {}
+        rows = pd.Series('<tr>', index=rows_df.index)
+        for column in rows_df.columns:
+            values = rows_df[column]
+            text = values.astype(object).where(values.notna(), '').astype(str)
+            if values.dtype == object or isinstance(values.dtype, (pd.StringDtype, pd.CategoricalDtype)):
+                text = text.map(html.escape)
+            if column == link_column:
+                text = text.where(text == '', '<a href="' + text + f'">{link_text}</a>')
+
+            if column in classes:
+                class_names = pd.Series(classes[column], index=rows_df.index)
+                opening = ('<td class="' + class_names + '">').where(class_names != '', '<td>')
+            else:
+                opening = '<td>'
+            rows = rows + opening + text + '</td>'
+        return '\n'.join(rows + '</tr>') + '\n'
+
+    def summary_pnl_classes(self, summary_df):
+        """Gold or red class for the realized-profits summary cell, as format_summary_pnl_cell colours it"""
+        # format_summary_pnl_cell keeps the last header matching each name, so the EUR columns are compared
+        spent_columns = [column for column in summary_df.columns if 'total_spent_amount' in column]
+        profit_columns = [column for column in summary_df.columns if 'pnl_realized_profits' in column]
+        if not spent_columns or not profit_columns:
+            return {}
+        spent = pd.to_numeric(summary_df[spent_columns[-1]], errors='coerce')
+        profits = pd.to_numeric(summary_df[profit_columns[-1]], errors='coerce')
+        colours = np.where(profits > spent, 'gold', 'red')
+        return {profit_columns[-1]: np.where(profits.notna() & spent.notna(), colours, '')}
+
+    def write_html_report(self, report_type, summary_df, fiat_summary_df, row_chunks):
+        """Stream a report as one HTML page: summary, fiat summary, then the detail rows chunk by chunk.
+
+        The colours and links follow the Excel reports; rows are written as they are read, so memory
+        is bounded by one chunk of row_chunks.
+        """
+        _, range_column, link_column, link_text = self.SHARD_LAYOUTS[report_type]
+        excluded_columns = self.REPORT_LAYOUTS[report_type][2]
+        started = time.perf_counter()
+
+        if report_type == 'transactions':
+            summary_df = summary_df.copy()
+            summary_df.insert(1, 'sol_price_eur', self.solana_eur_price)
+
+        title = f"{self.wallet_address} - {self.REPORT_LAYOUTS[report_type][1]}"
+        total_rows = 0
+        with open(self.output_file_path, 'w', encoding='utf-8') as page:
+            page.write(f"<!DOCTYPE html>\n<html>\n<head>\n<meta charset=\"utf-8\">\n<title>{html.escape(title)}</title>\n"
+                       f"<style>{self.HTML_REPORT_CSS}</style>\n</head>\n<body>\n<h2>{html.escape(title)}</h2>\n")
+
+            page.write(self.html_table_start(summary_df.columns))
+            page.write(self.html_table_rows(summary_df, self.summary_pnl_classes(summary_df)))
+            page.write("</tbody>\n</table>\n")
+
+            if not fiat_summary_df.empty:
+                page.write(self.html_table_start(fiat_summary_df.columns))
+                page.write(self.html_table_rows(fiat_summary_df))
+                page.write("</tbody>\n</table>\n")
+
+            header_written = False
+            for chunk in row_chunks:
+                chunk = chunk.drop(columns=excluded_columns, errors='ignore')
+                if not header_written:
+                    page.write(self.html_table_start(chunk.columns))
+                    header_written = True
+                page.write(self.html_table_rows(chunk, self.shard_fills(report_type, chunk), link_column, link_text))
+                total_rows += len(chunk)
+            if header_written:
+                page.write("</tbody>\n</table>\n")
+
+            page.write("</body>\n</html>\n")
+
+        print(f"🌐 Wrote {total_rows} rows to {self.output_file_path} in {time.perf_counter() - started:.1f}s")
+
+    @reads_archive
+    def generate_html_report_from_db(self, report_type='transactions', days_back=None):
+        """View-only HTML report from database data, much faster than the formatted Excel workbook"""
+        row_count = self.get_report_row_window(report_type, days_back)[0]
+        if row_count == 0:
+            print("❌ No data found in database for this wallet.")
+            return False
+
+        suffix = 'transactions' if report_type == 'transactions' else 'SOL_transfers'
+        self.output_file_path = os.path.join(
+            self.reports_folder,
+            f"{self.wallet_address}_{suffix}{f'_{days_back}days' if days_back else ''}.html"
+        )
+
+        if report_type == 'transactions':
+            self.write_html_report(
+                'transactions', self.generate_summary_from_db(days_back=days_back),
+                self.generate_fiat_summary_from_db(days_back=days_back),
+                self.get_wallet_transactions_from_db(days_back=days_back, chunksize=self.REPORT_STREAM_CHUNK_ROWS))
+        else:
+            self.write_html_report(
+                'sol_transfers', self.generate_sol_transfers_summary_from_db(days_back=days_back),
+                self.generate_sol_transfers_fiat_summary_from_db(days_back=days_back),
+                self.get_sol_transfers_from_db(days_back=days_back, chunksize=self.REPORT_STREAM_CHUNK_ROWS))
+        return True
+
+    """-----------------------------INCREMENTAL REPORT UPDATES-----------------------------------------------------"""
+
+    # Report type -> (source table, combined sheet name, columns left out of the detail rows)
+    REPORT_LAYOUTS = {
+        'transactions': ('wallet_transactions', 'Summary and Transactions',
+                         ['id', 'wallet_id', 'sol_eur_price', 'created_at', 'block_time_epoch', 'token_mint']),
+        'sol_transfers': ('sol_transfers', 'SOL Transfers Report', ['wallet_id', 'sol_eur_price']),
+    }
+
+    # Report type -> column its detail rows are sorted on, newest first with ties broken by id
+    REPORT_SORT_COLUMNS = {'transactions': 'block_time_epoch', 'sol_transfers': 'created_at'}
+
+    def report_definition_signature(self, report_type):
+        """Fingerprint of everything that shapes a report besides its rows"""
+        summary_query = self.SUMMARY_QUERY if report_type == 'transactions' else self.SOL_TRANSFERS_SUMMARY_QUERY
+        definition = '|'.join([report_type, summary_query, repr(self.REPORT_LAYOUTS[report_type]), ','.join(self.currencies)])
+        return hashlib.sha1(definition.encode('utf-8')).hexdigest()
+
+    def report_window_days(self, report_type, days_back):
+        """The created_at window the detail query of a report type actually applies"""
+        # Transaction detail rows fall back to the instance window, SOL transfers do not
+        if report_type == 'transactions' and days_back is None:
+            return self.days_back
+        return days_back
+
+    def get_report_row_window(self, report_type, days_back, max_id=None):
+        """(row count, min id, max id) of the source rows a report over this window contains"""
+        table_name = self.REPORT_LAYOUTS[report_type][0]
+        days_back = self.report_window_days(report_type, days_back)
+
+        query = f"SELECT COUNT(*), COALESCE(MIN(id), 0), COALESCE(MAX(id), 0) FROM {table_name} WHERE wallet_id = ?"
+        params = [self.wallet_id]
+        if days_back:
+            query += f" AND created_at >= datetime('now', '-{days_back} days')"
+        if max_id is not None:
+            query += " AND id <= ?"
+            params.append(max_id)
+
+        cursor = self.conn.cursor()
+        cursor.execute(query, params)
+        return cursor.fetchone()
+
+    def get_report_manifest(self, output_file_path):
+        """Manifest row recorded for a generated report file, as a dict (None when unknown)"""
+        cursor = self.conn.cursor()
+        cursor.execute('SELECT * FROM report_manifests WHERE output_file_path = ?', (output_file_path,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        return dict(zip([column[0] for column in cursor.description], row))
+
+    def record_report_manifest(self, report_type, days_back):
+        """Record which source rows the report at self.output_file_path now contains"""
+        if self.report_header_row is None or not os.path.exists(self.output_file_path):
+            return
+
+        row_count, min_id, max_id = self.get_report_row_window(report_type, days_back)
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            INSERT OR REPLACE INTO report_manifests (
+                output_file_path, wallet_id, report_type, days_back, definition_signature,
+                header_row, row_count, min_id, max_id, file_mtime, generated_at
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+        ''', (self.output_file_path, self.wallet_id, report_type, self.report_window_days(report_type, days_back),
+              self.report_definition_signature(report_type), self.report_header_row,
+              row_count, min_id, max_id, os.path.getmtime(self.output_file_path)))
+        self.conn.commit()
+
+    def plan_report_update(self, report_type, days_back):
+        """Decide how to bring the report at self.output_file_path up to date: 'skip', 'append' or 'full'"""
+        manifest = self.get_report_manifest(self.output_file_path)
+
+        if manifest is None or not os.path.exists(self.output_file_path):
+            return 'full'
+
+        # A changed summary definition, window or hand-edited file always means a rebuild
+        if (manifest['definition_signature'] != self.report_definition_signature(report_type)
+                or manifest['days_back'] != self.report_window_days(report_type, days_back)
+                or abs(os.path.getmtime(self.output_file_path) - (manifest['file_mtime'] or 0)) > 1e-6):
+            return 'full'
+
+        row_count, min_id, max_id = self.get_report_row_window(report_type, days_back)
+        if (row_count, min_id, max_id) == (manifest['row_count'], manifest['min_id'], manifest['max_id']):
+            return 'skip'
+
+        # Inserting is only valid when every row already in the report is still stored and, for a windowed
+        # report, still inside the window (rows age out while the sheet keeps them), and the new rows go
+        # right under the header, which only matches a rebuild when all of them sort first
+        still_present = self.get_report_row_window(report_type, days_back, max_id=manifest['max_id'])[0]
+        if (still_present == manifest['row_count'] and max_id > manifest['max_id']
+                and self.new_rows_sort_first(report_type, manifest['max_id'])):
+            return 'append'
+        return 'full'
+
+    def new_rows_sort_first(self, report_type, after_id):
+        """Whether every row added after after_id sorts above the report's existing rows"""
+        table_name = self.REPORT_LAYOUTS[report_type][0]
+        sort_column = self.REPORT_SORT_COLUMNS[report_type]
+        cursor = self.conn.cursor()
+        # NULLs sort last in a descending order, so a new NULL row is out of place below any dated row
+        cursor.execute(f'''
+            WITH existing AS (SELECT MAX({sort_column}) AS newest FROM {table_name} WHERE wallet_id = ? AND id <= ?)
+            SELECT COUNT(*) FROM {table_name}, existing
+            WHERE wallet_id = ? AND id > ? AND existing.newest IS NOT NULL
+                  AND ({sort_column} IS NULL OR {sort_column} < existing.newest)
+        ''', (self.wallet_id, after_id, self.wallet_id, after_id))
+        return cursor.fetchone()[0] == 0
+
+    @staticmethod
+    def to_cell_value(value):
+        """Convert pandas/NumPy scalars to plain Python values openpyxl can store"""
+        if value is None or (not isinstance(value, str) and pd.isna(value)):
+            return None
+        return value.item() if hasattr(value, 'item') else value
+
+    def rewrite_summary_block(self, worksheet, summary_df, extra_values=None):
+        """Overwrite the summary value rows under the row 1 header, matching columns by name"""
+        extra_values = extra_values or {}
+        headers = [cell.value for cell in worksheet[1]]
+
+        for offset, (_, summary_row) in enumerate(summary_df.iterrows()):
+            for col, header in enumerate(headers, 1):
+                if header in extra_values:
+                    worksheet.cell(row=2 + offset, column=col).value = extra_values[header]
+                elif header in summary_row.index:
+                    worksheet.cell(row=2 + offset, column=col).value = self.to_cell_value(summary_row[header])
+
+    def insert_rows_below_header(self, worksheet, header_row, rows_df):
+        """Insert frame rows (newest first) above the existing rows, matching columns to the header row by name.
+
+        Returns the first and last inserted row.
+        """
+        headers = [cell.value for cell in worksheet[header_row]]
+        first_row = header_row + 1
+        worksheet.insert_rows(first_row, amount=len(rows_df))
+
+        # openpyxl moves cells down but leaves their hyperlinks pointing at the old coordinates
+        for row in worksheet.iter_rows(min_row=first_row + len(rows_df)):
+            for cell in row:
+                if cell.hyperlink is not None:
+                    cell.hyperlink.ref = cell.coordinate
+
+        for offset, values in enumerate(rows_df.itertuples(index=False)):
+            row_values = dict(zip(rows_df.columns, values))
+            for col, header in enumerate(headers, 1):
+                if header in row_values:
+                    worksheet.cell(row=first_row + offset, column=col).value = self.to_cell_value(row_values[header])
+
+        return first_row, first_row + len(rows_df) - 1
+
+    def replace_fiat_summary_sheet(self, workbook, fiat_summary_df):
+        """Recreate the per-currency summary sheet from a fresh frame"""
+        if 'Fiat Summary' in workbook.sheetnames:
+            del workbook['Fiat Summary']
+        if fiat_summary_df.empty:
+            return
+
+        worksheet = workbook.create_sheet('Fiat Summary')
+        worksheet.append(list(fiat_summary_df.columns))
+        for values in fiat_summary_df.itertuples(index=False):
+            worksheet.append([self.to_cell_value(value) for value in values])
+
+    def append_to_transactions_report(self, days_back=None):
+        """Add rows ingested since the last run to the top of the transactions report and refresh its summary"""
+        manifest = self.get_report_manifest(self.output_file_path)
+        new_rows = self.get_wallet_transactions_from_db(days_back=days_back, after_id=manifest['max_id'])
+
+        workbook = load_workbook(self.output_file_path)
+        worksheet = workbook[self.REPORT_LAYOUTS['transactions'][1]]
+
+        self.rewrite_summary_block(worksheet, self.generate_summary_from_db(days_back=days_back),
+                                   extra_values={'sol_price_eur': self.solana_eur_price})
+        self.format_summary_pnl_cell(worksheet, self.find_summary_columns(worksheet))
+
+        first_row, last_row = self.insert_rows_below_header(worksheet, manifest['header_row'], new_rows)
+        self.apply_cell_borders(worksheet, first_row, last_row)
+        self.format_transaction_rows(worksheet, self.find_transaction_columns(worksheet, manifest['header_row']),
+                                     first_row, last_row)
+
+        self.replace_fiat_summary_sheet(workbook, self.generate_fiat_summary_from_db(days_back=days_back))
+        workbook.save(self.output_file_path)
+        print(f"✅ Appended {len(new_rows)} new transactions to {self.output_file_path}")
+
+        self.report_header_row = manifest['header_row']
+        self.record_report_manifest('transactions', days_back)
+
+    def append_to_sol_transfers_report(self, days_back=None):
+        """Add transfers ingested since the last run to the top of the SOL transfers report and refresh its summary"""
+        manifest = self.get_report_manifest(self.output_file_path)
+        new_rows = self.get_sol_transfers_from_db(days_back=days_back, after_id=manifest['max_id'])
+
+        workbook = load_workbook(self.output_file_path)
+        worksheet = workbook[self.REPORT_LAYOUTS['sol_transfers'][1]]
+
+        self.rewrite_summary_block(worksheet, self.generate_sol_transfers_summary_from_db(days_back=days_back))
+
+        first_row, last_row = self.insert_rows_below_header(worksheet, manifest['header_row'], new_rows)
+        self.apply_cell_borders(worksheet, first_row, last_row)
+        self.format_transfer_rows(worksheet, self.find_transfer_columns(worksheet, manifest['header_row']),
+                                  first_row, last_row)
+
+        self.replace_fiat_summary_sheet(workbook, self.generate_sol_transfers_fiat_summary_from_db(days_back=days_back))
+        workbook.save(self.output_file_path)
+        print(f"✅ Appended {len(new_rows)} new SOL transfers to {self.output_file_path}")
+
+        self.report_header_row = manifest['header_row']
+        self.record_report_manifest('sol_transfers', days_back)
+
+    """-----------------------------TRADE ANALYTICS-----------------------------------------------------"""
+
+    def get_trades_for_analytics(self, wallet_ids=None):
+        """Every stored trade of the given wallets (all wallets when None) in block order"""
+        query = '''
+            SELECT wt.id AS trade_id, wt.wallet_id, w.wallet_address,
+                   COALESCE(wt.token_mint, wt.token_symbol) AS token_mint, wt.token_symbol,
+                   wt.block_time_epoch, wt.time_traded, wt.spent_amount_lamports, wt.delta_sol_lamports,
+                   wt.earned_amount_eur_cents - wt.spent_amount_eur_cents AS delta_eur_cents
+            FROM wallet_transactions wt
+            JOIN wallets w ON wt.wallet_id = w.id
+        '''
+        params = []
+        if wallet_ids is not None:
+            query += f" WHERE wt.wallet_id IN ({','.join('?' for _ in wallet_ids)})"
+            params = list(wallet_ids)
+        archive_wallet_ids = wallet_ids if wallet_ids is not None else \
+            [row[0] for row in self.conn.execute("SELECT id FROM wallets")]
+
+        with self.reading_archive(wallet_ids=archive_wallet_ids):
+            trades = pd.read_sql_query(query, self.conn, params=params)
+        trades['token_mint'] = trades['token_mint'].astype('category')
+        trades['wallet_address'] = trades['wallet_address'].astype('category')
+        trades['hold_time'] = self.parse_durations(trades['time_traded'])
+        return trades.sort_values(['wallet_id', 'block_time_epoch', 'trade_id'], kind='stable').reset_index(drop=True)
+
+    @staticmethod
+    def drawdowns(cumulative_pnl, keys):
+        """Distance of a cumulative PnL series below its running peak (starting from zero) within each group"""
+        peak = cumulative_pnl.groupby(keys, observed=True).cummax().clip(lower=0)
+        return cumulative_pnl - peak
+
+    def compute_trade_analytics(self, trades):
+        """Cumulative PnL curves plus per-wallet and per-token trade statistics, all from grouped array operations.
+
+        Amounts stay in integer lamports and cents; save_analytics_to_excel converts them for display.
+        """
+        wallet_key = trades['wallet_id']
+        token_keys = [trades['wallet_id'], trades['token_mint']]
+
+        curve = trades[['wallet_address', 'token_mint', 'token_symbol', 'block_time_epoch',
+                        'delta_sol_lamports', 'delta_eur_cents']].copy()
+        curve['cumulative_pnl_sol_lamports'] = trades['delta_sol_lamports'].groupby(wallet_key).cumsum()
+        curve['cumulative_pnl_eur_cents'] = trades['delta_eur_cents'].groupby(wallet_key).cumsum()
+        curve['token_cumulative_pnl_sol_lamports'] = trades['delta_sol_lamports'].groupby(
+            token_keys, observed=True).cumsum()
+        curve['drawdown_sol_lamports'] = self.drawdowns(curve['cumulative_pnl_sol_lamports'], wallet_key)
+        curve['token_drawdown_sol_lamports'] = self.drawdowns(curve['token_cumulative_pnl_sol_lamports'], token_keys)
+        curve.insert(3, 'block_time', pd.to_datetime(trades['block_time_epoch'], unit='s'))
+        curve = curve.drop(columns=['block_time_epoch'])
+
+        stats_input = trades.assign(
+            win=(trades['delta_sol_lamports'] > 0).astype(int),
+            hold_seconds=trades['hold_time'].dt.total_seconds(),
+            drawdown_sol_lamports=curve['drawdown_sol_lamports'],
+            token_drawdown_sol_lamports=curve['token_drawdown_sol_lamports'],
+        )
+
+        def summarize(keys, drawdown_column):
+            grouped = stats_input.groupby(keys, observed=True, sort=False)
+            stats = grouped.agg(
+                trades=('delta_sol_lamports', 'size'),
+                wins=('win', 'sum'),
+                pnl_sol_lamports=('delta_sol_lamports', 'sum'),
+                pnl_eur_cents=('delta_eur_cents', 'sum'),
+                avg_hold_seconds=('hold_seconds', 'mean'),
+                max_drawdown_sol_lamports=(drawdown_column, 'min'),
+                best_trade_sol_lamports=('delta_sol_lamports', 'max'),
+                worst_trade_sol_lamports=('delta_sol_lamports', 'min'),
+            )
+            stats.insert(2, 'win_rate', stats['wins'] / stats['trades'])
+            # Which token the best and worst trades were in, via the row positions of the extremes
+            extremes = grouped['delta_sol_lamports']
+            stats['best_trade_token'] = stats_input.loc[extremes.idxmax(), 'token_symbol'].to_numpy()
+            stats['worst_trade_token'] = stats_input.loc[extremes.idxmin(), 'token_symbol'].to_numpy()
+            stats['avg_hold_time'] = self.format_durations(pd.to_timedelta(stats['avg_hold_seconds'].round(), unit='s'))
+            return stats.drop(columns=['avg_hold_seconds']).reset_index()
+
+        wallet_stats = summarize(['wallet_address'], 'drawdown_sol_lamports')
+        token_stats = summarize(['wallet_address', 'token_mint'], 'token_drawdown_sol_lamports')
+
+        # Display symbols from the mint metadata cache rather than the per-row (colliding) symbols
+        metadata = self.get_token_metadata(token_stats['token_mint'].astype(str))
+        token_stats.insert(2, 'token_symbol', token_stats['token_mint'].astype(str).map(metadata['token_symbol']))
+        token_stats = token_stats.sort_values(['wallet_address', 'pnl_sol_lamports'], ascending=[True, False])
+
+        return {'Wallet Stats': wallet_stats, 'Token Stats': token_stats, 'PnL Curve': curve}
+
+    def save_analytics_to_excel(self, wallet_addresses=None, all_wallets=False):
+        """Write wallet stats, token stats and the cumulative PnL curve as sheets of one analytics workbook"""
+        wallet_ids = None if all_wallets else self.resolve_wallet_ids(wallet_addresses)
+        trades = self.get_trades_for_analytics(wallet_ids)
+        if trades.empty:
+            print("❌ No trades found in database for the requested wallets.")
+            return False
+
+        started = time.perf_counter()
+        analytics = self.compute_trade_analytics(trades)
+        print(f"📈 Analytics for {len(trades):,} trades computed in {time.perf_counter() - started:.2f}s")
+
+        label = 'all_wallets' if all_wallets else (
+            'consolidated' if wallet_addresses and len(wallet_addresses) > 1 else self.wallet_address)
+        self.output_file_path = os.path.join(self.reports_folder, f"{label}_analytics.xlsx")
+
+        frames = {sheet_name: to_display_units(frame) for sheet_name, frame in analytics.items()}
+        if max(len(frame) for frame in frames.values()) > self.REPORT_SHEET_MAX_ROWS:
+            # One curve row per trade outgrows a sheet, and formatting every cell would not fit in memory
+            self.write_streamed_sheets(frames)
+        else:
+            with pd.ExcelWriter(self.output_file_path, engine='openpyxl') as writer:
+                for sheet_name, frame in frames.items():
+                    frame.to_excel(writer, sheet_name=sheet_name, index=False)
+
+            workbook = load_workbook(self.output_file_path)
+            for worksheet in workbook.worksheets:
+                self.apply_basic_sheet_formatting(worksheet)
+            workbook.save(self.output_file_path)
+
+        print(f"✅ Trade analytics generated: {self.output_file_path}")
+        print(to_display_units(analytics['Wallet Stats']).to_string(index=False))
+        return True
+
+    """-----------------------------DATA VALIDATION-----------------------------------------------------"""
+
+    # Check name -> vectorized mask of the rows failing it over the rule's columns
+    VALIDATION_CHECKS = {
+        'not_null': lambda df, columns: df[columns].isna().any(axis=1),
+        'non_negative': lambda df, columns: (df[columns] < 0).any(axis=1),
+        'positive': lambda df, columns: ~(df[columns] > 0).all(axis=1),
+        'unique': lambda df, columns: df.duplicated(subset=columns, keep='first'),
+    }
+
+    # Table -> (reason code, check, columns) in priority order; a failing row is quarantined under
+    # its first failed rule. Columns are named as in the fetched frames, before stored units.
+    VALIDATION_RULES = {
+        'wallet_transactions': [
+            ('missing_block_time', 'not_null', ['block_time']),
+            ('negative_amount', 'non_negative', ['spent_amount', 'earned_amount']),
+            ('missing_eur_price', 'positive', ['sol_eur_price']),
+            ('duplicate_row', 'unique', ['token_symbol', 'block_time', 'spent_amount', 'earned_amount',
+                                         'number_buys', 'number_sells']),
+        ],
+        'sol_transfers': [
+            ('missing_block_month', 'not_null', ['block_month']),
+            ('negative_amount', 'non_negative', ['sol_amount']),
+            ('missing_eur_price', 'positive', ['sol_eur_price']),
+            ('duplicate_row', 'unique', ['signature', 'transaction_label', 'sol_amount']),
+        ],
+        'wallet_swaps': [
+            ('missing_block_time', 'not_null', ['block_time']),
+            ('missing_swap_key', 'not_null', ['signature', 'token_mint']),
+            ('unknown_side', 'not_null', ['side']),
+            ('negative_amount', 'non_negative', ['token_amount', 'sol_amount']),
+            ('duplicate_row', 'unique', ['signature', 'event_index', 'token_mint', 'side']),
+        ],
+    }
+
+    def quarantine_invalid_rows(self, table_name, df, restore_columns):
+        """Return the rows of a fetched frame that pass VALIDATION_RULES; the rest go to quarantined_rows.
+
+        Every rule is one pandas mask over the whole frame, so validation stays linear in the rows.
+        Rules whose columns the frame lacks are skipped. Quarantined rows are stored as JSON in the
+        database column layout (restore_columns), and the rule counts are logged to validation_runs.
+        """
+        started = time.perf_counter()
+        masks, reasons, rule_failures = [], [], {}
+        for reason, check, columns in self.VALIDATION_RULES[table_name]:
+            if not set(columns).issubset(df.columns):
+                continue
+            failed = self.VALIDATION_CHECKS[check](df, columns).to_numpy()
+            masks.append(failed)
+            reasons.append(reason)
+            rule_failures[reason] = int(failed.sum())
+
+        row_reasons = np.select(masks, reasons, default='') if masks else np.full(len(df), '')
+        invalid = row_reasons != ''
+        quarantined = int(invalid.sum())
+
+        if quarantined:
+            row_data = restore_columns(df[invalid]).to_json(orient='records', lines=True).splitlines()
+            self.conn.executemany('''
+                INSERT OR IGNORE INTO quarantined_rows (wallet_id, source_table, reason, row_data)
+                VALUES (?, ?, ?, ?)
+            ''', [(self.wallet_id, table_name, reason, data) for reason, data in zip(row_reasons[invalid], row_data)])
+
+        duration_ms = (time.perf_counter() - started) * 1000
+        self.conn.execute('''
+            INSERT INTO validation_runs (wallet_id, source_table, checked_rows, quarantined_rows, rule_failures,
+                                         duration_ms)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (self.wallet_id, table_name, len(df), quarantined, json.dumps(rule_failures), duration_ms))
+        self.conn.commit()
+
+        failures = ", ".join(f"{reason} {count}" for reason, count in rule_failures.items() if count)
+        print(f"🧪 Validated {len(df)} {table_name} rows in {duration_ms:.0f} ms: "
+              f"{quarantined} quarantined" + (f" ({failures})" if failures else ""))
+        return df[~invalid].copy() if quarantined else df
+
+    """-----------------------------WALLET REFRESH-----------------------------------------------------"""
+
+    def insert_frame(self, table_name, df):
+        """Insert a frame into the open transaction (to_sql commits on its own, so it cannot be used here)"""
+        columns = ', '.join(df.columns)
+        placeholders = ', '.join('?' for _ in df.columns)
+        rows = df.astype(object).where(df.notna(), None).to_dict(orient='split')['data']
+        self.conn.executemany(f"INSERT INTO {table_name} ({columns}) VALUES ({placeholders})", rows)
+        return len(rows)
+
+    # Columns that identify a fetched row already stored by an earlier, overlapping fetch window
+    STORED_ROW_KEYS = {
+        'wallet_transactions': ['dexscreener', 'block_time', 'spent_amount_lamports', 'earned_amount_lamports',
+                                'number_buys', 'number_sells'],
+        'sol_transfers': ['solscan_link', 'transaction_label', 'sol_amount_lamports'],
+    }
+
+    # Takes rows about to be deleted back out of wallet_daily_rollups, mirroring its backfill statement;
+    # {where} selects the wallet_transactions rows
+    RETRACT_DAILY_ROLLUPS_SQL = '''
+        INSERT INTO wallet_daily_rollups (
+            wallet_id, day, trade_rows, spent_amount_lamports, earned_amount_lamports,
+            spent_amount_eur_cents, earned_amount_eur_cents, delta_sol_lamports
+        )
+        SELECT
+            wallet_id,
+            date(block_time_epoch, 'unixepoch'),
+            -COUNT(*),
+            -COALESCE(SUM(spent_amount_lamports), 0),
+            -COALESCE(SUM(earned_amount_lamports), 0),
+            -COALESCE(SUM(spent_amount_eur_cents), 0),
+            -COALESCE(SUM(earned_amount_eur_cents), 0),
+            -COALESCE(SUM(delta_sol_lamports), 0)
+        FROM wallet_transactions
+        WHERE {where} AND block_time_epoch IS NOT NULL
+        GROUP BY wallet_id, date(block_time_epoch, 'unixepoch')
+        ON CONFLICT (wallet_id, day) DO UPDATE SET
+            trade_rows = trade_rows + excluded.trade_rows,
+            spent_amount_lamports = spent_amount_lamports + excluded.spent_amount_lamports,
+            earned_amount_lamports = earned_amount_lamports + excluded.earned_amount_lamports,
+            spent_amount_eur_cents = spent_amount_eur_cents + excluded.spent_amount_eur_cents,
+            earned_amount_eur_cents = earned_amount_eur_cents + excluded.earned_amount_eur_cents,
+            delta_sol_lamports = delta_sol_lamports + excluded.delta_sol_lamports
+    '''
+
+    def delete_transaction_rows(self, where, params):
+        """Delete the wallet_transactions rows matching where inside the open transaction, taking them out of
+        the daily rollups and dropping their fiat valuations; returns how many were deleted"""
+        self.conn.execute(self.RETRACT_DAILY_ROLLUPS_SQL.format(where=where), params)
+        self.conn.execute("DELETE FROM wallet_daily_rollups WHERE wallet_id = ? AND trade_rows = 0", (self.wallet_id,))
+        self.conn.execute(f'''
+            DELETE FROM fiat_valuations
+            WHERE source_table = 'wallet_transactions'
+                  AND source_id IN (SELECT id FROM wallet_transactions WHERE {where})
+        ''', params)
+        deleted = self.conn.execute(f"DELETE FROM wallet_transactions WHERE {where}", params).rowcount
+        if deleted:
+            self.conn.execute('''
+                INSERT INTO wallet_data_versions (wallet_id, version) VALUES (?, 1)
+                ON CONFLICT (wallet_id) DO UPDATE SET version = version + 1
+            ''', (self.wallet_id,))
+        return deleted
+
+    def fetch_window_condition(self):
+        """SQL condition and params selecting this wallet's stored Dune trade rows inside the fetch window"""
+        where, params = "wallet_id = ? AND source = 'dune'", [self.wallet_id]
+        if self.days_back:
+            # From the start of the day: Dune gives some block times as a bare date
+            window_start = pd.Timestamp.now(tz='UTC').normalize() - pd.Timedelta(days=self.days_back)
+            where += " AND block_time_epoch >= ?"
+            params.append(int(window_start.timestamp()))
+        return where, params
+
+    def drop_unchanged_tokens(self, df):
+        """Trade rows of a frame in stored units, minus the tokens whose stored rows in the fetch window are
+        exactly the fetched ones"""
+        keys = self.STORED_ROW_KEYS['wallet_transactions']
+        where, params = self.fetch_window_condition()
+        stored = pd.read_sql_query(f"SELECT {', '.join(keys)} FROM wallet_transactions WHERE {where}",
+                                   self.conn, params=params)
+        if stored.empty:
+            return df
+
+        def token_rows(frame):
+            rows = frame[keys].astype(str).agg('|'.join, axis=1)
+            return rows.groupby(frame['dexscreener'].to_numpy()).agg(lambda token: tuple(sorted(token)))
+
+        fetched_tokens = token_rows(df)
+        unchanged = fetched_tokens.index[fetched_tokens == token_rows(stored).reindex(fetched_tokens.index)]
+        return df[~df['dexscreener'].isin(unchanged).to_numpy()]
+
+    def drop_stored_rows(self, table_name, df):
+        """Rows of a frame in stored units that this wallet does not have yet (hash anti-join on the row keys)"""
+        keys = self.STORED_ROW_KEYS[table_name]
+        stored = pd.read_sql_query(f"SELECT DISTINCT {', '.join(keys)} FROM {table_name} WHERE wallet_id = ?",
+                                   self.conn, params=[self.wallet_id])
+        if stored.empty:
+            return df
+
+        marked = df[keys].merge(stored, on=keys, how='left', indicator=True)
+        return df[(marked['_merge'] == 'left_only').to_numpy()]
+
+    def latest_archive_cutoff(self, table_name):
+        """Cutoff of the latest archive run that moved rows of this wallet's table to Parquet (None if none did)"""
+        return self.conn.execute(
+            "SELECT MAX(archive_cutoff) FROM archive_partitions WHERE wallet_id = ? AND source_table = ?",
+            (self.wallet_id, table_name)).fetchone()[0]
+
+    def drop_archived_rows(self, table_name, df):
+        """Rows of a frame in the database layout from at or after this wallet's latest archive cutoff of the table;
+        older rows are in the archive already, where the anti-joins on the hot tables cannot see them"""
+        cutoff = self.latest_archive_cutoff(table_name)
+        if cutoff is None or df.empty:
+            return df
+
+        if table_name == 'sol_transfers':
+            archived = df['block_month'].astype('string') < pd.Timestamp(cutoff, unit='s').strftime('%Y-%m-%d')
+        else:
+            block_times = self.parse_block_times(df['block_time'].astype('string'))
+            archived = block_times < pd.Timestamp(cutoff, unit='s')
+        archived = archived.fillna(False).to_numpy(dtype=bool)
+        if archived.any():
+            print(f"🗄️ Skipped {int(archived.sum())} fetched {table_name} rows from before the archive cutoff")
+        return df[~archived]
+
+    def ingest_fetched_frames(self, skip_stored=False):
+        """Save the fetched trades and SOL transfers, with their derived columns, in a single transaction.
+
+        skip_stored makes repeated, overlapping syncs idempotent. Dune trade rows are per-token totals over
+        the fetch window, so the fetched rows of a token replace its stored rows in the window (per
+        wallet_id and token_mint) unless they are unchanged; transfers already stored are dropped.
+        Rows from before the wallet's archive cutoff are always dropped, since the archive holds them.
+        """
+        frames = {}
+        if self.transaction_df is not None and not self.transaction_df.empty:
+            self.transaction_df['wallet_id'] = self.wallet_id
+            self.calculate_eur_values()
+            self.transaction_df = self.quarantine_invalid_rows('wallet_transactions', self.transaction_df,
+                                                               self.restore_transaction_columns)
+        if self.transaction_df is not None and not self.transaction_df.empty:
+            frames['wallet_transactions'] = to_stored_units(self.restore_transaction_columns(self.transaction_df))
+        if self.sol_transfers_df is not None and not self.sol_transfers_df.empty:
+            self.sol_transfers_df['wallet_id'] = self.wallet_id
+            self.sol_transfers_df = self.quarantine_invalid_rows('sol_transfers', self.sol_transfers_df,
+                                                                 self.restore_sol_transfers_columns)
+        if self.sol_transfers_df is not None and not self.sol_transfers_df.empty:
+            frames['sol_transfers'] = to_stored_units(self.restore_sol_transfers_columns(self.sol_transfers_df))
+
+        if not frames:
+            print("❌ Nothing fetched to save")
+            return False
+
+        frames = {table_name: self.drop_archived_rows(table_name, df) for table_name, df in frames.items()}
+        frames = {table_name: df for table_name, df in frames.items() if not df.empty}
+        if not frames:
+            print("✅ Everything fetched is already archived")
+            return True
+
+        if skip_stored:
+            frames = {table_name: (self.drop_unchanged_tokens(df) if table_name == 'wallet_transactions'
+                                   else self.drop_stored_rows(table_name, df))
+                      for table_name, df in frames.items()}
+            frames = {table_name: df for table_name, df in frames.items() if not df.empty}
+            if not frames:
+                print("✅ Everything fetched is already stored")
+                return True
+
+        try:
+            # IMMEDIATE takes the write lock up front, so the busy timeout applies instead of failing mid-transaction
+            self.conn.execute("BEGIN IMMEDIATE")
+            first_ids = {table_name: self.get_max_id(table_name) for table_name in frames}
+            for table_name, df in frames.items():
+                self.insert_frame(table_name, df)
+                apply_row_backfills(self.conn, table_name, first_ids[table_name],
+                                    self.get_max_id(table_name), commit=False)
+            if skip_stored and 'wallet_transactions' in frames:
+                # After the backfills, which fill token_mint of the new rows
+                where, params = self.fetch_window_condition()
+                replaced = self.delete_transaction_rows(
+                    f"{where} AND id <= ? AND token_mint IN "
+                    f"(SELECT token_mint FROM wallet_transactions WHERE wallet_id = ? AND id > ?)",
+                    [*params, first_ids['wallet_transactions'], self.wallet_id, first_ids['wallet_transactions']])
+                if replaced:
+                    print(f"♻️ Replaced {replaced} stored trade rows of re-fetched tokens")
+            if 'wallet_transactions' in frames:
+                covered = self.drop_dune_rows_covered_by_swaps()
+                if covered:
+                    print(f"♻️ Dropped {covered} fetched trade rows already counted from stored swaps")
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"❌ Error saving wallet refresh, nothing was written: {e}")
+            return False
+
+        print("✅ Saved " + ", ".join(f"{len(df)} rows to {table_name}" for table_name, df in frames.items())
+              + f" for wallet ID: {self.wallet_id} in one transaction")
+
+        # Derived data that can always be recomputed: internal-transfer tags and fiat valuations
+        portfolio_name = self.get_wallet_portfolio_name()
+        if 'sol_transfers' in frames and portfolio_name:
+            self.detect_internal_transfers(portfolio_name)
+        self.update_fiat_valuations()
+        return True
+
+    def refresh_wallet(self, skip_stored=False, write_reports=True):
+        """Fetch trades and SOL transfers concurrently, ingest both at once and write both Excel reports.
+
+        The two Dune executions wait in the queue side by side, so a refresh takes as long as the
+        slower query instead of the sum of both.
+        """
+        print(f"🔄 Refreshing wallet {self.wallet_address} (ID: {self.wallet_id})...")
+        started = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            transactions = pool.submit(self.fetch_data)
+            transfers = pool.submit(self.fetch_sol_transfers_data)
+            transactions.result()
+            try:
+                transfers.result()
+            except Exception as e:
+                print(f"❌ Error fetching SOL transfers from Dune: {e}")
+                self.sol_transfers_df = None
+        print(f"⏱️ Both Dune queries finished in {time.perf_counter() - started:.1f}s")
+
+        if not self.ingest_fetched_frames(skip_stored=skip_stored):
+            return False
+
+        if not write_reports:
+            print(f"✅ Wallet refresh completed in {time.perf_counter() - started:.1f}s")
+            return True
+
+        self.output_file_path = os.path.join(self.reports_folder, f"{self.wallet_address}.xlsx")
+        if self.transaction_df is not None and not self.transaction_df.empty:
+            print("Saving wallet transactions to Excel...")
+            self.save_to_excel()
+        if self.sol_transfers_df is not None and not self.sol_transfers_df.empty:
+            print("Saving SOL transfers to Excel...")
+            self.save_sol_transfers_to_excel()
+
+        print(f"✅ Wallet refresh completed in {time.perf_counter() - started:.1f}s")
+        return True
+
+    """-----------------------------SWAP-LEVEL INGESTION-----------------------------------------------------"""
+
+    # Columns of the swap query's rows, in the order they are stored
+    SWAP_COLUMNS = ['signature', 'event_index', 'token_mint', 'token_symbol', 'side', 'token_amount', 'sol_amount',
+                    'block_time']
+
+    def fetch_swaps_data(self):
+        """Fetch one row per swap event from Dune: signature, event_index (optional), token_mint,
+        token_symbol, side ('buy'/'sell'), token_amount, sol_amount and block_time"""
+        if not self.swap_query_id:
+            raise ValueError("SWAP_QUERY_ID is not set in .env")
+
+        swaps_query = QueryBase(query_id=self.swap_query_id, params=self.parameters)
+        self.swaps_df = self.dune.run_query_dataframe(swaps_query, performance='')
+        self.swaps_df.columns = [col.lower() for col in self.swaps_df.columns]
+        print(f"✅ Fetched {len(self.swaps_df)} swaps from Dune")
+        self.normalize_swaps_frame()
+
+    def normalize_swaps_frame(self):
+        """Parse block times and sides of the fetched swaps; unknown sides become NA and are quarantined"""
+        df = self.swaps_df
+        if df.empty:
+            return
+
+        if 'event_index' not in df.columns:
+            df['event_index'] = 0
+        side = df['side'].astype('string').str.strip().str.lower()
+        df['side'] = side.where(side.isin(['buy', 'sell']))
+        df['block_time'] = self.parse_block_times(df['block_time'].astype('string'))
+        df['token_symbol'] = df['token_symbol'].astype('category')
+
+    @staticmethod
+    def restore_swap_columns(df):
+        """Copy of a swaps frame with text block times, as quarantined rows are stored"""
+        df = df.copy()
+        df['block_time'] = df['block_time'].dt.strftime('%Y-%m-%d %H:%M:%S')
+        df['token_symbol'] = df['token_symbol'].astype(object)
+        return df
+
+    def save_swaps_to_database(self):
+        """Store the fetched swaps; swaps an overlapping fetch already stored are skipped by the primary key"""
+        if self.swaps_df is None or self.swaps_df.empty:
+            print("❌ No swaps to save")
+            return False
+
+        self.swaps_df = self.quarantine_invalid_rows('wallet_swaps', self.swaps_df, self.restore_swap_columns)
+        if self.swaps_df.empty:
+            print("❌ No valid swaps to save - every row was quarantined")
+            return False
+
+        swaps = to_stored_units(self.swaps_df[self.SWAP_COLUMNS])
+        swaps['token_symbol'] = swaps['token_symbol'].astype(object)
+        swaps['block_time_epoch'] = swaps.pop('block_time').astype('int64') // 10 ** 9
+        swaps.insert(0, 'wallet_id', self.wallet_id)
+        swaps.insert(1, 'block_month', pd.to_datetime(swaps['block_time_epoch'], unit='s').dt.strftime('%Y-%m'))
+        cutoff = self.latest_archive_cutoff('wallet_transactions')
+        if cutoff is not None:
+            # Swaps of archived trades were archived with them
+            swaps = swaps[swaps['block_time_epoch'] >= cutoff]
+
+        changes_before = self.conn.total_changes
+        self.conn.executemany(
+            f"INSERT OR IGNORE INTO wallet_swaps ({', '.join(swaps.columns)}) "
+            f"VALUES ({', '.join('?' for _ in swaps.columns)})",
+            swaps.astype(object).where(swaps.notna(), None).itertuples(index=False, name=None))
+        self.conn.commit()
+        print(f"✅ Stored {self.conn.total_changes - changes_before} new swaps of {len(swaps)} fetched "
+              f"for wallet ID: {self.wallet_id}")
+        return True
+
+    def aggregate_swaps(self, swaps):
+        """Per-token rows in the wallet_transactions layout from a wallet's stored swaps.
+
+        One vectorized groupby over the whole stored history, so a buy and a later sell land on the same
+        row: buys add to incoming tokens and SOL spent, sells to outgoing tokens and SOL earned, and
+        time_traded runs from the first buy to the last sell. Each swap is valued in EUR at the
+        historical SOL/EUR price of its own day.
+        """
+        is_buy = (swaps['side'] == 'buy').to_numpy()
+        tokens = swaps['token_amount'].to_numpy()
+        lamports = swaps['sol_amount_lamports'].to_numpy()
+        epochs = swaps['block_time_epoch']
+
+        price_dates = pd.to_datetime(epochs, unit='s').dt.strftime('%Y-%m-%d')
+        eur_prices = self.load_historical_sol_prices(price_dates.unique(), ['EUR'])['EUR']
+        swap_eur_price = price_dates.map(eur_prices).astype(float).fillna(self.solana_eur_price).to_numpy()
+        eur_cents = np.rint(lamports * swap_eur_price * CENTS_PER_UNIT / LAMPORTS_PER_SOL).astype('int64')
+
+        grouped = pd.DataFrame({
+            'token_mint': swaps['token_mint'],
+            'token_symbol': swaps['token_symbol'],
+            'incoming': np.where(is_buy, tokens, 0),
+            'outcome': np.where(is_buy, 0, tokens),
+            'spent_amount_lamports': np.where(is_buy, lamports, 0),
+            'earned_amount_lamports': np.where(is_buy, 0, lamports),
+            'spent_amount_eur_cents': np.where(is_buy, eur_cents, 0),
+            'earned_amount_eur_cents': np.where(is_buy, 0, eur_cents),
+            'number_buys': is_buy.astype('int64'),
+            'number_sells': (~is_buy).astype('int64'),
+            'first_epoch': epochs,
+            'last_epoch': epochs,
+            'first_buy_epoch': epochs.where(is_buy),
+            'last_sell_epoch': epochs.where(~is_buy),
+            'sol_eur_price': swap_eur_price,
+        }).sort_values('first_epoch', kind='stable').groupby('token_mint', sort=False).agg({
+            'token_symbol': 'last', 'incoming': 'sum', 'outcome': 'sum', 'spent_amount_lamports': 'sum',
+            'earned_amount_lamports': 'sum', 'spent_amount_eur_cents': 'sum', 'earned_amount_eur_cents': 'sum',
+            'number_buys': 'sum', 'number_sells': 'sum', 'first_epoch': 'min', 'last_epoch': 'max',
+            'first_buy_epoch': 'min', 'last_sell_epoch': 'max', 'sol_eur_price': 'first',
+        }).reset_index()
+
+        # Tokens bought before the stored history, or still held, use their first or last swap instead
+        held_from = grouped['first_buy_epoch'].fillna(grouped['first_epoch'])
+        held_until = grouped['last_sell_epoch'].fillna(grouped['last_epoch'])
+        spent = grouped['spent_amount_lamports']
+        earned = grouped['earned_amount_lamports']
+        trades = pd.DataFrame({
+            'wallet_id': self.wallet_id,
+            'token_symbol': grouped['token_symbol'],
+            'time_traded': self.format_durations(pd.to_timedelta((held_until - held_from).clip(lower=0), unit='s')),
+            'incoming': grouped['incoming'],
+            'outcome': grouped['outcome'],
+            'delta_token': grouped['incoming'] - grouped['outcome'],
+            'spent_amount_lamports': spent,
+            'earned_amount_lamports': earned,
+            'spent_amount_eur_cents': grouped['spent_amount_eur_cents'],
+            'earned_amount_eur_cents': grouped['earned_amount_eur_cents'],
+            'number_buys': grouped['number_buys'],
+            'number_sells': grouped['number_sells'],
+            'delta_sol_lamports': earned - spent,
+            # Tokens bought before the stored history have no SOL spent, so no percentage
+            'delta_percentage': (earned - spent) / spent.replace(0, np.nan) * 100,
+            'dexscreener': self.build_dexscreener_links(grouped['token_mint']),
+            'block_time': pd.to_datetime(grouped['first_epoch'], unit='s').dt.strftime('%Y-%m-%d %H:%M:%S'),
+            'sol_eur_price': grouped['sol_eur_price'],
+            'block_time_epoch': grouped['first_epoch'],
+            'token_mint': grouped['token_mint'],
+            'source': 'swaps',
+        })
+        return trades.sort_values('block_time_epoch', kind='stable')
+
+    def drop_dune_rows_covered_by_swaps(self):
+        """Delete this wallet's Dune trade rows of swapped tokens inside the time range its stored swaps cover,
+        inside the open transaction; the swap-derived rows count those trades instead. Returns how many"""
+        return self.delete_transaction_rows('''
+            wallet_id = ? AND source = 'dune'
+            AND token_mint IN (SELECT token_mint FROM wallet_swaps WHERE wallet_id = ?)
+            AND block_time_epoch BETWEEN
+                (SELECT MIN(block_time_epoch) - MIN(block_time_epoch) % 86400 FROM wallet_swaps WHERE wallet_id = ?)
+                AND (SELECT MAX(block_time_epoch) FROM wallet_swaps WHERE wallet_id = ?)
+        ''', [self.wallet_id] * 4)
+
+    def rebuild_transactions_from_swaps(self):
+        """Replace this wallet's swap-derived wallet_transactions rows with a fresh local aggregation.
+
+        One transaction takes the old rows out of the daily rollups, drops them with their fiat
+        valuations and inserts the new rows with the usual derived columns. Dune rows of the same
+        tokens in the time range the swaps cover go too, so no trade is counted twice. No Dune execution is
+        involved, so an accounting or price correction only costs local CPU time.
+        """
+        started = time.perf_counter()
+        swaps = pd.read_sql_query('''
+            SELECT token_mint, token_symbol, side, token_amount, sol_amount_lamports, block_time_epoch
+            FROM wallet_swaps
+            WHERE wallet_id = ?
+        ''', self.conn, params=[self.wallet_id])
+        if swaps.empty:
+            print("❌ No stored swaps for this wallet - fetch them first")
+            return False
+
+        trades = self.aggregate_swaps(swaps)
+        aggregated = time.perf_counter()
+
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            replaced = self.delete_transaction_rows("wallet_id = ? AND source = 'swaps'", (self.wallet_id,))
+            replaced += self.drop_dune_rows_covered_by_swaps()
+            first_id = self.get_max_id('wallet_transactions')
+            self.insert_frame('wallet_transactions', trades)
+            apply_row_backfills(self.conn, 'wallet_transactions', first_id,
+                                self.get_max_id('wallet_transactions'), commit=False)
+            self.conn.commit()
+        except Exception as e:
+            self.conn.rollback()
+            print(f"❌ Error rebuilding trades from swaps, nothing was changed: {e}")
+            return False
+
+        print(f"🔁 Rebuilt {len(trades)} per-token trades from {len(swaps)} swaps (replacing {replaced}) "
+              f"in {time.perf_counter() - started:.1f}s, {aggregated - started:.1f}s of it aggregating")
+        self.update_fiat_valuations()
+        return True
+
+    def run_swap_ingestion(self, fetch=True):
+        """Fetch new swaps from Dune (unless fetch=False), then rebuild the per-token trades locally"""
+        if fetch:
+            self.fetch_swaps_data()
+            self.save_swaps_to_database()
+        return self.rebuild_transactions_from_swaps()
+
+    """-----------------------------DATA RETENTION-----------------------------------------------------"""
+
+    # Table -> (partition year, condition taking the cutoff) of rows old enough to move to the archive.
+    # Rows without a block time stay in final.db. A swap-derived trade row moves once the last swap of its
+    # token is old enough, and only while it still counts exactly the stored swaps, so they can move with it.
+    ARCHIVE_SOURCES = {
+        'wallet_transactions': ("CAST(strftime('%Y', block_time_epoch, 'unixepoch') AS INTEGER)",
+                                """CASE WHEN source = 'swaps' THEN (
+                                       SELECT CASE WHEN COUNT(*) = wallet_transactions.number_buys
+                                                                   + wallet_transactions.number_sells
+                                                   THEN MAX(s.block_time_epoch) END
+                                       FROM main.wallet_swaps s
+                                       WHERE s.wallet_id = wallet_transactions.wallet_id
+                                             AND s.token_mint = wallet_transactions.token_mint)
+                                   ELSE block_time_epoch END < ?"""),
+        'sol_transfers': ("CAST(substr(block_month, 1, 4) AS INTEGER)",
+                          "block_month < strftime('%Y-%m-%d', ?, 'unixepoch')"),
+    }
+
+    @staticmethod
+    def archive_cutoffs(archive_after_days):
+        """Cutoff epoch per archived table: the block time for trades, the start of the cutoff month for transfers"""
+        cutoff = datetime.now(timezone.utc) - timedelta(days=archive_after_days)
+        month_start = cutoff.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        return {'wallet_transactions': int(cutoff.timestamp()), 'sol_transfers': int(month_start.timestamp())}
+
+    @staticmethod
+    def read_archive_file(path, last_archive_run):
+        """Rows of a Parquet partition committed by archive runs up to last_archive_run"""
+        frame = pd.read_parquet(path, dtype_backend='numpy_nullable')
+        # Rows written by a run that failed before its commit are still in the hot tables
+        return frame[frame['archive_run'] <= last_archive_run]
+
+    def archive_partition(self, table_name, wallet_id, wallet_address, year, cutoff, archive_run):
+        """Append one wallet's old rows of one year to its Parquet partition and delete them from final.db.
+
+        The rows are read, written and deleted under one write lock; the partition files are swapped
+        in right before the commit. Swap-derived trades take their token's stored swaps along, so a
+        rebuild from swaps cannot bring them back. Ids are never reused, so valuations and transfer
+        matches keep pointing at archived rows.
+        """
+        year_expression, age_condition = self.ARCHIVE_SOURCES[table_name]
+        where = f"wallet_id = ? AND {age_condition} AND {year_expression} = ?"
+        params = [wallet_id, cutoff, year]
+
+        folder = os.path.join(ARCHIVE_FOLDER, wallet_address)
+        os.makedirs(folder, exist_ok=True)
+        file_path = os.path.join(folder, f"{table_name}_{year}.parquet")
+        fiat_file_path = os.path.join(folder, f"{table_name}_{year}_fiat_valuations.parquet")
+        companions = {'fiat_valuations': fiat_file_path}
+        if table_name == 'wallet_transactions':
+            companions['wallet_swaps'] = os.path.join(folder, f"{table_name}_{year}_wallet_swaps.parquet")
+        swaps_where = (f"wallet_id = ? AND token_mint IN "
+                       f"(SELECT token_mint FROM main.{table_name} WHERE {where} AND source = 'swaps')")
+
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            rows = pd.read_sql_query(f"SELECT * FROM main.{table_name} WHERE {where}",
+                                     self.conn, params=params, dtype_backend='numpy_nullable')
+            fiat = pd.read_sql_query(f'''
+                SELECT * FROM main.fiat_valuations
+                WHERE source_table = ? AND source_id IN (SELECT id FROM main.{table_name} WHERE {where})
+            ''', self.conn, params=[table_name, *params], dtype_backend='numpy_nullable')
+            companion_rows = {'fiat_valuations': fiat}
+            if 'wallet_swaps' in companions:
+                companion_rows['wallet_swaps'] = pd.read_sql_query(
+                    f"SELECT * FROM main.wallet_swaps WHERE {swaps_where}", self.conn,
+                    params=[wallet_id, *params], dtype_backend='numpy_nullable')
+            rows['archive_run'] = archive_run
+            for frame in companion_rows.values():
+                frame['archive_run'] = archive_run
+
+            previous = self.conn.execute(
+                "SELECT last_archive_run FROM archive_partitions WHERE wallet_id = ? AND source_table = ? AND year = ?",
+                (wallet_id, table_name, year)).fetchone()
+            if previous:
+                rows = pd.concat([self.read_archive_file(file_path, previous[0]), rows], ignore_index=True)
+                for name, path in companions.items():
+                    # Partitions archived before swaps were archived have no swaps file
+                    if os.path.exists(path):
+                        companion_rows[name] = pd.concat([self.read_archive_file(path, previous[0]),
+                                                          companion_rows[name]], ignore_index=True)
+            created_at = rows['created_at'].dropna()
+            rows.to_parquet(file_path + '.tmp', index=False, compression='zstd')
+            for name, path in companions.items():
+                companion_rows[name].to_parquet(path + '.tmp', index=False, compression='zstd')
+
+            self.conn.execute(f'''
+                DELETE FROM main.fiat_valuations
+                WHERE source_table = ? AND source_id IN (SELECT id FROM main.{table_name} WHERE {where})
+            ''', [table_name, *params])
+            if 'wallet_swaps' in companions:
+                self.conn.execute(f"DELETE FROM main.wallet_swaps WHERE {swaps_where}", [wallet_id, *params])
+            archived = self.conn.execute(f"DELETE FROM main.{table_name} WHERE {where}", params).rowcount
+            self.conn.execute('''
+                INSERT INTO archive_partitions (
+                    wallet_id, source_table, year, file_path, fiat_file_path, row_count,
+                    min_created_at, max_created_at, last_archive_run, archive_cutoff
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (wallet_id, source_table, year) DO UPDATE SET
+                    file_path = excluded.file_path,
+                    fiat_file_path = excluded.fiat_file_path,
+                    row_count = excluded.row_count,
+                    min_created_at = excluded.min_created_at,
+                    max_created_at = excluded.max_created_at,
+                    last_archive_run = excluded.last_archive_run,
+                    archive_cutoff = MAX(COALESCE(archive_cutoff, excluded.archive_cutoff), excluded.archive_cutoff),
+                    archived_at = CURRENT_TIMESTAMP
+            ''', (wallet_id, table_name, int(year), file_path, fiat_file_path, len(rows),
+                  created_at.min() if not created_at.empty else None,
+                  created_at.max() if not created_at.empty else None, archive_run, cutoff))
+            self.bump_wallet_data_versions([wallet_id])
+
+            os.replace(file_path + '.tmp', file_path)
+            for path in companions.values():
+                os.replace(path + '.tmp', path)
+            self.conn.commit()
+        except Exception:
+            self.conn.rollback()
+            for path in [file_path, *companions.values()]:
+                if os.path.exists(path + '.tmp'):
+                    os.remove(path + '.tmp')
+            raise
+        return archived
+
+    def archive_old_rows(self, archive_after_days=None):
+        """Move every wallet's rows older than archive_after_days (by block time) to Parquet partitions.
+
+        Partitions are per wallet, table and year under ARCHIVE_FOLDER, each with the fiat valuations
+        of its rows. Daily rollups and token metadata stay in final.db.
+        """
+        if pyarrow is None:
+            print("❌ Archiving needs the pyarrow package: pip install pyarrow")
+            return False
+        if archive_after_days is None:
+            archive_after_days = int(os.getenv('ARCHIVE_AFTER_DAYS') or DEFAULT_ARCHIVE_AFTER_DAYS)
+
+        cutoffs = self.archive_cutoffs(archive_after_days)
+        archive_run = time.time_ns()
+        started = time.perf_counter()
+        archived_rows = {}
+        for table_name, (year_expression, age_condition) in self.ARCHIVE_SOURCES.items():
+            partitions = self.conn.execute(f'''
+                SELECT {table_name}.wallet_id, w.wallet_address, {year_expression} AS year
+                FROM main.{table_name}
+                JOIN wallets w ON {table_name}.wallet_id = w.id
+                WHERE {age_condition}
+                GROUP BY {table_name}.wallet_id, year
+            ''', (cutoffs[table_name],)).fetchall()
+            archived_rows[table_name] = sum(
+                self.archive_partition(table_name, wallet_id, wallet_address, year, cutoffs[table_name], archive_run)
+                for wallet_id, wallet_address, year in partitions)
+
+        print(f"🗄️ Archived {', '.join(f'{count} {table_name} rows' for table_name, count in archived_rows.items())} "
+              f"older than {archive_after_days} days to {ARCHIVE_FOLDER}/ in {time.perf_counter() - started:.1f}s")
+        return True
+
+    def compact_database(self):
+        """Hand free pages back to the filesystem with an incremental vacuum, then refresh planner statistics.
+
+        A database created before incremental auto-vacuum needs one full VACUUM to switch. VACUUM keeps
+        the INTEGER PRIMARY KEY ids that fiat valuations, report manifests and transfer matches refer to.
+        """
+        self.conn.commit()
+        page_size = self.conn.execute("PRAGMA page_size").fetchone()[0]
+        pages_before = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        started = time.perf_counter()
+
+        if self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+            self.conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            self.conn.execute("VACUUM")
+            print(f"🧹 Switched {self.db_name} to incremental auto-vacuum")
+        else:
+            # Each step frees one page; execute() stops after the first because the pragma returns no rows
+            self.conn.executescript("PRAGMA incremental_vacuum")
+
+        self.conn.execute("ANALYZE")
+        self.conn.commit()
+        pages_after = self.conn.execute("PRAGMA page_count").fetchone()[0]
+        print(f"🧹 {self.db_name}: {pages_before * page_size / 1e6:.1f} MB -> {pages_after * page_size / 1e6:.1f} MB, "
+              f"statistics refreshed in {time.perf_counter() - started:.1f}s")
+
+    def run_maintenance(self, archive_after_days=None):
+        """Archive old rows of every wallet, then compact final.db"""
+        if self.archive_old_rows(archive_after_days) is False:
+            return False
+        self.compact_database()
+        return True
+
+    @classmethod
+    def archived_partitions(cls, conn, wallet_ids, windows=None):
+        """Archive partitions of the given wallets holding rows inside their table's days_back window.
+
+        windows maps source tables to a days_back window; tables without one (or with a falsy one) are read whole.
+        """
+        placeholders = ','.join('?' for _ in wallet_ids)
+        query = f"SELECT * FROM archive_partitions WHERE wallet_id IN ({placeholders})"
+        params = list(wallet_ids)
+        for table_name, days_back in (windows or {}).items():
+            if days_back:
+                query += " AND (source_table != ? OR max_created_at >= ?)"
+                params += [table_name, cls.created_at_cutoff(days_back)]
+        return pd.read_sql_query(query, conn, params=params)
+
+    def report_archive_windows(self, days_back):
+        """Archive window per table of a report method called with days_back.
+
+        None falls back like the detail queries do (trades to self.days_back, transfers to all time), and
+        report methods mix their own window with self.days_back, so the wider of the two decides.
+        """
+        windows = {}
+        for report_type, (table_name, *_) in self.REPORT_LAYOUTS.items():
+            window = self.report_window_days(report_type, days_back)
+            windows[table_name] = max(window, self.days_back) if window and self.days_back else None
+        return windows
+
+    @staticmethod
+    def archive_generation(partitions):
+        """Which archived rows are visible: summaries cached under another generation do not apply"""
+        return tuple(sorted(partitions[['wallet_id', 'source_table', 'year', 'last_archive_run']]
+                            .itertuples(index=False, name=None)))
+
+    @classmethod
+    @contextlib.contextmanager
+    def archive_views(cls, conn, partitions):
+        """Make the rows of archive partitions visible to the queries run on conn inside.
+
+        SQLite resolves unqualified table names in the temp schema first, so a TEMP VIEW named like
+        wallet_transactions, sol_transfers or fiat_valuations gives every report query the UNION ALL of
+        the hot table and a TEMP table holding only the archived rows.
+        """
+        if pyarrow is None:
+            raise ImportError("Reading archived partitions needs the pyarrow package: pip install pyarrow")
+
+        archived = {}
+        owned = pd.read_sql_query("SELECT id AS wallet_id, portfolio_id, wallet_address FROM wallets "
+                                  "WHERE portfolio_id IS NOT NULL", conn)
+        for partition in partitions.itertuples(index=False):
+            rows = cls.read_archive_file(partition.file_path, partition.last_archive_run)
+            fiat = cls.read_archive_file(partition.fiat_file_path, partition.last_archive_run)
+            if partition.source_table == 'sol_transfers':
+                # Portfolios may have changed since archiving
+                rows = rows.merge(owned[['wallet_id', 'portfolio_id']], on='wallet_id', how='left')
+                rows['portfolio_id'] = rows['portfolio_id'].astype('Int64')
+                rows['is_internal'] = (rows['portfolio_id'].notna()
+                                       & cls.internal_transfer_mask(rows, owned)).astype(int)
+                rows['internal_match_id'] = rows['internal_match_id'].where(rows['is_internal'] == 1)
+
+            archived.setdefault(partition.source_table, []).append(rows)
+            archived.setdefault('fiat_valuations', []).append(fiat)
+
+        try:
+            for table_name, frames in archived.items():
+                columns = [row[1] for row in conn.execute(f"PRAGMA main.table_info({table_name})")]
+                column_list = ', '.join(columns)
+                conn.execute(f"CREATE TEMP TABLE archived_{table_name} AS SELECT * FROM main.{table_name} WHERE 0")
+                for frame in frames:
+                    frame = frame[[column for column in columns if column in frame.columns]]
+                    conn.executemany(
+                        f"INSERT INTO temp.archived_{table_name} ({', '.join(frame.columns)}) "
+                        f"VALUES ({', '.join('?' for _ in frame.columns)})",
+                        frame.astype(object).where(frame.notna(), None).itertuples(index=False, name=None))
+
+                # Plain copies of the hot table's indexes, so archived rows are searched the same way
+                for index in conn.execute(f"PRAGMA main.index_list({table_name})").fetchall():
+                    index_columns = [info[2] for info in conn.execute(f"PRAGMA main.index_info({index[1]})")]
+                    if None not in index_columns:
+                        conn.execute(f"CREATE INDEX temp.archived_{index[1]} "
+                                     f"ON archived_{table_name} ({', '.join(index_columns)})")
+                conn.execute(f"CREATE TEMP VIEW {table_name} AS "
+                             f"SELECT {column_list} FROM main.{table_name} "
+                             f"UNION ALL SELECT {column_list} FROM temp.archived_{table_name}")
+            conn.commit()
+            yield
+        finally:
+            for table_name in archived:
+                conn.execute(f"DROP VIEW IF EXISTS temp.{table_name}")
+                conn.execute(f"DROP TABLE IF EXISTS temp.archived_{table_name}")
+            conn.commit()
+
+    @contextlib.contextmanager
+    def reading_archive(self, days_back=None, wallet_ids=None, windows=None):
+        """Make archived rows of the wallets (this wallet by default) visible to the queries run inside.
+
+        days_back is the window of the queries run inside (all time when None), widened to self.days_back;
+        windows gives each table its own instead. When no archived partition falls in the window nothing
+        is loaded and the hot tables are read directly.
+        """
+        wallet_ids = [self.wallet_id] if wallet_ids is None else list(wallet_ids)
+        if self.archive_shadowed or not wallet_ids:
+            yield
+            return
+
+        if windows is None:
+            windows = dict.fromkeys(self.ARCHIVE_SOURCES,
+                                    max(days_back, self.days_back) if days_back and self.days_back else None)
+        partitions = self.archived_partitions(self.conn, wallet_ids, windows)
+        if partitions.empty:
+            yield
+            return
+
+        with self.archive_views(self.conn, partitions):
+            self.archive_shadowed = True
+            self.archive_generation_key = self.archive_generation(partitions)
+            try:
+                yield
+            finally:
+                self.archive_shadowed = False
+                self.archive_generation_key = ()
+
+    """-----------------------------QUERY PLAN DIAGNOSTICS-----------------------------------------------------"""
+
+    # Table sizes the report queries are timed at; filler rows belong to other wallets
+    QUERY_PLAN_SIZES = [1_000, 10_000, 100_000]
+    QUERY_PLAN_GROWN_TABLES = ['wallet_transactions', 'sol_transfers']
+    QUERY_PLAN_FILLER_WALLETS = 100
+
+    def report_query_calls(self):
+        """Every report entry point whose SQL the diagnostics check"""
+        return [
+            ('summary', self.generate_summary_from_db),
+            ('transactions', self.get_wallet_transactions_from_db),
+            ('fiat_summary', self.generate_fiat_summary_from_db),
+            ('token_summary', self.generate_token_summary_from_db),
+            ('sol_transfers_summary', self.generate_sol_transfers_summary_from_db),
+            ('sol_transfers', self.get_sol_transfers_from_db),
+            ('sol_transfers_fiat_summary', self.generate_sol_transfers_fiat_summary_from_db),
+            ('tax_disposals', lambda: self.get_disposals_from_db([self.wallet_id])),
+            ('portfolio_summary', self.generate_portfolio_summary_from_db),
+            ('portfolio_sol_transfers_summary', self.generate_portfolio_sol_transfers_summary_from_db),
+            ('report_row_window', lambda: self.get_report_row_window('transactions', self.days_back)),
+        ]
+
+    def capture_report_queries(self):
+        """Run each report entry point with SQL tracing on and keep its SELECTs, parameters inlined"""
+        captured = []
+        # Measure the cold path: warm caches would skip the queries
+        self.token_cache.clear()
+        self.summary_cache.clear()
+        for name, call in self.report_query_calls():
+            statements = []
+            self.conn.set_trace_callback(statements.append)
+            try:
+                call()
+            finally:
+                self.conn.set_trace_callback(None)
+            selects = [sql for sql in statements if sql.lstrip().upper().startswith(('SELECT', 'WITH'))]
+            for index, sql in enumerate(selects, 1):
+                captured.append((name if len(selects) == 1 else f"{name}#{index}", sql))
+        return captured
+
+    def grow_table(self, conn, table_name, target_rows):
+        """Copy existing rows onto filler wallets until the table holds target_rows"""
+        # Filler copies get ids of their own
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table_name})") if row[1] != 'id']
+        filler_ids = [row[0] for row in conn.execute(
+            "SELECT id FROM wallets WHERE wallet_address LIKE 'diagnostics_filler_%' ORDER BY id")]
+        select_list = ', '.join(
+            f"{filler_ids[0]} + (id % {len(filler_ids)})" if column == 'wallet_id' else column for column in columns)
+
+        while True:
+            row_count = conn.execute(f"SELECT COUNT(*) FROM {table_name}").fetchone()[0]
+            if row_count == 0 or row_count >= target_rows:
+                return row_count
+            conn.execute(f"INSERT INTO {table_name} ({', '.join(columns)}) "
+                         f"SELECT {select_list} FROM {table_name} LIMIT ?", (target_rows - row_count,))
+            conn.commit()
+
+    @staticmethod
+    def flag_query_plan(conn, sql):
+        """EXPLAIN QUERY PLAN lines plus the full table scans and temp B-trees among them"""
+        plan = [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")]
+        tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+
+        # Plans name tables by alias, so map "FROM wallet_transactions wt" style references back
+        aliases = {}
+        for table, alias in re.findall(r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(\w+))?', sql, flags=re.IGNORECASE):
+            if table in tables:
+                aliases[table] = table
+                if alias and alias.upper() not in ('WHERE', 'JOIN', 'ON', 'LEFT', 'INNER', 'GROUP', 'ORDER', 'USING'):
+                    aliases[alias] = table
+
+        scans = []
+        for detail in plan:
+            match = re.match(r'SCAN (\w+)', detail)
+            # A covering index scan reads every entry too, only SEARCH seeks
+            if match and match.group(1) in aliases:
+                scans.append(aliases[match.group(1)] + (' (index)' if 'INDEX' in detail else ''))
+        temp_btrees = [detail.replace('USE TEMP B-TREE FOR ', '') for detail in plan if 'TEMP B-TREE' in detail]
+        return plan, scans, temp_btrees
+
+    @staticmethod
+    def time_query(conn, sql, repeats=3):
+        """Median wall time of a query in milliseconds"""
+        timings = []
+        for _ in range(repeats):
+            started = time.perf_counter()
+            conn.execute(sql).fetchall()
+            timings.append((time.perf_counter() - started) * 1000)
+        return float(np.median(timings))
+
+    def run_query_plan_diagnostics(self, sizes=None):
+        """EXPLAIN and time every report query on a scratch copy of the database grown to each size.
+
+        Flags full scans and temp B-tree sorts; a query whose time grows with the table while this
+        wallet's rows stay the same is not using an index for its wallet filter.
+        """
+        sizes = sizes or self.QUERY_PLAN_SIZES
+        scratch = sqlite3.connect(':memory:')
+        self.conn.backup(scratch)
+        scratch.executemany("INSERT INTO wallets (wallet_address, wallet_name) VALUES (?, 'diagnostics filler')",
+                            [(f'diagnostics_filler_{i}',) for i in range(self.QUERY_PLAN_FILLER_WALLETS)])
+        scratch.commit()
+
+        live_conn, self.conn = self.conn, scratch
+        results = []
+        try:
+            for size in sorted(sizes):
+                table_rows = {table: self.grow_table(scratch, table, size) for table in self.QUERY_PLAN_GROWN_TABLES}
+                print(f"🔬 Timing report queries at {size:,} rows "
+                      f"({', '.join(f'{table}={rows:,}' for table, rows in table_rows.items())})")
+
+                for name, sql in self.capture_report_queries():
+                    plan, scans, temp_btrees = self.flag_query_plan(scratch, sql)
+                    results.append({
+                        'query': name,
+                        'table_rows': size,
+                        'ms': round(self.time_query(scratch, sql), 3),
+                        'full_scans': ', '.join(scans),
+                        'temp_btrees': ', '.join(temp_btrees),
+                        'plan': ' | '.join(plan),
+                    })
+        finally:
+            self.conn = live_conn
+            scratch.close()
+
+        diagnostics = pd.DataFrame(results)
+        timings = diagnostics.pivot_table(index='query', columns='table_rows', values='ms', sort=False)
+        flags = diagnostics.drop_duplicates('query', keep='last').set_index('query')[['full_scans', 'temp_btrees']]
+        print("\nReport query timings (ms) and plan flags:")
+        print(timings.join(flags).to_string())
+
+        flagged = flags[(flags['full_scans'] != '') | (flags['temp_btrees'] != '')]
+        if flagged.empty:
+            print("✅ Every report query seeks through an index without temp sorts")
+        else:
+            print(f"⚠️ {len(flagged)} report queries scan tables or sort through temp B-trees")
+        return diagnostics
+
+    """-----------------------------ANALYTICS ENGINE-----------------------------------------------------"""
+
+    # Rows per grown table in the SQLite vs DuckDB benchmark
+    ENGINE_BENCHMARK_ROWS = 1_000_000
+
+    @staticmethod
+    def created_at_cutoff(days_back):
+        """Lower created_at bound of a days_back window, formatted like SQLite's CURRENT_TIMESTAMP (UTC)"""
+        return (datetime.now(timezone.utc) - timedelta(days=days_back)).strftime('%Y-%m-%d %H:%M:%S')
+
+    def read_summary_query(self, query, params):
+        """Run a summary query on SQLite, or on the DuckDB copy of the tables when ANALYTICS_ENGINE=duckdb"""
+        # The DuckDB copy holds the hot tables only
+        if self.analytics_engine == 'sqlite' or self.archive_shadowed:
+            return pd.read_sql_query(query, self.conn, params=params)
+        if self.duckdb_engine is None:
+            self.duckdb_engine = DuckDBSummaryEngine(self.db_name)
+        return self.duckdb_engine.read_query(self.conn, query, params)
+
+    def engine_benchmark_calls(self):
+        """Summaries timed on both engines: this wallet's, then every wallet's through one portfolio"""
+        return [
+            ('summary', self.generate_summary_from_db),
+            ('sol_transfers_summary', self.generate_sol_transfers_summary_from_db),
+            ('portfolio_summary', self.generate_portfolio_summary_from_db),
+            ('portfolio_sol_transfers_summary', self.generate_portfolio_sol_transfers_summary_from_db),
+        ]
+
+    def benchmark_summary_engines(self, rows=None, repeats=3):
+        """Time the summaries on SQLite and DuckDB over a scratch copy of the database grown to rows.
+
+        Filler rows are copies of the stored ones spread over filler wallets, all of them in one
+        portfolio, so the portfolio summaries aggregate the whole table. Both engines must return
+        the same frames; DuckDB's one-off load of the tables is reported apart from query times.
+        """
+        if duckdb is None:
+            print("❌ The engine benchmark needs the duckdb package: pip install duckdb")
+            return None
+        rows = rows or self.ENGINE_BENCHMARK_ROWS
+
+        scratch_path = os.path.join(tempfile.mkdtemp(prefix='engine_benchmark_'), self.db_name)
+        scratch = sqlite3.connect(scratch_path)
+        self.conn.backup(scratch)
+        scratch.executemany("INSERT INTO wallets (wallet_address, wallet_name) VALUES (?, 'diagnostics filler')",
+                            [(f'diagnostics_filler_{i}',) for i in range(self.QUERY_PLAN_FILLER_WALLETS)])
+        scratch.execute("INSERT OR IGNORE INTO portfolios (portfolio_name, description) "
+                        "VALUES ('engine benchmark', 'every wallet')")
+        scratch.execute("UPDATE wallets SET portfolio_id = (SELECT id FROM portfolios "
+                        "WHERE portfolio_name = 'engine benchmark')")
+        scratch.commit()
+        table_rows = {table: self.grow_table(scratch, table, rows) for table in ANALYTICS_ENGINE_TABLES}
+        print(f"🏁 Benchmarking summary engines at {', '.join(f'{table}={n:,}' for table, n in table_rows.items())}")
+
+        live = (self.conn, self.analytics_engine, self.duckdb_engine)
+        self.conn, self.duckdb_engine = scratch, DuckDBSummaryEngine(scratch_path)
+        results, frames = [], {}
+        try:
+            started = time.perf_counter()
+            self.duckdb_engine.refresh(scratch)
+            load_seconds = time.perf_counter() - started
+            load_path = 'sqlite extension' if self.duckdb_engine.attached else 'pandas'
+
+            for engine in ('sqlite', 'duckdb'):
+                self.analytics_engine = engine
+                for name, call in self.engine_benchmark_calls():
+                    timings = []
+                    for _ in range(repeats):
+                        self.summary_cache.clear()
+                        started = time.perf_counter()
+                        frames[(engine, name)] = call()
+                        timings.append((time.perf_counter() - started) * 1000)
+                    results.append({'query': name, 'engine': engine, 'ms': round(float(np.median(timings)), 1)})
+        finally:
+            self.duckdb_engine.close()
+            self.conn, self.analytics_engine, self.duckdb_engine = live
+            self.summary_cache.clear()
+            scratch.close()
+            os.remove(scratch_path)
+
+        benchmark = pd.DataFrame(results).pivot_table(index='query', columns='engine', values='ms', sort=False)
+        benchmark['speedup'] = (benchmark['sqlite'] / benchmark['duckdb']).round(1)
+        benchmark['same_result'] = [self.summary_frames_match(frames[('sqlite', name)], frames[('duckdb', name)])
+                                    for name in benchmark.index]
+        print(f"\nSummary query timings (ms); DuckDB loaded the tables in {load_seconds:.1f}s via {load_path}:")
+        print(benchmark.to_string())
+        return benchmark
+
+    @staticmethod
+    def summary_frames_match(sqlite_df, duckdb_df):
+        """Same rows and values up to float summation order"""
+        try:
+            pd.testing.assert_frame_equal(sqlite_df.reset_index(drop=True), duckdb_df.reset_index(drop=True),
+                                          check_dtype=False, rtol=1e-9)
+            return True
+        except AssertionError:
+            return False
+
     def close_connection(self):
         """Close database connection"""
+        if self.duckdb_engine is not None:
+            self.duckdb_engine.close()
+            self.duckdb_engine = None
         if self.conn:
             self.conn.close()
+            # Reports built on worker threads are garbage-collected elsewhere; __del__ must not touch the connection
+            self.conn = None
 
     def __del__(self):
         """Ensure database connection is closed"""
@@ -1164,8 +4857,18 @@ if __name__ == "__main__":
     print("2. Generate wallet transactions Excel from existing database data")
     print("3. Fetch SOL transfers data from Dune")
     print("4. Generate SOL transfers Excel from existing database data")
-
-    choice = input("Enter your choice (1/2/3/4): ").strip()
+    print("5. Generate tax-year report from existing database data")
+    print("6. Generate portfolio report from existing database data")
+    print("7. Run query-plan diagnostics on the report queries")
+    print("8. Refresh wallet: fetch transactions and SOL transfers from Dune in parallel")
+    print("9. Generate trade analytics (per-token PnL, win rate, drawdown) from existing database data")
+    print("10. Benchmark the summary queries on SQLite vs DuckDB at 1M rows")
+    print("11. Generate monthly/quarterly/yearly breakdown from existing database data")
+    print("12. Fetch swap-level data from Dune and rebuild per-token trades locally")
+    print("13. Generate HTML report (view-only, fast) from existing database data")
+    print("14. Database maintenance: archive old rows to Parquet, then vacuum and analyze")
+
+    choice = input("Enter your choice (1/2/3/4/5/6/7/8/9/10/11/12/13/14): ").strip()
 
     if choice == "1":
         # Fetch wallet transactions from Dune
@@ -1185,7 +4888,7 @@ if __name__ == "__main__":
         days_back = int(days) if days else None
         report.get_wallet_transactions_from_db(days_back=days_back)
         report.generate_summary_from_db(days_back=days_back)
-        report.generate_excel_from_db(days_back=days_back)
+        report.generate_excel_from_db(days_back=days_back, incremental=True)
 
     elif choice == "3":
         # Fetch SOL transfers from Dune
@@ -1198,10 +4901,64 @@ if __name__ == "__main__":
         print("Fetching SOL transfers from database...")
         report.generate_sol_transfers_summary_from_db(days_back=days_back)
         print("Generating SOL transfers Excel from database...")
-        report.generate_sol_transfers_excel_from_db(days_back=days_back)
+        report.generate_sol_transfers_excel_from_db(days_back=days_back, incremental=True)
+
+    elif choice == "5":
+        # Consolidated tax-year report over the full stored history
+        extra = input("Additional wallet addresses to consolidate (comma-separated, or press Enter for none): ")
+        wallets = [wallet_address] + [address.strip() for address in extra.split(',') if address.strip()]
+        years = input("Tax years (comma-separated, or press Enter for all): ")
+        tax_years = [int(year) for year in years.split(',') if year.strip()] or None
+        report.save_tax_year_report_to_excel(wallet_addresses=wallets, tax_years=tax_years)
+
+    elif choice == "6":
+        # Consolidated per-wallet and total summary for a group of wallets
+        portfolio_name = input("Portfolio name: ").strip()
+        extra = input("Wallet addresses to add to this portfolio (comma-separated, or press Enter for none): ")
+        wallets = [wallet_address] + [address.strip() for address in extra.split(',') if address.strip()]
+        report.assign_wallets_to_portfolio(portfolio_name, wallets)
+        report.save_portfolio_report_to_excel(portfolio_name, days_back=days_back)
+
+    elif choice == "7":
+        # EXPLAIN QUERY PLAN and timings of every report query on a scratch copy of the database
+        report.run_query_plan_diagnostics()
+
+    elif choice == "8":
+        # Both Dune queries at once, one ingest transaction, then both Excel reports
+        report.refresh_wallet()
+
+    elif choice == "9":
+        # PnL curves and trade statistics, for this wallet or every stored wallet
+        every_wallet = input("Include every wallet in the database? (y/N): ").strip().lower() == 'y'
+        report.save_analytics_to_excel(all_wallets=every_wallet)
+
+    elif choice == "10":
+        # Same summary SQL on both engines over a scratch copy grown to 1M rows per table
+        report.benchmark_summary_engines()
+
+    elif choice == "11":
+        # Summary columns per calendar period (REPORT_TIMEZONE) in one grouped query
+        period = input("Period (month/quarter/year, or press Enter for month): ").strip().lower() or 'month'
+        report.save_period_breakdown_to_excel(period)
+
+    elif choice == "12":
+        # Raw swaps kept locally; the per-token rows are re-aggregated from them without Dune
+        fetch = input("Fetch new swaps from Dune first? (Y/n): ").strip().lower() != 'n'
+        report.run_swap_ingestion(fetch=fetch)
+
+    elif choice == "13":
+        # Same colours and links as the Excel reports, written as CSS classes in one streamed page
+        transfers = input("Report on SOL transfers instead of transactions? (y/N): ").strip().lower() == 'y'
+        report.generate_html_report_from_db('sol_transfers' if transfers else 'transactions', days_back=days_back)
+
+    elif choice == "14":
+        # Every wallet's rows older than ARCHIVE_AFTER_DAYS; reports read the archive back when they reach it
+        after = input(f"Archive rows older than how many days? (or press Enter for "
+                      f"{os.getenv('ARCHIVE_AFTER_DAYS') or DEFAULT_ARCHIVE_AFTER_DAYS}): ").strip()
+        report.run_maintenance(int(after) if after else None)
 
     else:
-        print("Invalid choice. Please select 1, 2, 3, or 4.")
+        print("Invalid choice. Please select 1, 2, 3, 4, 5, 6, 7, 8, 9, 10, 11, 12, 13, or 14.")
 
     report.close_connection()
 
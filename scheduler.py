@@ -0,0 +1,222 @@
+"""Background wallet syncs from a SQLite job queue: python scheduler.py (SYNC_* and DUNE_DAILY_BUDGET in .env)"""
+import math
+import os
+import random
+import socket
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from dotenv import load_dotenv
+
+from main import SQLITE_BUSY_TIMEOUT_SECONDS, SOLReport, apply_migrations
+
+
+# Seconds between scheduler passes over the wallets and the queue
+SCHEDULER_TICK_SECONDS = 30
+
+# Sync interval by activity: (minimum trades in the last 7 days, minutes between syncs), most active first
+SYNC_INTERVAL_TIERS = [(20, 60), (1, 6 * 60), (0, 24 * 60)]
+
+# Longest Dune window a sync asks for; shorter when the wallet synced recently
+SYNC_MAX_DAYS_BACK = 15
+
+# Job type -> (SOLReport call, Dune query ids it executes)
+SYNC_JOB_TYPES = {
+    'refresh': (lambda report: report.refresh_wallet(skip_stored=True, write_reports=False),
+                ['TRANSACTION_QUERY_ID', 'SOL_TRANSFER_QUERY_ID']),
+}
+
+
+class SyncJobQueue:
+    """sync_jobs table operations; every call opens its own connection so worker threads can share it"""
+
+    def __init__(self, db_name, daily_budget, max_attempts, retry_base_seconds):
+        self.db_name = db_name
+        self.daily_budget = daily_budget
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+
+    def connect(self):
+        return sqlite3.connect(self.db_name, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+
+    def enqueue_due_syncs(self, now=None):
+        """Queue a refresh for every enabled wallet whose interval has passed, most active first.
+
+        Wallets without data or without a successful sync are due at once, and a sync asks for the
+        days since the last successful one started. The partial unique index turns a second job for
+        a wallet that is already queued or running into a no-op.
+        """
+        now = int(now or time.time())
+        tiers = ' '.join(f"WHEN recent_trades >= {trades} THEN {minutes}" for trades, minutes in SYNC_INTERVAL_TIERS)
+        conn = self.connect()
+        try:
+            cursor = conn.execute(f'''
+                INSERT OR IGNORE INTO sync_jobs (wallet_id, job_type, priority, days_back, run_after)
+                SELECT id, 'refresh', recent_trades,
+                       CASE WHEN has_data AND synced_epoch IS NOT NULL
+                            THEN MIN(?, MAX(1, CAST((? - synced_epoch) / 86400 AS INTEGER) + 1))
+                            ELSE ? END, ?
+                FROM (
+                    SELECT w.id,
+                           w.last_synced_at AS synced_epoch,
+                           w.sync_interval_minutes,
+                           EXISTS (SELECT 1 FROM wallet_transactions wt WHERE wt.wallet_id = w.id) AS has_data,
+                           (SELECT COALESCE(SUM(r.trade_rows), 0) FROM wallet_daily_rollups r
+                            WHERE r.wallet_id = w.id AND r.day >= date(?, 'unixepoch', '-7 days')) AS recent_trades
+                    FROM wallets w
+                    WHERE w.sync_enabled = 1
+                )
+                WHERE NOT has_data
+                   OR synced_epoch IS NULL
+                   OR ? - synced_epoch >= 60 * COALESCE(sync_interval_minutes, CASE {tiers} END)
+            ''', (SYNC_MAX_DAYS_BACK, now, SYNC_MAX_DAYS_BACK, now, now, now))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+    def executions_left(self, conn, now):
+        """Dune executions still allowed in the rolling 24 hours"""
+        used = conn.execute("SELECT COUNT(*) FROM dune_executions WHERE executed_at > ?", (now - 86400,)).fetchone()[0]
+        return self.daily_budget - used
+
+    def claim_next_job(self, worker, query_ids, now=None):
+        """Mark the most urgent due job running and charge its Dune executions, if the budget allows"""
+        now = int(now or time.time())
+        conn = self.connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            job = conn.execute('''
+                SELECT j.id, j.wallet_id, w.wallet_address, j.job_type, j.days_back, j.attempts
+                FROM sync_jobs j
+                JOIN wallets w ON j.wallet_id = w.id
+                WHERE j.status = 'queued' AND j.run_after <= ?
+                ORDER BY j.priority DESC, j.run_after
+                LIMIT 1
+            ''', (now,)).fetchone()
+            if job is None or self.executions_left(conn, now) < len(query_ids[job[3]]):
+                conn.rollback()
+                return None
+
+            conn.execute("UPDATE sync_jobs SET status = 'running', worker = ?, started_at = ?, attempts = attempts + 1 "
+                         "WHERE id = ?", (worker, now, job[0]))
+            conn.executemany("INSERT INTO dune_executions (wallet_id, query_id, executed_at) VALUES (?, ?, ?)",
+                             [(job[1], query_id, now) for query_id in query_ids[job[3]]])
+            conn.commit()
+            claimed = dict(zip(['job_id', 'wallet_id', 'wallet_address', 'job_type', 'days_back', 'attempts'], job))
+            claimed['attempts'] += 1
+            return claimed
+        finally:
+            conn.close()
+
+    def finish_job(self, job, error=None):
+        """Record a job's outcome; failures go back to the queue with exponential backoff until attempts run out"""
+        now = int(time.time())
+        conn = self.connect()
+        try:
+            if error is None:
+                conn.execute("UPDATE sync_jobs SET status = 'done', finished_at = ?, last_error = NULL WHERE id = ?",
+                             (now, job['job_id']))
+                # The Dune window of this sync ended when it started, so the next one continues from there
+                conn.execute("UPDATE wallets SET last_synced_at = (SELECT started_at FROM sync_jobs WHERE id = ?) "
+                             "WHERE id = ?", (job['job_id'], job['wallet_id']))
+            elif job['attempts'] >= self.max_attempts:
+                conn.execute("UPDATE sync_jobs SET status = 'failed', finished_at = ?, last_error = ? WHERE id = ?",
+                             (now, error, job['job_id']))
+            else:
+                # Full jitter keeps retries of many failed wallets from hitting Dune in lockstep
+                delay = random.uniform(0, self.retry_base_seconds * 2 ** job['attempts'])
+                conn.execute("UPDATE sync_jobs SET status = 'queued', run_after = ?, last_error = ? WHERE id = ?",
+                             (now + math.ceil(delay), error, job['job_id']))
+            conn.commit()
+        finally:
+            conn.close()
+
+    def requeue_stale_jobs(self, timeout_seconds):
+        """Return jobs left 'running' by a scheduler that died to the queue"""
+        conn = self.connect()
+        try:
+            cursor = conn.execute("UPDATE sync_jobs SET status = 'queued', run_after = ? "
+                                  "WHERE status = 'running' AND started_at < ?",
+                                  (int(time.time()), int(time.time()) - timeout_seconds))
+            conn.commit()
+            return cursor.rowcount
+        finally:
+            conn.close()
+
+
+class SyncScheduler:
+    """Queues due wallet syncs and runs them on a bounded worker pool"""
+
+    def __init__(self, db_name='final.db'):
+        load_dotenv()
+        self.workers = int(os.getenv('SYNC_WORKERS', '2'))
+        self.job_timeout_seconds = int(os.getenv('SYNC_JOB_TIMEOUT_SECONDS', '3600'))
+        self.queue = SyncJobQueue(db_name,
+                                  daily_budget=int(os.getenv('DUNE_DAILY_BUDGET', '200')),
+                                  max_attempts=int(os.getenv('SYNC_MAX_ATTEMPTS', '5')),
+                                  retry_base_seconds=int(os.getenv('SYNC_RETRY_BASE_SECONDS', '60')))
+        self.worker_name = f"{socket.gethostname()}:{os.getpid()}"
+        self.executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='wallet-sync')
+        self.running = set()
+
+        # Query ids come from SOLReport so the budget charges exactly what a job executes
+        self.query_ids = {job_type: [getattr(SOLReport, name) for name in names]
+                          for job_type, (_, names) in SYNC_JOB_TYPES.items()}
+
+        conn = sqlite3.connect(db_name, timeout=SQLITE_BUSY_TIMEOUT_SECONDS)
+        apply_migrations(conn)
+        conn.close()
+
+    def run_job(self, job):
+        """Worker body: one SOLReport per job, so each worker thread has its own connection"""
+        report = None
+        error = None
+        try:
+            report = SOLReport(job['wallet_address'], job['days_back'] or SYNC_MAX_DAYS_BACK, db_name=self.queue.db_name)
+            if not SYNC_JOB_TYPES[job['job_type']][0](report):
+                error = "sync returned no data"
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+        finally:
+            if report is not None:
+                report.close_connection()
+        self.queue.finish_job(job, error)
+        print(f"{'✅' if error is None else '❌'} Sync job {job['job_id']} for {job['wallet_address']}"
+              f"{'' if error is None else ': ' + error}")
+
+    def tick(self):
+        """One pass: requeue stale jobs, queue due wallets, then start jobs while workers and Dune budget allow"""
+        # Any pass, not only startup: another scheduler on the same database may have died meanwhile
+        requeued = self.queue.requeue_stale_jobs(self.job_timeout_seconds)
+        if requeued:
+            print(f"♻️ Re-queued {requeued} job(s) left running past {self.job_timeout_seconds}s")
+
+        queued = self.queue.enqueue_due_syncs()
+        if queued:
+            print(f"🗓️ Queued {queued} wallet sync(s)")
+
+        self.running = {future for future in self.running if not future.done()}
+        while len(self.running) < self.workers:
+            job = self.queue.claim_next_job(self.worker_name, self.query_ids)
+            if job is None:
+                break
+            print(f"🔄 Starting sync job {job['job_id']} for {job['wallet_address']} "
+                  f"({job['job_type']}, attempt {job['attempts']})")
+            self.running.add(self.executor.submit(self.run_job, job))
+
+    def run_forever(self):
+        print(f"⏰ Scheduler running with {self.workers} worker(s), tick every {SCHEDULER_TICK_SECONDS}s")
+        try:
+            while True:
+                self.tick()
+                time.sleep(SCHEDULER_TICK_SECONDS)
+        except KeyboardInterrupt:
+            print("Stopping scheduler, waiting for running syncs...")
+        finally:
+            self.executor.shutdown(wait=True)
+
+
+if __name__ == "__main__":
+    SyncScheduler().run_forever()
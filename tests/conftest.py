@@ -0,0 +1,108 @@
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import main  # noqa: E402
+
+WALLET = '8qvNUZf5p4Q15WNc64xZ5cLrLZU1ZDecKVpSDBkU3vbz'
+OTHER_WALLET = 'GVJp1bkQgw3QdXBmvWRBK5SaXcr3kzf45SfrvRDobQQE'
+
+# Spot and historical SOL prices are the same, so trades valued either way agree
+SOL_PRICES = {'EUR': 150.0, 'USD': 170.0}
+
+
+class FakeDune:
+    """Stands in for DuneClient: serves the frame a test put in results under the query id"""
+    results = {}
+
+    def __init__(self, *args, **kwargs):
+        pass
+
+    def run_query_dataframe(self, query, performance=''):
+        result = self.results[query.query_id]
+        return result(query) if callable(result) else result.copy()
+
+
+def trade_rows(tokens, block_time='2025-08-14 10:15:00.000 UTC'):
+    """Dune per-token trade rows: tokens maps a mint to (spent SOL, earned SOL)"""
+    return pd.DataFrame([{
+        'TOKEN_SYMBOL': mint[:4].upper(), 'time_traded': '5m 0s', 'incoming': 1000.0, 'outcome': 1000.0,
+        'delta_token': 0.0, 'spent_amount': spent, 'earned_amount': earned, 'number_buys': 1, 'number_sells': 1,
+        'delta_sol': earned - spent, 'delta_percentage': (earned - spent) / spent * 100,
+        'dexscreener': f'https://dexscreener.com/solana/{mint}?maker={WALLET}', 'block_time': block_time,
+    } for mint, (spent, earned) in tokens.items()])
+
+
+def transfer_rows(transfers, block_month='2025-08-01 00:00:00.000 UTC'):
+    """Dune transfer rows: transfers is a list of (signature, label, counterparty, SOL amount)"""
+    return pd.DataFrame([{
+        'block_month': block_month,
+        'from_owner': WALLET if label == 'Sent' else counterparty,
+        'to_owner': counterparty if label == 'Sent' else WALLET,
+        'sol_amount': amount, 'transaction_label': label,
+        'solscan_link': f'https://solscan.io/tx/{signature}',
+    } for signature, label, counterparty, amount in transfers])
+
+
+@pytest.fixture
+def dune():
+    FakeDune.results = {}
+    return FakeDune.results
+
+
+@pytest.fixture
+def make_report(tmp_path, monkeypatch, dune):
+    """Build SOLReports on a fresh final.db in a temporary folder, with Dune and CoinGecko faked"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DUNE_API_REQUEST_TIMEOUT', '10')
+    monkeypatch.setenv('DUNE_MODE', 'live')
+    monkeypatch.setenv('ANALYTICS_ENGINE', 'sqlite')
+    monkeypatch.setenv('REPORT_CURRENCIES', ','.join(SOL_PRICES))
+    monkeypatch.setenv('SWAP_QUERY_ID', '')
+    monkeypatch.setattr(main, 'DuneClient', FakeDune)
+    monkeypatch.setattr(main.SOLReport, 'get_sol_prices',
+                        lambda self, currencies: {currency: SOL_PRICES[currency] for currency in currencies})
+    monkeypatch.setattr(main.SOLReport, 'fetch_sol_price_history',
+                        lambda self, currency, start_date, end_date: {
+                            price_date: SOL_PRICES[currency]
+                            for price_date in pd.date_range(start_date, end_date).strftime('%Y-%m-%d')})
+
+    reports = []
+
+    def make(wallet_address=WALLET, days_back=15, db_name='final.db'):
+        report = main.SOLReport(wallet_address, days_back, db_name=db_name)
+        reports.append(report)
+        return report
+
+    yield make
+    for report in reports:
+        report.conn.close()
+
+
+@pytest.fixture
+def rollup_drift():
+    """Days where a wallet's daily rollups differ from the sums over its trade rows"""
+    def drift(conn, wallet_id):
+        rows = pd.read_sql_query('''
+            SELECT date(block_time_epoch, 'unixepoch') AS day, COUNT(*) AS trade_rows,
+                   SUM(spent_amount_lamports) AS spent_amount_lamports,
+                   SUM(earned_amount_lamports) AS earned_amount_lamports,
+                   SUM(delta_sol_lamports) AS delta_sol_lamports
+            FROM wallet_transactions
+            WHERE wallet_id = ? AND block_time_epoch IS NOT NULL
+            GROUP BY day
+        ''', conn, params=[wallet_id])
+        rollups = pd.read_sql_query('''
+            SELECT day, trade_rows, spent_amount_lamports, earned_amount_lamports, delta_sol_lamports
+            FROM wallet_daily_rollups WHERE wallet_id = ?
+        ''', conn, params=[wallet_id])
+        merged = rows.merge(rollups, on='day', how='outer', suffixes=('_rows', '_rollups')).fillna(0)
+        columns = ['trade_rows', 'spent_amount_lamports', 'earned_amount_lamports', 'delta_sol_lamports']
+        differs = pd.concat([merged[f'{column}_rows'] != merged[f'{column}_rollups'] for column in columns],
+                            axis=1).any(axis=1)
+        return merged[differs]
+    return drift
@@ -0,0 +1,19 @@
+from openpyxl import load_workbook
+
+from conftest import trade_rows
+
+
+def test_analytics_sheets_over_the_row_limit_continue_on_numbered_sheets(make_report, dune, monkeypatch):
+    report = make_report(days_back=0)
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({f'Mint{n}': (1.0, 1.0 + n / 10) for n in range(5)}, '14.08.2025')
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+    monkeypatch.setattr(report, 'REPORT_SHEET_MAX_ROWS', 2)
+
+    assert report.save_analytics_to_excel()
+
+    workbook = load_workbook(report.output_file_path)
+    curve_sheets = [name for name in workbook.sheetnames if name.startswith('PnL Curve')]
+    assert curve_sheets == ['PnL Curve 1', 'PnL Curve 2', 'PnL Curve 3']
+    assert sum(workbook[name].max_row - 1 for name in curve_sheets) == 5
+    assert workbook['PnL Curve 1']['A1'].font.bold
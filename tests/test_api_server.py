@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+
+import pandas as pd
+from aiohttp.test_utils import TestClient, TestServer
+
+import api_server
+from conftest import OTHER_WALLET, WALLET, trade_rows, transfer_rows
+from test_archive import OLD, OLD_MONTH, RECENT, RECENT_MONTH, all_trades
+from test_archive import ingest as ingest_batches
+
+
+def ingest(report, dune):
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0), 'MintB': (2.0, 1.0)}, '14.08.2025')
+    dune[report.SOL_TRANSFER_QUERY_ID] = transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.0),
+                                                        ('SigB', 'Received', OTHER_WALLET, 3.0)])
+    report.fetch_data()
+    report.fetch_sol_transfers_data()
+    assert report.ingest_fetched_frames()
+
+
+def fiat_totals(summary):
+    return {(row['source_table'], row['currency']): row for row in summary['fiat']}
+
+
+def test_fiat_totals_follow_the_window_and_skip_internal_transfers(make_report, dune):
+    report = make_report()
+    ingest(report, dune)
+    report.conn.execute("UPDATE sol_transfers SET is_internal = 1 WHERE signature = 'SigB'")
+    report.conn.execute("UPDATE wallet_transactions SET created_at = datetime('now', '-30 days') "
+                        "WHERE token_mint = 'MintB'")
+    report.conn.commit()
+
+    all_time = fiat_totals(api_server.read_summary(report.conn, WALLET, None))
+    assert all_time[('wallet_transactions', 'EUR')]['spent_value'] == 450.0
+    assert all_time[('sol_transfers', 'EUR')]['sol_amount_value'] == 150.0
+
+    last_week = fiat_totals(api_server.read_summary(report.conn, WALLET, 7))
+    assert last_week[('wallet_transactions', 'EUR')]['spent_value'] == 150.0
+    assert last_week[('wallet_transactions', 'USD')]['earned_value'] == 340.0
+
+
+def test_data_version_moves_on_every_commit(make_report, dune):
+    report = make_report()
+    pool = api_server.ConnectionPool(report.db_name, size=1)
+    try:
+        before = pool.data_version()
+        assert pool.data_version() == before
+
+        writer = sqlite3.connect(report.db_name)
+        writer.execute("UPDATE wallets SET wallet_name = 'renamed'")
+        writer.commit()
+        writer.close()
+
+        assert pool.data_version() != before
+    finally:
+        pool.close()
+
+
+def test_report_jobs_use_the_api_database_and_skip_unknown_wallets(make_report, dune, tmp_path):
+    report = make_report(db_name='wallets.db')
+    ingest(report, dune)
+    api = api_server.ReportAPI(report.db_name)
+
+    async def requests():
+        async with TestClient(TestServer(api.build_app())) as client:
+            unknown = await client.post(f'/wallets/{OTHER_WALLET}/reports')
+            started = await client.post(f'/wallets/{WALLET}/reports', params={'report': 'transactions'})
+            job = await started.json()
+            while job['status'] in ('queued', 'running'):
+                await asyncio.sleep(0.05)
+                job = await (await client.get(f"/jobs/{job['job_id']}")).json()
+            return unknown.status, started.status, job
+
+    unknown_status, started_status, job = asyncio.run(requests())
+
+    assert unknown_status == 404
+    assert report.conn.execute("SELECT COUNT(*) FROM wallets").fetchone()[0] == 1
+    assert started_status == 202
+    assert job['status'] == 'done', job.get('error')
+    assert not (tmp_path / 'final.db').exists()
+
+
+def test_summary_and_pages_include_archived_rows(make_report, dune):
+    report = make_report(days_back=0)
+    ingest_batches(report, dune,
+                   trades=all_trades(({'MintA': (1.0, 2.0)}, OLD), ({'MintB': (1.0, 0.5)}, RECENT)),
+                   transfers=pd.concat([transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.5)], OLD_MONTH),
+                                        transfer_rows([('SigB', 'Received', OTHER_WALLET, 0.25)], RECENT_MONTH)]))
+    before = api_server.read_summary(report.conn, WALLET, None)
+    assert report.archive_old_rows(archive_after_days=365)
+    api = api_server.ReportAPI(report.db_name)
+
+    async def requests():
+        async with TestClient(TestServer(api.build_app())) as client:
+            summary = await (await client.get(f'/wallets/{WALLET}/summary')).json()
+            trades = await (await client.get(f'/wallets/{WALLET}/transactions')).json()
+            transfers = await (await client.get(f'/wallets/{WALLET}/transfers')).json()
+            # The pooled connections are read-only again once the archive is put away
+            query_only = await api.pool.run(lambda conn: conn.execute("PRAGMA query_only").fetchone()[0])
+            return summary, trades, transfers, query_only
+
+    summary, trades, transfers, query_only = asyncio.run(requests())
+
+    assert summary == before
+    assert trades['total'] == 2
+    assert [row['token_mint'] for row in trades['rows']] == ['MintB', 'MintA']
+    assert sorted(row['sol_amount'] for row in transfers['rows']) == [0.25, 1.5]
+    assert query_only == 1
@@ -0,0 +1,124 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+import main
+from conftest import OTHER_WALLET, WALLET, trade_rows, transfer_rows
+from test_swaps import ingest_swaps
+
+NOW = datetime.now(timezone.utc)
+OLD = (NOW - timedelta(days=500)).strftime('%Y-%m-%d 10:00:00.000 UTC')
+RECENT = (NOW - timedelta(days=3)).strftime('%Y-%m-%d 10:00:00.000 UTC')
+OLD_MONTH = (NOW - timedelta(days=500)).strftime('%Y-%m-01 00:00:00.000 UTC')
+RECENT_MONTH = NOW.strftime('%Y-%m-01 00:00:00.000 UTC')
+
+
+def ingest(report, dune, trades=None, transfers=None, skip_stored=False):
+    report.transaction_df = report.sol_transfers_df = None
+    if trades is not None:
+        dune[report.TRANSACTION_QUERY_ID] = trades
+        report.fetch_data()
+    if transfers is not None:
+        dune[report.SOL_TRANSFER_QUERY_ID] = transfers
+        report.fetch_sol_transfers_data()
+    assert report.ingest_fetched_frames(skip_stored=skip_stored)
+
+
+def all_trades(*batches):
+    return pd.concat([trade_rows(tokens, block_time) for tokens, block_time in batches], ignore_index=True)
+
+
+def summaries(report):
+    return report.generate_summary_from_db(), report.generate_sol_transfers_summary_from_db()
+
+
+def assert_same_summaries(expected, actual):
+    for expected_frame, actual_frame in zip(expected, actual):
+        pd.testing.assert_frame_equal(expected_frame, actual_frame)
+
+
+def hot_rows(report, table_name):
+    return report.conn.execute(f"SELECT COUNT(*) FROM main.{table_name}").fetchone()[0]
+
+
+def test_archived_rows_keep_the_summaries(make_report, dune, rollup_drift):
+    report = make_report(days_back=0)
+    ingest(report, dune,
+           trades=all_trades(({'MintA': (1.0, 2.0)}, OLD), ({'MintB': (1.0, 0.5)}, RECENT)),
+           transfers=pd.concat([transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.5)], OLD_MONTH),
+                                transfer_rows([('SigB', 'Received', OTHER_WALLET, 0.25)], RECENT_MONTH)]))
+    before = summaries(report)
+
+    assert report.archive_old_rows(archive_after_days=365)
+
+    assert (hot_rows(report, 'wallet_transactions'), hot_rows(report, 'sol_transfers')) == (1, 1)
+    assert_same_summaries(before, summaries(report))
+    assert rollup_drift(report.conn, report.wallet_id)['day'].tolist() == [OLD[:10]]
+
+
+def test_refetched_archived_rows_are_not_stored_again(make_report, dune):
+    report = make_report(days_back=0)
+    trades = all_trades(({'MintA': (1.0, 2.0)}, OLD), ({'MintB': (1.0, 0.5)}, RECENT))
+    transfers = pd.concat([transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.5)], OLD_MONTH),
+                           transfer_rows([('SigB', 'Received', OTHER_WALLET, 0.25)], RECENT_MONTH)])
+    ingest(report, dune, trades=trades, transfers=transfers)
+    before = summaries(report)
+    report.archive_old_rows(archive_after_days=365)
+
+    ingest(report, dune, trades=trades, transfers=transfers, skip_stored=True)
+
+    assert (hot_rows(report, 'wallet_transactions'), hot_rows(report, 'sol_transfers')) == (1, 1)
+    assert_same_summaries(before, summaries(report))
+
+
+def test_rebuild_from_swaps_after_archiving_counts_each_swap_once(make_report, dune):
+    report = make_report(days_back=0)
+    ingest_swaps(report, dune, [
+        ('SigA1', 'MintA', 'buy', 1.0, OLD), ('SigA2', 'MintA', 'sell', 2.0, OLD),
+        ('SigB1', 'MintB', 'buy', 1.0, OLD), ('SigB2', 'MintB', 'sell', 0.5, RECENT),
+        ('SigC1', 'MintC', 'buy', 3.0, RECENT),
+    ])
+    before = report.generate_summary_from_db()
+
+    report.archive_old_rows(archive_after_days=365)
+    assert report.rebuild_transactions_from_swaps()
+
+    # MintA closed before the cutoff and moved with its swaps; MintB is still open across it
+    hot = pd.read_sql_query("SELECT DISTINCT token_mint FROM wallet_swaps ORDER BY token_mint", report.conn)
+    assert hot['token_mint'].tolist() == ['MintB', 'MintC']
+    pd.testing.assert_frame_equal(before, report.generate_summary_from_db())
+
+
+def test_archived_transfers_follow_portfolio_changes(make_report, dune):
+    report = make_report(days_back=0)
+    report.assign_wallets_to_portfolio('Desk', [WALLET, OTHER_WALLET])
+    ingest(report, dune, transfers=transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.5),
+                                                  ('SigB', 'Sent', 'Elsewhere', 0.5)], OLD_MONTH))
+    before = report.generate_sol_transfers_summary_from_db()
+    report.archive_old_rows(archive_after_days=365)
+    pd.testing.assert_frame_equal(before, report.generate_sol_transfers_summary_from_db())
+
+    report.assign_wallets_to_portfolio('Other desk', [OTHER_WALLET])
+
+    with report.reading_archive():
+        tags = report.conn.execute("SELECT signature, is_internal, internal_match_id FROM sol_transfers "
+                                   "ORDER BY signature").fetchall()
+    assert tags == [('SigA', 0, None), ('SigB', 0, None)]
+
+
+def test_windowed_reports_leave_older_partitions_unread(make_report, dune, monkeypatch):
+    report = make_report(days_back=0)
+    ingest(report, dune, trades=all_trades(({'MintA': (1.0, 2.0)}, OLD), ({'MintB': (1.0, 0.5)}, RECENT)))
+    report.conn.execute("UPDATE wallet_transactions SET created_at = datetime('now', '-400 days') "
+                        "WHERE token_mint = 'MintA'")
+    report.conn.commit()
+    report.archive_old_rows(archive_after_days=365)
+    all_time = report.generate_summary_from_db()
+
+    def unread(path, last_archive_run):
+        raise AssertionError(f"{path} read for a window it is outside of")
+    monkeypatch.setattr(main.SOLReport, 'read_archive_file', staticmethod(unread))
+    report.days_back = 15
+
+    assert report.generate_summary_from_db()['total_spent_amount'].iloc[0] == 1.0
+    assert all_time['total_spent_amount'].iloc[0] == 2.0
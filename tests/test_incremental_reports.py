@@ -0,0 +1,94 @@
+from openpyxl import load_workbook
+
+from conftest import OTHER_WALLET, trade_rows, transfer_rows
+
+
+def detail_rows(report, report_type):
+    """Values and link targets of a report's detail rows, top to bottom"""
+    manifest = report.get_report_manifest(report.output_file_path)
+    worksheet = load_workbook(report.output_file_path)[report.REPORT_LAYOUTS[report_type][1]]
+    return [[(cell.value, cell.hyperlink.target if cell.hyperlink else None, cell.hyperlink.ref if cell.hyperlink else None)
+             for cell in row] for row in worksheet.iter_rows(min_row=manifest['header_row'] + 1)]
+
+
+def ingest_trades(report, dune, tokens, block_time):
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows(tokens, block_time)
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+
+
+def test_newer_trades_go_on_top_like_a_rebuild(make_report, dune):
+    report = make_report(days_back=0)
+    ingest_trades(report, dune, {'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)}, '14.08.2025')
+    report.generate_excel_from_db(incremental=True)
+    ingest_trades(report, dune, {'MintC': (2.0, 1.0), 'MintD': (1.0, 3.0)}, '2025-08-20 10:00:00.000 UTC')
+
+    assert report.plan_report_update('transactions', None) == 'append'
+    report.generate_excel_from_db(incremental=True)
+    appended = detail_rows(report, 'transactions')
+
+    report.generate_excel_from_db(incremental=False)
+    assert appended == detail_rows(report, 'transactions')
+    assert len(appended) == 4
+
+
+def test_older_trades_force_a_rebuild(make_report, dune):
+    report = make_report(days_back=0)
+    ingest_trades(report, dune, {'MintA': (1.0, 2.0)}, '2025-08-20 10:00:00.000 UTC')
+    report.generate_excel_from_db(incremental=True)
+    ingest_trades(report, dune, {'MintB': (1.0, 0.5)}, '14.08.2025')
+
+    assert report.plan_report_update('transactions', None) == 'full'
+
+
+def test_windowed_reports_append_until_a_row_ages_out(make_report, dune):
+    report = make_report(days_back=15)
+    ingest_trades(report, dune, {'MintA': (1.0, 2.0)}, '14.08.2025')
+    report.generate_excel_from_db(days_back=15, incremental=True)
+    assert report.plan_report_update('transactions', 15) == 'skip'
+
+    ingest_trades(report, dune, {'MintB': (1.0, 0.5)}, '2025-08-20 10:00:00.000 UTC')
+    assert report.plan_report_update('transactions', 15) == 'append'
+    report.generate_excel_from_db(days_back=15, incremental=True)
+    appended = detail_rows(report, 'transactions')
+    report.generate_excel_from_db(days_back=15, incremental=False)
+    assert appended == detail_rows(report, 'transactions')
+
+    report.conn.execute("UPDATE wallet_transactions SET created_at = datetime('now', '-20 days') "
+                        "WHERE token_mint = 'MintA'")
+    report.conn.commit()
+    ingest_trades(report, dune, {'MintC': (2.0, 1.0)}, '2025-08-25 10:00:00.000 UTC')
+    assert report.plan_report_update('transactions', 15) == 'full'
+
+
+def test_new_transfers_go_on_top_like_a_rebuild(make_report, dune):
+    report = make_report()
+    dune[report.SOL_TRANSFER_QUERY_ID] = transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.5),
+                                                        ('SigB', 'Received', OTHER_WALLET, 0.25)])
+    report.fetch_sol_transfers_data()
+    report.ingest_fetched_frames()
+    report.generate_sol_transfers_excel_from_db(incremental=True)
+
+    dune[report.SOL_TRANSFER_QUERY_ID] = transfer_rows([('SigC', 'Received', OTHER_WALLET, 2.0)])
+    report.fetch_sol_transfers_data()
+    report.ingest_fetched_frames()
+
+    assert report.plan_report_update('sol_transfers', None) == 'append'
+    report.generate_sol_transfers_excel_from_db(incremental=True)
+    appended = detail_rows(report, 'sol_transfers')
+
+    report.generate_sol_transfers_excel_from_db(incremental=False)
+    assert appended == detail_rows(report, 'sol_transfers')
+    links = [next(link for _, link, _ in row if link) for row in appended]
+    assert links == ['https://solscan.io/tx/SigC', 'https://solscan.io/tx/SigB', 'https://solscan.io/tx/SigA']
+
+
+def test_deleted_rows_force_a_rebuild(make_report, dune):
+    report = make_report(days_back=0)
+    ingest_trades(report, dune, {'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)}, '14.08.2025')
+    report.generate_excel_from_db(incremental=True)
+    report.conn.execute("DELETE FROM wallet_transactions WHERE token_mint = 'MintA'")
+    report.conn.commit()
+    ingest_trades(report, dune, {'MintC': (2.0, 1.0)}, '2025-08-20 10:00:00.000 UTC')
+
+    assert report.plan_report_update('transactions', None) == 'full'
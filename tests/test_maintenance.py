@@ -0,0 +1,28 @@
+from conftest import WALLET
+from test_migrations import write_baseline_db
+
+
+def test_compaction_switches_to_incremental_vacuum_keeping_ids(make_report):
+    write_baseline_db('final.db')
+    report = make_report(WALLET)
+    report.conn.execute("DELETE FROM wallet_transactions WHERE id = 1")
+    report.conn.commit()
+    ids = report.conn.execute("SELECT id, token_symbol FROM wallet_transactions ORDER BY id").fetchall()
+
+    report.compact_database()
+
+    assert report.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+    assert report.conn.execute("SELECT id, token_symbol FROM wallet_transactions ORDER BY id").fetchall() == ids
+    assert report.conn.execute("PRAGMA integrity_check").fetchone()[0] == 'ok'
+
+
+def test_deleted_ids_are_never_reused(make_report):
+    write_baseline_db('final.db')
+    report = make_report(WALLET)
+    report.conn.execute("DELETE FROM wallet_transactions WHERE id = 3")
+    report.conn.commit()
+    report.compact_database()
+
+    report.conn.execute("INSERT INTO wallet_transactions (wallet_id, token_symbol) VALUES (1, 'DDD')")
+
+    assert report.conn.execute("SELECT id FROM wallet_transactions WHERE token_symbol = 'DDD'").fetchone()[0] == 4
@@ -0,0 +1,118 @@
+import sqlite3
+
+import pandas as pd
+
+import main
+from conftest import WALLET
+
+# final.db as written before schema versioning: REAL amounts, no derived columns
+BASELINE_SCHEMA = '''
+    CREATE TABLE wallets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        wallet_address TEXT UNIQUE NOT NULL,
+        wallet_name TEXT,
+        description TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE TABLE wallet_transactions (
+        wallet_id INTEGER NOT NULL, token_symbol TEXT, time_traded TEXT, incoming REAL, outcome REAL,
+        delta_token REAL, spent_amount REAL, earned_amount REAL, spent_amount_eur REAL, earned_amount_eur REAL,
+        number_buys INTEGER, number_sells INTEGER, delta_sol REAL, delta_percentage REAL, dexscreener TEXT,
+        block_time TEXT, sol_eur_price REAL, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_wallet_transactions_wallet_id ON wallet_transactions(wallet_id);
+    CREATE INDEX idx_wallet_transactions_block_time ON wallet_transactions(block_time);
+    CREATE TABLE sol_transfers (
+        wallet_id INTEGER NOT NULL, sol_eur_price REAL, block_month TEXT, from_owner TEXT, to_owner TEXT,
+        sol_amount REAL, sol_amount_eur REAL, transaction_label TEXT, solscan_link TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    );
+    CREATE INDEX idx_sol_transfers_wallet_id ON sol_transfers(wallet_id);
+'''
+
+
+def write_baseline_db(path):
+    conn = sqlite3.connect(path)
+    conn.executescript(BASELINE_SCHEMA)
+    conn.execute("INSERT INTO wallets (wallet_address, wallet_name) VALUES (?, 'baseline')", (WALLET,))
+    conn.executemany('''
+        INSERT INTO wallet_transactions (wallet_id, token_symbol, incoming, outcome, delta_token, spent_amount,
+            earned_amount, spent_amount_eur, earned_amount_eur, number_buys, number_sells, delta_sol,
+            delta_percentage, dexscreener, block_time, sol_eur_price)
+        VALUES (1, ?, 1500.123456, 1500.123456, 0, ?, ?, ?, ?, 1, 1, ?, ?, ?, ?, 150)
+    ''', [
+        ('AAA', 0.1, 0.3, 15.0, 45.0, 0.2, 200.0, 'https://dexscreener.com/solana/MintA?maker=x', '14.08.2025'),
+        ('BBB', 0.7, 0.1, 105.0, 15.0, -0.6, -85.7, 'https://dexscreener.com/solana/MintB', '14.08.2025'),
+        ('CCC', 2.5, 2.6, 375.0, 390.0, 0.1, 4.0, 'https://dexscreener.com/solana/MintC',
+         '2025-08-15 09:00:00.000 UTC'),
+    ])
+    conn.executemany('''
+        INSERT INTO sol_transfers (wallet_id, sol_eur_price, block_month, from_owner, to_owner, sol_amount,
+            sol_amount_eur, transaction_label, solscan_link)
+        VALUES (1, 150, '2025-08-01 00:00:00.000 UTC', 'a', 'b', ?, ?, ?, ?)
+    ''', [(0.3, 45.0, 'Sent', 'https://solscan.io/tx/SigA'), (1.1, 165.0, 'Received', 'https://solscan.io/tx/SigB')])
+    conn.commit()
+    conn.close()
+
+
+def test_baseline_database_migrates_to_the_latest_schema(make_report, rollup_drift):
+    write_baseline_db('final.db')
+
+    report = make_report(WALLET)
+
+    latest = max(version for version, *_ in main.SCHEMA_MIGRATIONS)
+    assert report.conn.execute('SELECT MAX(version) FROM schema_version').fetchone()[0] == latest
+    assert report.conn.execute('SELECT COUNT(*) FROM schema_backfills WHERE completed_at IS NULL').fetchone()[0] == 0
+    assert report.wallet_id == 1
+
+    trades = pd.read_sql_query('SELECT * FROM wallet_transactions ORDER BY id', report.conn)
+    assert trades['id'].tolist() == [1, 2, 3]
+    assert trades['spent_amount_lamports'].tolist() == [100_000_000, 700_000_000, 2_500_000_000]
+    assert trades['delta_sol_lamports'].tolist() == [200_000_000, -600_000_000, 100_000_000]
+    assert trades['spent_amount_eur_cents'].tolist() == [1500, 10500, 37500]
+    assert trades['incoming'].tolist() == [1500.123456] * 3
+    assert trades['token_mint'].tolist() == ['MintA', 'MintB', 'MintC']
+    assert trades['block_time_epoch'].tolist() == [1755129600, 1755129600, 1755248400]
+    assert (trades['source'] == 'dune').all()
+
+    transfers = pd.read_sql_query('SELECT * FROM sol_transfers ORDER BY id', report.conn)
+    assert transfers['id'].tolist() == [1, 2]
+    assert transfers['sol_amount_lamports'].tolist() == [300_000_000, 1_100_000_000]
+    assert transfers['signature'].tolist() == ['SigA', 'SigB']
+    assert (transfers['is_internal'] == 0).all()
+
+    assert rollup_drift(report.conn, report.wallet_id).empty
+    assert report.get_wallet_data_version() > 0
+
+
+def test_migrations_are_idempotent(make_report):
+    write_baseline_db('final.db')
+    make_report(WALLET).conn.close()
+
+    report = make_report(WALLET)
+
+    assert report.conn.execute('SELECT COUNT(*) FROM wallet_transactions').fetchone()[0] == 3
+    assert report.conn.execute(
+        'SELECT SUM(trade_rows) FROM wallet_daily_rollups WHERE wallet_id = 1').fetchone()[0] == 3
+
+
+def test_rebuilt_tables_are_copied_in_batches(make_report, monkeypatch):
+    write_baseline_db('final.db')
+    conn = sqlite3.connect('final.db')
+    conn.execute("UPDATE wallet_transactions SET incoming = 4.2e15 WHERE token_symbol = 'CCC'")
+    conn.commit()
+    conn.close()
+    monkeypatch.setattr(main, 'MIGRATION_BATCH_SIZE', 2)
+
+    report = make_report(WALLET)
+
+    copies = report.conn.execute("SELECT name, last_rowid FROM schema_backfills "
+                                 "WHERE name LIKE '%_rebuild' ORDER BY name").fetchall()
+    assert copies == [('fiat_valuations_rebuild', 0), ('sol_transfers_rebuild', 2),
+                      ('wallet_transactions_rebuild', 3)]
+    assert report.conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE name LIKE '%_legacy'").fetchone()[0] == 0
+    assert report.conn.execute("SELECT incoming FROM wallet_transactions WHERE token_symbol = 'CCC'").fetchone()[0] \
+        == 4.2e15
+    assert report.conn.execute("SELECT COUNT(*) FROM wallet_transactions WHERE block_time_epoch IS NULL "
+                               "OR token_mint IS NULL").fetchone()[0] == 0
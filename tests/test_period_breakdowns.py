@@ -0,0 +1,49 @@
+import pandas as pd
+
+from conftest import OTHER_WALLET, trade_rows, transfer_rows
+
+
+def ingest(report, dune):
+    dune[report.TRANSACTION_QUERY_ID] = pd.concat([
+        trade_rows({'MintA': (1.0, 2.0)}, '2025-07-15 10:00:00.000 UTC'),
+        # Still August in UTC, already September 1st in Berlin
+        trade_rows({'MintB': (2.0, 1.0)}, '2025-08-31 23:30:00.000 UTC'),
+    ], ignore_index=True)
+    dune[report.SOL_TRANSFER_QUERY_ID] = pd.concat([
+        transfer_rows([('SigA', 'Sent', OTHER_WALLET, 1.0)], '2025-06-01 00:00:00.000 UTC'),
+        transfer_rows([('SigB', 'Received', OTHER_WALLET, 3.0)], '2025-08-01 00:00:00.000 UTC'),
+    ], ignore_index=True)
+    report.fetch_data()
+    report.fetch_sol_transfers_data()
+    assert report.ingest_fetched_frames()
+
+
+def test_months_are_cut_in_the_report_timezone(make_report, dune, monkeypatch):
+    monkeypatch.setenv('REPORT_TIMEZONE', 'Europe/Berlin')
+    report = make_report()
+    ingest(report, dune)
+
+    months = report.generate_period_breakdown_from_db('month').set_index('period')
+    assert months.index.tolist() == ['2025-07', '2025-08', '2025-09']
+    assert months['total_spent_amount'].tolist() == [1.0, 0.0, 2.0]
+    assert months['number_of_tokens_traded'].tolist() == [1, 0, 1]
+    assert (months['timezone'] == 'Europe/Berlin').all()
+
+    quarters = report.generate_period_breakdown_from_db('quarter')
+    assert quarters[['period', 'total_spent_amount']].values.tolist() == [['2025-Q3', 3.0]]
+
+
+def test_utc_keeps_the_trade_in_its_utc_month(make_report, dune):
+    report = make_report()
+    ingest(report, dune)
+
+    months = report.generate_period_breakdown_from_db('month')
+    assert months[['period', 'total_spent_amount']].values.tolist() == [['2025-07', 1.0], ['2025-08', 2.0]]
+
+
+def test_transfer_periods_group_block_months(make_report, dune):
+    report = make_report()
+    ingest(report, dune)
+
+    quarters = report.generate_sol_transfers_period_breakdown_from_db('quarter')
+    assert quarters['period'].tolist() == ['2025-Q2', '2025-Q3']
@@ -0,0 +1,60 @@
+from conftest import OTHER_WALLET, WALLET, trade_rows, transfer_rows
+
+
+def ingest_trades(report, dune, tokens):
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows(tokens, '14.08.2025')
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+
+
+def test_equal_spends_add_up_across_tokens_and_wallets(make_report, dune):
+    report = make_report()
+    ingest_trades(report, dune, {'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)})
+    ingest_trades(make_report(OTHER_WALLET), dune, {'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)})
+    report.assign_wallets_to_portfolio('Desk', [WALLET, OTHER_WALLET])
+
+    summary = report.generate_portfolio_summary_from_db('Desk').set_index('wallet_address')
+
+    assert summary.loc[WALLET, 'total_spent_amount'] == 2.0
+    assert summary.loc[WALLET, 'total_spent_amount_eur'] == 300.0
+    total = summary.loc[report.PORTFOLIO_TOTAL_LABEL]
+    assert total['total_spent_amount'] == 4.0
+    assert total['total_spent_amount_eur'] == 600.0
+    assert total['number_of_tokens_traded'] == 2
+
+
+def own_transfer_rows(wallet_address, transfers):
+    """transfer_rows seen from wallet_address instead of WALLET"""
+    rows = transfer_rows(transfers)
+    own_side = rows['transaction_label'].map({'Sent': 'from_owner', 'Received': 'to_owner'})
+    for column in ['from_owner', 'to_owner']:
+        rows.loc[own_side == column, column] = wallet_address
+    return rows
+
+
+def ingest_transfers(report, dune, transfers):
+    dune[report.SOL_TRANSFER_QUERY_ID] = own_transfer_rows(report.wallet_address, transfers)
+    report.fetch_sol_transfers_data()
+    assert report.ingest_fetched_frames()
+
+
+def test_internal_transfers_pair_by_signature_then_by_amount(make_report, dune):
+    report = make_report()
+    other = make_report(OTHER_WALLET)
+    ingest_transfers(report, dune, [('SigA', 'Sent', OTHER_WALLET, 1.5), ('SigB', 'Sent', OTHER_WALLET, 0.5),
+                                    ('SigC', 'Sent', 'Elsewhere', 0.5)])
+    ingest_transfers(other, dune, [('SigA', 'Received', WALLET, 1.5), ('SigD', 'Received', WALLET, 0.5)])
+    # A counterpart whose signature Dune did not return is paired on sender, recipient, amount and month
+    other.conn.execute("UPDATE sol_transfers SET signature = NULL WHERE signature = 'SigD'")
+    other.conn.commit()
+
+    report.assign_wallets_to_portfolio('Desk', [WALLET, OTHER_WALLET])
+
+    rows = {(wallet_id, signature): (row_id, internal, match) for row_id, wallet_id, signature, internal, match in
+            report.conn.execute("SELECT id, wallet_id, signature, is_internal, internal_match_id "
+                                "FROM sol_transfers")}
+    sent_a, sent_b, sent_c = rows[(1, 'SigA')], rows[(1, 'SigB')], rows[(1, 'SigC')]
+    received_a, received_d = rows[(2, 'SigA')], rows[(2, None)]
+    assert sent_a[1:] == (1, received_a[0]) and received_a[1:] == (1, sent_a[0])
+    assert sent_b[1:] == (1, received_d[0]) and received_d[1:] == (1, sent_b[0])
+    assert sent_c[1:] == (0, None)
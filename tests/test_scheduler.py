@@ -0,0 +1,100 @@
+import sqlite3
+import threading
+import time
+
+from conftest import trade_rows
+from scheduler import SYNC_MAX_DAYS_BACK, SyncJobQueue, SyncScheduler
+
+QUERY_IDS = {'refresh': [1, 2]}
+
+
+def wallet_with_data(make_report, dune):
+    report = make_report()
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0)}, '14.08.2025')
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+    return report
+
+
+def queued_jobs(report):
+    return report.conn.execute(
+        "SELECT days_back FROM sync_jobs WHERE status = 'queued' ORDER BY id").fetchall()
+
+
+def test_wallet_never_synced_is_due_with_the_full_window(make_report, dune):
+    report = wallet_with_data(make_report, dune)
+    queue = SyncJobQueue(report.db_name, daily_budget=10, max_attempts=3, retry_base_seconds=1)
+
+    assert queue.enqueue_due_syncs() == 1
+    assert queued_jobs(report) == [(SYNC_MAX_DAYS_BACK,)]
+
+
+def test_only_successful_syncs_move_the_last_sync_time(make_report, dune):
+    report = wallet_with_data(make_report, dune)
+    queue = SyncJobQueue(report.db_name, daily_budget=10, max_attempts=3, retry_base_seconds=1)
+    started = int(time.time())
+
+    queue.enqueue_due_syncs(now=started)
+    job = queue.claim_next_job('test', QUERY_IDS, now=started)
+    queue.finish_job(job, error="Dune timed out")
+    assert report.conn.execute("SELECT last_synced_at FROM wallets").fetchone()[0] is None
+
+    job = queue.claim_next_job('test', QUERY_IDS, now=started + 3600)
+    queue.finish_job(job)
+    assert report.conn.execute("SELECT last_synced_at FROM wallets").fetchone()[0] == started + 3600
+
+    # Opening the wallet for a report must not count as a sync
+    make_report()
+    assert queue.enqueue_due_syncs(now=started + 7200) == 0
+
+    assert queue.enqueue_due_syncs(now=started + 3600 + 2 * 86400 + 60) == 1
+    assert queued_jobs(report) == [(3,)]
+
+
+def test_sync_jobs_write_to_the_scheduler_database(make_report, dune, tmp_path):
+    report = make_report(db_name='wallets.db')
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0)}, '14.08.2025')
+    scheduler = SyncScheduler(db_name='wallets.db')
+    scheduler.queue.enqueue_due_syncs()
+    job = scheduler.queue.claim_next_job('test', scheduler.query_ids)
+
+    scheduler.run_job(job)
+    scheduler.executor.shutdown()
+
+    assert report.conn.execute("SELECT COUNT(*) FROM wallet_transactions").fetchone()[0] == 1
+    assert report.conn.execute("SELECT status FROM sync_jobs").fetchone()[0] == 'done'
+    assert not (tmp_path / 'final.db').exists()
+
+
+def test_ingest_waits_for_another_writer_instead_of_failing(make_report, dune):
+    report = make_report()
+    assert report.conn.execute("PRAGMA journal_mode").fetchone()[0] == 'wal'
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0)}, '14.08.2025')
+    report.fetch_data()
+
+    other = sqlite3.connect(report.db_name, check_same_thread=False)
+    other.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(0.5, other.commit)
+    release.start()
+    try:
+        assert report.ingest_fetched_frames()
+    finally:
+        release.join()
+        other.close()
+    assert report.conn.execute("SELECT COUNT(*) FROM wallet_transactions").fetchone()[0] == 1
+
+
+def test_each_tick_requeues_jobs_left_running_too_long(make_report, dune, monkeypatch):
+    report = make_report(db_name='wallets.db')
+    scheduler = SyncScheduler(db_name='wallets.db')
+    monkeypatch.setattr(scheduler, 'workers', 0)
+    scheduler.queue.enqueue_due_syncs()
+    job = scheduler.queue.claim_next_job('dead-worker', scheduler.query_ids)
+    report.conn.execute("UPDATE sync_jobs SET started_at = ? WHERE id = ?",
+                        (int(time.time()) - scheduler.job_timeout_seconds - 60, job['job_id']))
+    report.conn.commit()
+
+    scheduler.tick()
+    scheduler.executor.shutdown()
+
+    assert report.conn.execute("SELECT status FROM sync_jobs").fetchone()[0] == 'queued'
@@ -0,0 +1,29 @@
+import pandas as pd
+import pytest
+
+from conftest import OTHER_WALLET, WALLET, trade_rows, transfer_rows
+
+pytest.importorskip('duckdb')
+
+
+def test_duckdb_summaries_match_sqlite_on_the_same_database(make_report, dune):
+    report = make_report()
+    for wallet_address in (OTHER_WALLET, WALLET):
+        wallet_report = make_report(wallet_address)
+        dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0), 'MintB': (2.5, 1.25)}, '14.08.2025')
+        dune[report.SOL_TRANSFER_QUERY_ID] = transfer_rows([('SigA', 'Sent', 'Elsewhere', 1.0),
+                                                            ('SigB', 'Received', 'Elsewhere', 3.0)])
+        wallet_report.fetch_data()
+        wallet_report.fetch_sol_transfers_data()
+        assert wallet_report.ingest_fetched_frames()
+    report.assign_wallets_to_portfolio('Desk', [WALLET, OTHER_WALLET])
+
+    sqlite_frames = [call() for _, call in report.engine_benchmark_calls()]
+    report.analytics_engine = 'duckdb'
+    report.summary_cache.clear()
+    duckdb_frames = [call() for _, call in report.engine_benchmark_calls()]
+
+    assert report.duckdb_engine is not None
+    for (name, _), sqlite_frame, duckdb_frame in zip(report.engine_benchmark_calls(), sqlite_frames, duckdb_frames):
+        assert not sqlite_frame.empty, name
+        pd.testing.assert_frame_equal(sqlite_frame, duckdb_frame, check_dtype=False, obj=name)
@@ -0,0 +1,73 @@
+import pandas as pd
+
+from conftest import trade_rows
+
+SWAP_QUERY_ID = 990001
+
+
+def swap_rows(swaps):
+    """Dune swap rows: swaps is a list of (signature, mint, side, SOL amount, block time)"""
+    return pd.DataFrame([{
+        'signature': signature, 'token_mint': mint, 'token_symbol': mint[:4].upper(), 'side': side,
+        'token_amount': 1000.0, 'sol_amount': amount, 'block_time': block_time,
+    } for signature, mint, side, amount, block_time in swaps])
+
+
+def ingest_swaps(report, dune, swaps):
+    report.swap_query_id = SWAP_QUERY_ID
+    dune[SWAP_QUERY_ID] = swap_rows(swaps)
+    assert report.run_swap_ingestion()
+
+
+# The trades of trade_rows({'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)}) one swap at a time
+SWAPS = [
+    ('SigA1', 'MintA', 'buy', 1.0, '2025-08-14 10:15:00.000 UTC'),
+    ('SigA2', 'MintA', 'sell', 2.0, '2025-08-15 09:00:00.000 UTC'),
+    ('SigB1', 'MintB', 'buy', 1.0, '2025-08-14 10:15:00.000 UTC'),
+    ('SigB2', 'MintB', 'sell', 0.5, '2025-08-14 10:20:00.000 UTC'),
+]
+
+
+def test_rebuild_from_swaps_keeps_the_summary(make_report, dune, rollup_drift):
+    report = make_report(days_back=0)
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)})
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+    before = report.generate_summary_from_db()
+
+    ingest_swaps(report, dune, SWAPS)
+    after = report.generate_summary_from_db()
+    assert report.rebuild_transactions_from_swaps()
+
+    pd.testing.assert_frame_equal(before, after)
+    pd.testing.assert_frame_equal(before, report.generate_summary_from_db())
+    sources = report.conn.execute("SELECT source, COUNT(*) FROM wallet_transactions GROUP BY source").fetchall()
+    assert sources == [('swaps', 2)]
+    assert rollup_drift(report.conn, report.wallet_id).empty
+
+
+def test_buy_and_later_sell_are_one_trade(make_report, dune):
+    report = make_report(days_back=0)
+
+    ingest_swaps(report, dune, SWAPS[:2])
+
+    trades = pd.read_sql_query("SELECT * FROM wallet_transactions", report.conn)
+    assert len(trades) == 1
+    trade = trades.iloc[0]
+    assert (trade['spent_amount_lamports'], trade['earned_amount_lamports']) == (1_000_000_000, 2_000_000_000)
+    assert trade['delta_percentage'] == 100.0
+    assert trade['time_traded'] == '22h 45m'
+    assert trade['spent_amount_eur_cents'] == 15000
+
+
+def test_dune_rows_fetched_after_the_swaps_are_not_counted_twice(make_report, dune, rollup_drift):
+    report = make_report(days_back=0)
+    ingest_swaps(report, dune, SWAPS)
+
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows({'MintA': (1.0, 2.0), 'MintC': (3.0, 1.0)})
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+
+    trades = pd.read_sql_query("SELECT token_mint, source FROM wallet_transactions ORDER BY token_mint", report.conn)
+    assert trades.values.tolist() == [['MintA', 'swaps'], ['MintB', 'swaps'], ['MintC', 'dune']]
+    assert rollup_drift(report.conn, report.wallet_id).empty
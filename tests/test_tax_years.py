@@ -0,0 +1,40 @@
+import pandas as pd
+
+from conftest import WALLET
+
+
+def disposals_frame():
+    return pd.DataFrame({
+        'wallet_address': [WALLET, WALLET, WALLET],
+        'token_symbol': ['AAA', 'BBB', 'CCC'],
+        'time_traded': ['5m 0s', '400d 0h', '1h 0m'],
+        'block_time_epoch': pd.array([1755129600, 1755129600, None], dtype='Int64'),
+        'spent_amount_lamports': [100, 200, 300],
+        'earned_amount_lamports': [150, 100, 450],
+        'spent_value_cents': [1000, 2000, 3000],
+        'earned_value_cents': [1500, 1000, 4500],
+    })
+
+
+def test_disposals_without_block_time_land_on_an_unknown_tax_year(make_report):
+    report = make_report()
+
+    summary = report.aggregate_tax_years(report.classify_disposals(disposals_frame()))
+
+    assert summary['tax_year'].tolist() == [2025, 2025, 'unknown', 'unknown']
+    assert summary['disposals'].sum() == 2 * 3
+    unknown = summary[(summary['tax_year'] == 'unknown') & (summary['wallet_address'] == 'ALL WALLETS')]
+    assert unknown['taxable_gains_cents'].tolist() == [1500]
+    totals = summary[summary['wallet_address'] == 'ALL WALLETS']
+    assert totals['proceeds_cents'].sum() == 7000
+
+
+def test_tax_year_filter_reports_excluded_unknown_years(make_report, monkeypatch, capsys):
+    report = make_report()
+    monkeypatch.setattr(report, 'get_disposals_from_db', lambda wallet_ids, currency: disposals_frame())
+
+    summary, disposals = report.generate_tax_year_report(tax_years=[2025])
+
+    assert len(disposals) == 2
+    assert summary['tax_year'].tolist() == [2025, 2025]
+    assert "1 disposals have no block time and so no tax year: excluded by the tax-year filter" in capsys.readouterr().out
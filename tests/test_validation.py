@@ -0,0 +1,40 @@
+import json
+
+import pandas as pd
+
+from conftest import trade_rows
+
+
+def bad_trades():
+    trades = trade_rows({'MintA': (1.0, 2.0), 'MintB': (2.0, 1.0), 'MintC': (1.0, 1.5)}, '14.08.2025')
+    trades.loc[1, 'spent_amount'] = -2.0
+    trades.loc[2, 'block_time'] = None
+    return pd.concat([trades, trades.iloc[[0]]], ignore_index=True)
+
+
+def ingest(report, dune, trades):
+    dune[report.TRANSACTION_QUERY_ID] = trades
+    report.fetch_data()
+    assert report.ingest_fetched_frames()
+
+
+def test_invalid_rows_are_quarantined_once_with_their_first_failed_rule(make_report, dune):
+    report = make_report()
+    ingest(report, dune, bad_trades())
+
+    stored = report.conn.execute("SELECT token_symbol FROM wallet_transactions").fetchall()
+    assert stored == [('MINT',)]
+    quarantined = pd.read_sql_query("SELECT reason, row_data FROM quarantined_rows ORDER BY id", report.conn)
+    assert quarantined['reason'].tolist() == ['negative_amount', 'missing_block_time', 'duplicate_row']
+    assert json.loads(quarantined['row_data'][0])['spent_amount'] == -2.0
+
+    checked_rows, quarantined_rows, rule_failures = report.conn.execute(
+        "SELECT checked_rows, quarantined_rows, rule_failures FROM validation_runs").fetchone()
+    assert (checked_rows, quarantined_rows) == (4, 3)
+    assert json.loads(rule_failures) == {'missing_block_time': 1, 'negative_amount': 1, 'missing_eur_price': 0,
+                                         'duplicate_row': 1}
+
+    # An overlapping fetch returns the same bad rows; they are not quarantined twice
+    ingest(report, dune, bad_trades())
+    assert report.conn.execute("SELECT COUNT(*) FROM quarantined_rows").fetchone()[0] == 3
+    assert report.conn.execute("SELECT COUNT(*) FROM validation_runs").fetchone()[0] == 2
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta, timezone
+
+import pandas as pd
+
+from conftest import trade_rows
+
+
+def days_ago(days):
+    return (datetime.now(timezone.utc) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S.000 UTC')
+
+
+def sync(report, dune, tokens, block_time):
+    dune[report.TRANSACTION_QUERY_ID] = trade_rows(tokens, block_time)
+    report.fetch_data()
+    assert report.ingest_fetched_frames(skip_stored=True)
+
+
+def stored_trades(report):
+    return pd.read_sql_query("SELECT id, token_mint, spent_amount_lamports, earned_amount_lamports "
+                             "FROM wallet_transactions ORDER BY token_mint, id", report.conn)
+
+
+def test_overlapping_syncs_replace_token_totals(make_report, dune, rollup_drift):
+    report = make_report(days_back=15)
+    block_time = days_ago(2)
+    sync(report, dune, {'MintA': (1.0, 2.0), 'MintB': (1.0, 0.5)}, block_time)
+    unchanged_id = stored_trades(report).set_index('token_mint').loc['MintB', 'id']
+
+    sync(report, dune, {'MintA': (1.5, 2.5), 'MintB': (1.0, 0.5), 'MintC': (3.0, 1.0)}, block_time)
+
+    trades = stored_trades(report)
+    assert trades['token_mint'].tolist() == ['MintA', 'MintB', 'MintC']
+    assert trades['spent_amount_lamports'].tolist() == [1_500_000_000, 1_000_000_000, 3_000_000_000]
+    assert trades.set_index('token_mint').loc['MintB', 'id'] == unchanged_id
+    assert rollup_drift(report.conn, report.wallet_id).empty
+    assert report.conn.execute("SELECT COUNT(*) FROM fiat_valuations").fetchone()[0] == 3 * len(report.currencies)
+
+    summary = report.generate_summary_from_db()
+    assert summary['total_spent_amount'].iloc[0] == 5.5
+
+
+def test_repeated_identical_sync_changes_nothing(make_report, dune):
+    report = make_report(days_back=15)
+    block_time = days_ago(2)
+    sync(report, dune, {'MintA': (1.0, 2.0)}, block_time)
+    before = stored_trades(report)
+    version = report.get_wallet_data_version()
+
+    sync(report, dune, {'MintA': (1.0, 2.0)}, block_time)
+
+    pd.testing.assert_frame_equal(stored_trades(report), before)
+    assert report.get_wallet_data_version() == version
+
+
+def test_rows_before_the_window_are_kept(make_report, dune, rollup_drift):
+    report = make_report(days_back=60)
+    sync(report, dune, {'MintA': (1.0, 2.0)}, days_ago(40))
+
+    report.days_back = 15
+    sync(report, dune, {'MintA': (0.5, 0.25)}, days_ago(3))
+
+    assert stored_trades(report)['spent_amount_lamports'].tolist() == [1_000_000_000, 500_000_000]
+    assert rollup_drift(report.conn, report.wallet_id).empty
+
+
+def test_token_amounts_past_64_bit_base_units_are_stored(make_report, dune):
+    report = make_report(days_back=15)
+    rows = trade_rows({'MintA': (1.0, 2.0)}, days_ago(2))
+    rows[['incoming', 'outcome', 'delta_token']] = [2.5e13, 2.4e13, 1e12]
+    dune[report.TRANSACTION_QUERY_ID] = rows
+    report.fetch_data()
+
+    assert report.ingest_fetched_frames(skip_stored=True)
+
+    stored = report.conn.execute("SELECT incoming, outcome, delta_token FROM wallet_transactions").fetchall()
+    assert stored == [(2.5e13, 2.4e13, 1e12)]
+    assert report.get_wallet_transactions_from_db()['incoming'].tolist() == [2.5e13]